@@ -0,0 +1,146 @@
+"""Benchmark an echo server and its clients running in the same event loop.
+
+Event loops:
+
+- selector: SelectorEventLoop with the default selector (epoll on Linux)
+- proactor: SelectorProactorEventLoop, SelectorProactor on top of the default
+  selector
+- io_uring: IoUringEventLoop, IoUringProactor (Linux 5.11 and newer)
+
+Each client sends a message of --size bytes and waits until the server
+echoes it back, --requests times.  Measured: requests per second and
+throughput of the echoed data.
+
+Examples::
+
+    python benchmarks/bench_echo.py
+    python benchmarks/bench_echo.py --clients 100 --size 64 --loops io_uring
+"""
+from __future__ import print_function
+
+import argparse
+import sys
+
+import trollius
+from trollius.time_monotonic import time_monotonic
+
+
+LOOPS = ('selector', 'proactor', 'io_uring')
+
+ARGS = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+ARGS.add_argument(
+    '--loops', action='store', dest='loops', default=','.join(LOOPS),
+    help='Comma-separated event loops (default: %(default)s)')
+ARGS.add_argument(
+    '--clients', action='store', dest='clients', default=10, type=int,
+    help='Number of concurrent clients (default: %(default)s)')
+ARGS.add_argument(
+    '--requests', action='store', dest='requests', default=2000, type=int,
+    help='Number of requests per client (default: %(default)s)')
+ARGS.add_argument(
+    '--size', action='store', dest='size', default=1024, type=int,
+    help='Size of a message in bytes (default: %(default)s)')
+
+
+class EchoServer(trollius.Protocol):
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.transport.write(data)
+
+
+class EchoClient(trollius.Protocol):
+
+    def __init__(self, message, requests, done):
+        self.message = message
+        self.remaining = requests
+        self.received = 0
+        self.done = done
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(self.message)
+
+    def data_received(self, data):
+        self.received += len(data)
+        if self.received < len(self.message):
+            return
+        self.received = 0
+        self.remaining -= 1
+        if self.remaining:
+            self.transport.write(self.message)
+        else:
+            self.transport.close()
+            self.done.set_result(None)
+
+
+def new_event_loop(name):
+    if name == 'selector':
+        return trollius.SelectorEventLoop()
+    elif name == 'proactor':
+        return trollius.SelectorProactorEventLoop()
+    else:
+        loop = trollius.IoUringEventLoop()
+        if not isinstance(loop._proactor, trollius.IoUringProactor):
+            loop.close()
+            return None
+        return loop
+
+
+@trollius.coroutine
+def bench_loop(loop, args):
+    server = yield trollius.From(loop.create_server(EchoServer,
+                                                    '127.0.0.1', 0))
+    address = server.sockets[0].getsockname()
+    message = b'x' * args.size
+    done = []
+    for i in range(args.clients):
+        fut = trollius.Future(loop=loop)
+        done.append(fut)
+        yield trollius.From(loop.create_connection(
+            lambda: EchoClient(message, args.requests, fut), *address))
+    yield trollius.From(trollius.wait(done, loop=loop))
+    server.close()
+    yield trollius.From(server.wait_closed())
+
+
+def bench(name, args):
+    """Return the time in seconds, or None if the event loop is not
+    available."""
+    loop = new_event_loop(name)
+    if loop is None:
+        return None
+    try:
+        t0 = time_monotonic()
+        loop.run_until_complete(bench_loop(loop, args))
+        return time_monotonic() - t0
+    finally:
+        loop.close()
+
+
+def main():
+    args = ARGS.parse_args()
+    loops = args.loops.split(',')
+    for name in loops:
+        if name not in LOOPS:
+            ARGS.error('unknown event loop: %s' % name)
+
+    requests = args.clients * args.requests
+    print('%s clients, %s requests of %s bytes'
+          % (args.clients, requests, args.size))
+    print('%-10s %10s %14s %12s' % ('loop', 'time', 'requests/s', 'MB/s'))
+    for name in loops:
+        dt = bench(name, args)
+        if dt is None:
+            print('%-10s %10s' % (name, 'not available'))
+            continue
+        print('%-10s %8.3f s %14.0f %12.1f'
+              % (name, dt, requests / dt,
+                 requests * args.size * 2 / dt / 1e6))
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Benchmark gather() with a large number of children.
+
+Benchmarks:
+
+- futures: gather() of --count futures, completed one by one by
+  Future.set_result()
+- coroutines: gather() of --count coroutines which do not block
+- stream: same as futures, but the results are passed to the result_callback
+  of gather() instead of being collected into a list
+
+Measured: time in seconds and memory in bytes per child.  On Python 3.4 and
+newer, the memory is measured by tracemalloc:
+
+- gather: memory allocated by the gather() call itself, for futures and
+  stream (the futures are created before)
+- peak: peak of the memory allocated during the whole benchmark, children
+  included
+
+Examples::
+
+    python benchmarks/bench_gather.py
+    python benchmarks/bench_gather.py --count 1000000 --benchmarks futures
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import sys
+
+import trollius
+from trollius.time_monotonic import time_monotonic
+try:
+    import tracemalloc
+except ImportError:
+    # Python 3.3 and older
+    tracemalloc = None
+
+
+BENCHMARKS = ('futures', 'coroutines', 'stream')
+
+ARGS = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+ARGS.add_argument(
+    '--benchmarks', action='store', dest='benchmarks',
+    default=','.join(BENCHMARKS),
+    help='Comma-separated benchmarks (default: %(default)s)')
+ARGS.add_argument(
+    '--count', action='store', dest='count', default=100000, type=int,
+    help='Number of children of gather() (default: %(default)s)')
+
+
+def traced_memory():
+    if tracemalloc is None or not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0]
+
+
+def bench_futures(loop, count, stream=False):
+    children = [trollius.Future(loop=loop) for i in range(count)]
+    before = traced_memory()
+    if stream:
+        non_local = {'total': 0}
+
+        def result_callback(index, result):
+            non_local['total'] += result
+
+        outer = trollius.gather(*children, loop=loop,
+                                result_callback=result_callback)
+    else:
+        outer = trollius.gather(*children, loop=loop)
+    if before is not None:
+        gather_memory = traced_memory() - before
+    else:
+        gather_memory = None
+    for fut in children:
+        fut.set_result(1)
+    # in stream mode, gather() releases the children when they complete
+    children = fut = None
+    result = loop.run_until_complete(outer)
+    if stream:
+        total = non_local['total']
+    else:
+        total = sum(result)
+    if total != count:
+        raise RuntimeError('got %s results, expected %s' % (total, count))
+    return gather_memory
+
+
+@trollius.coroutine
+def child():
+    raise trollius.Return(1)
+
+
+def bench_coroutines(loop, count):
+    outer = trollius.gather(*[child() for i in range(count)], loop=loop)
+    result = loop.run_until_complete(outer)
+    if sum(result) != count:
+        raise RuntimeError('got %s results, expected %s'
+                           % (sum(result), count))
+    return None
+
+
+def run(benchmark, count, trace):
+    loop = trollius.new_event_loop()
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    try:
+        t0 = time_monotonic()
+        if benchmark == 'coroutines':
+            gather_memory = bench_coroutines(loop, count)
+        else:
+            gather_memory = bench_futures(loop, count,
+                                          stream=(benchmark == 'stream'))
+        dt = time_monotonic() - t0
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+        else:
+            peak = None
+    finally:
+        if trace:
+            tracemalloc.stop()
+        loop.close()
+    return dt, gather_memory, peak
+
+
+def bench(benchmark, count):
+    """Return (seconds, gather memory, peak memory).
+
+    The time is measured without tracemalloc, the memory in a second run.
+    """
+    dt = run(benchmark, count, False)[0]
+    if tracemalloc is not None:
+        gather_memory, peak = run(benchmark, count, True)[1:]
+    else:
+        gather_memory = peak = None
+    return dt, gather_memory, peak
+
+
+def format_memory(size, count):
+    if size is None:
+        return '-'
+    return '%.0f B' % (float(size) / count)
+
+
+def main():
+    args = ARGS.parse_args()
+    benchmarks = args.benchmarks.split(',')
+    for benchmark in benchmarks:
+        if benchmark not in BENCHMARKS:
+            ARGS.error('unknown benchmark: %s' % benchmark)
+    if tracemalloc is None:
+        print('tracemalloc is not available: memory is not measured')
+
+    print('%s children' % args.count)
+    print('%-12s %10s %14s %14s'
+          % ('benchmark', 'time', 'gather/child', 'peak/child'))
+    for benchmark in benchmarks:
+        dt, gather_memory, peak = bench(benchmark, args.count)
+        print('%-12s %8.3f s %14s %14s'
+              % (benchmark, dt,
+                 format_memory(gather_memory, args.count),
+                 format_memory(peak, args.count)))
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
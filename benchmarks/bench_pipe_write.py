@@ -0,0 +1,98 @@
+"""Benchmark writes into the stdin pipe of a slow subprocess.
+
+Stream data into the stdin of a child process which reads it in small
+chunks, through a StreamWriter with a large write buffer limit: the write
+buffer of the pipe transport stays deep and most writes are partial.
+Measured: throughput and CPU time of the benchmark process (the parent).
+
+Examples::
+
+    python benchmarks/bench_pipe_write.py
+    python benchmarks/bench_pipe_write.py --total 4096 --backlog 64
+    python benchmarks/bench_pipe_write.py --delay 0 --read-size 4096
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+import trollius
+from trollius import From
+from trollius.time_monotonic import time_monotonic
+
+
+# Child process reading its stdin in chunks of read_size bytes
+CHILD = '''
+import os, sys, time
+read_size = int(sys.argv[1])
+delay = float(sys.argv[2])
+while True:
+    data = os.read(0, read_size)
+    if not data:
+        break
+    if delay:
+        time.sleep(delay)
+'''
+
+ARGS = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+ARGS.add_argument(
+    '--total', action='store', dest='total', default=1024, type=int,
+    help='Amount of data to write in MB (default: %(default)s)')
+ARGS.add_argument(
+    '--chunk', action='store', dest='chunk', default=16, type=int,
+    help='Size of each write() in KB (default: %(default)s)')
+ARGS.add_argument(
+    '--backlog', action='store', dest='backlog', default=16, type=int,
+    help='High-water limit of the write buffer in MB (default: %(default)s)')
+ARGS.add_argument(
+    '--read-size', action='store', dest='read_size', default=65536,
+    type=int,
+    help='Size of the reads of the child process in bytes '
+         '(default: %(default)s)')
+ARGS.add_argument(
+    '--delay', action='store', dest='delay', default=0.002, type=float,
+    help='Sleep in seconds of the child process after each read '
+         '(default: %(default)s)')
+
+
+def cpu_time():
+    times = os.times()
+    return times[0] + times[1]
+
+
+@trollius.coroutine
+def stream(loop, args):
+    proc = yield From(trollius.create_subprocess_exec(
+        sys.executable, '-c', CHILD, str(args.read_size), str(args.delay),
+        stdin=trollius.subprocess.PIPE, loop=loop))
+    proc.stdin.transport.set_write_buffer_limits(
+        high=args.backlog * 1024 * 1024)
+    chunk = b'x' * (args.chunk * 1024)
+    count = args.total * 1024 // args.chunk
+    for i in range(count):
+        proc.stdin.write(chunk)
+        yield From(proc.stdin.drain())
+    proc.stdin.close()
+    yield From(proc.wait())
+
+
+def main():
+    args = ARGS.parse_args()
+    loop = trollius.get_event_loop()
+    t0 = time_monotonic()
+    cpu0 = cpu_time()
+    loop.run_until_complete(stream(loop, args))
+    cpu = cpu_time() - cpu0
+    dt = time_monotonic() - t0
+    loop.close()
+
+    print('Wrote %s MB in chunks of %s KB, backlog %s MB'
+          % (args.total, args.chunk, args.backlog))
+    print('Throughput: %.1f MB/s' % (args.total / dt))
+    print('CPU time of the parent: %.2f sec (%.2f sec/GB)'
+          % (cpu, cpu * 1024 / args.total))
+
+
+if __name__ == '__main__':
+    main()
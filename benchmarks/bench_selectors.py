@@ -0,0 +1,310 @@
+"""Benchmark the selectors and the selector event loop.
+
+Drive each selector of trollius.selectors, and a SelectorEventLoop using it,
+with many socketpairs.  One end of each socketpair is registered for reading,
+the other end is used to make it ready.  Measured:
+
+- register: cost of register() per file descriptor
+- modify: cost of modify() per file descriptor, switching between
+  EVENT_READ and EVENT_READ | EVENT_WRITE
+- unregister: cost of unregister() per file descriptor
+- select: latency of select(0) when a fraction (the activity ratio) of the
+  file descriptors is ready
+- loop: reader callbacks per second of the event loop when a fraction of
+  the file descriptors is ready; each callback reads the byte and sends a
+  new one, so the socket is ready again at the next iteration
+
+Examples::
+
+    python benchmarks/bench_selectors.py
+    python benchmarks/bench_selectors.py --sizes 100,1000 --selectors epoll
+    python benchmarks/bench_selectors.py --json results.json
+
+Results are written as JSON with --json, to track them across releases.
+Sizes needing more file descriptors than the RLIMIT_NOFILE hard limit, or
+FD_SETSIZE for SelectSelector, are skipped.
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import platform
+import socket
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+import trollius
+from trollius import selectors
+from trollius.time_monotonic import time_monotonic
+if sys.platform == 'win32':
+    from trollius.windows_utils import socketpair
+else:
+    from socket import socketpair
+
+
+# (name, class name in trollius.selectors)
+SELECTORS = (
+    ('select', 'SelectSelector'),
+    ('poll', 'PollSelector'),
+    ('epoll', 'EpollSelector'),
+    ('epoll-et', 'EdgeTriggeredEpollSelector'),
+    ('devpoll', 'DevpollSelector'),
+    ('kqueue', 'KqueueSelector'),
+)
+
+# select() only supports file descriptors smaller than FD_SETSIZE
+FD_SETSIZE = 1024
+
+# File descriptors used by the interpreter and the event loop
+EXTRA_FDS = 32
+
+ARGS = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+ARGS.add_argument(
+    '--sizes', action='store', dest='sizes',
+    default='100,1000,10000,50000',
+    help='Comma-separated numbers of socketpairs (default: %(default)s)')
+ARGS.add_argument(
+    '--selectors', action='store', dest='selectors',
+    default=','.join(name for name, cls in SELECTORS),
+    help='Comma-separated selectors (default: %(default)s)')
+ARGS.add_argument(
+    '--activity', action='store', dest='activity',
+    default='0,0.01,0.1,1',
+    help='Comma-separated ratios of ready file descriptors '
+         '(default: %(default)s)')
+ARGS.add_argument(
+    '--repeat', action='store', dest='repeat', default=5, type=int,
+    help='Number of runs, the best one is kept (default: %(default)s)')
+ARGS.add_argument(
+    '--duration', action='store', dest='duration', default=0.5, type=float,
+    help='Duration in seconds of each event loop run (default: %(default)s)')
+ARGS.add_argument(
+    '--json', action='store', dest='json', default=None,
+    help='Write the results as JSON into this file')
+
+
+def raise_fd_limit(needed):
+    """Raise the soft RLIMIT_NOFILE limit, return the limit."""
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed and (hard == resource.RLIM_INFINITY or soft < hard):
+        if hard == resource.RLIM_INFINITY:
+            soft = needed
+        else:
+            soft = min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    return soft
+
+
+def make_socketpairs(count):
+    pairs = []
+    for i in range(count):
+        rsock, wsock = socketpair()
+        rsock.setblocking(False)
+        wsock.setblocking(False)
+        pairs.append((rsock, wsock))
+    return pairs
+
+
+def close_socketpairs(pairs):
+    for rsock, wsock in pairs:
+        rsock.close()
+        wsock.close()
+
+
+def drain(rsock):
+    while True:
+        try:
+            if not rsock.recv(4096):
+                break
+        except socket.error:
+            break
+
+
+def timed(func, *args):
+    t0 = time_monotonic()
+    func(*args)
+    return time_monotonic() - t0
+
+
+def bench_selector(selector_class, pairs, activities, repeat):
+    """Return a list of (benchmark, activity, value, unit) tuples."""
+    size = len(pairs)
+    fds = [rsock.fileno() for rsock, wsock in pairs]
+    rw = selectors.EVENT_READ | selectors.EVENT_WRITE
+
+    def register(selector):
+        for fd in fds:
+            selector.register(fd, selectors.EVENT_READ)
+
+    def modify(selector):
+        for fd in fds:
+            selector.modify(fd, rw)
+        for fd in fds:
+            selector.modify(fd, selectors.EVENT_READ)
+
+    def unregister(selector):
+        for fd in fds:
+            selector.unregister(fd)
+
+    timings = {'register': [], 'modify': [], 'unregister': []}
+    for run in range(repeat):
+        selector = selector_class()
+        try:
+            timings['register'].append(timed(register, selector))
+            timings['modify'].append(timed(modify, selector) / 2)
+            timings['unregister'].append(timed(unregister, selector))
+        finally:
+            selector.close()
+
+    results = []
+    for name in ('register', 'modify', 'unregister'):
+        results.append((name, None, min(timings[name]) / size * 1e9,
+                        'ns/fd'))
+
+    selector = selector_class()
+    try:
+        register(selector)
+        for activity in activities:
+            active = pairs[:int(round(size * activity))]
+            best = None
+            for run in range(repeat):
+                # Send a new byte at each run: edge-triggered selectors only
+                # report new events
+                for rsock, wsock in active:
+                    wsock.send(b'x')
+                t0 = time_monotonic()
+                ready = selector.select(0)
+                dt = time_monotonic() - t0
+                if len(ready) != len(active):
+                    raise RuntimeError('select() returned %s events, '
+                                       'expected %s'
+                                       % (len(ready), len(active)))
+                if best is None or dt < best:
+                    best = dt
+            for rsock, wsock in active:
+                drain(rsock)
+            results.append(('select', activity, best * 1e6, 'us'))
+    finally:
+        selector.close()
+    return results
+
+
+def bench_loop(selector_class, pairs, activities, repeat, duration):
+    """Return a list of (benchmark, activity, value, unit) tuples."""
+    results = []
+    for activity in activities:
+        if not activity:
+            continue
+        active = pairs[:int(round(len(pairs) * activity))]
+        best = None
+        for run in range(repeat):
+            loop = trollius.SelectorEventLoop(selector_class())
+            calls = [0]
+
+            def on_read(rsock, wsock):
+                rsock.recv(4096)
+                calls[0] += 1
+                wsock.send(b'x')
+
+            try:
+                for rsock, wsock in pairs:
+                    loop.add_reader(rsock.fileno(), on_read, rsock, wsock)
+                for rsock, wsock in active:
+                    wsock.send(b'x')
+                loop.call_later(duration, loop.stop)
+                t0 = time_monotonic()
+                loop.run_forever()
+                dt = time_monotonic() - t0
+            finally:
+                loop.close()
+            for rsock, wsock in active:
+                drain(rsock)
+            rate = calls[0] / dt
+            if best is None or rate > best:
+                best = rate
+        results.append(('loop', activity, best, 'callbacks/s'))
+    return results
+
+
+def format_activity(activity):
+    if activity is None:
+        return '-'
+    return '%g%%' % (activity * 100)
+
+
+def main():
+    args = ARGS.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    names = args.selectors.split(',')
+    activities = [float(ratio) for ratio in args.activity.split(',')]
+
+    selector_classes = []
+    for name, class_name in SELECTORS:
+        if name in names and hasattr(selectors, class_name):
+            selector_classes.append((name, getattr(selectors, class_name)))
+
+    fd_limit = raise_fd_limit(2 * max(sizes) + EXTRA_FDS)
+
+    records = []
+    skipped = []
+    print('%-10s %-9s %7s %8s %14s' % ('benchmark', 'selector', 'pairs',
+                                       'active', 'result'))
+    for size in sizes:
+        needed = 2 * size + EXTRA_FDS
+        if fd_limit is not None and needed > fd_limit:
+            skipped.append({'pairs': size,
+                            'reason': 'RLIMIT_NOFILE is %s' % fd_limit})
+            print('%s socketpairs: skipped, RLIMIT_NOFILE is %s'
+                  % (size, fd_limit))
+            continue
+        pairs = make_socketpairs(size)
+        try:
+            for name, selector_class in selector_classes:
+                if (selector_class is selectors.SelectSelector
+                        and needed > FD_SETSIZE):
+                    skipped.append({'pairs': size, 'selector': name,
+                                    'reason': 'FD_SETSIZE'})
+                    continue
+                results = bench_selector(selector_class, pairs, activities,
+                                         args.repeat)
+                results.extend(bench_loop(selector_class, pairs, activities,
+                                          args.repeat, args.duration))
+                for benchmark, activity, value, unit in results:
+                    records.append({'benchmark': benchmark,
+                                    'selector': name,
+                                    'pairs': size,
+                                    'activity': activity,
+                                    'value': value,
+                                    'unit': unit})
+                    print('%-10s %-9s %7s %8s %14.1f %s'
+                          % (benchmark, name, size,
+                             format_activity(activity), value, unit))
+                sys.stdout.flush()
+        finally:
+            close_socketpairs(pairs)
+
+    if args.json:
+        metadata = {
+            'date': datetime.datetime.utcnow().isoformat(),
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'duration': args.duration,
+        }
+        with open(args.json, 'w') as fp:
+            json.dump({'metadata': metadata, 'results': records,
+                       'skipped': skipped}, fp, indent=2, sort_keys=True)
+        print('Results written into %s' % args.json)
+
+
+if __name__ == '__main__':
+    main()
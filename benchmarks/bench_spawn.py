@@ -0,0 +1,163 @@
+"""Benchmark the spawn rate of subprocesses of the event loop.
+
+Spawn short-lived child processes with create_subprocess_exec(), using
+subprocess.Popen or posix_spawnp() (SelectorEventLoop(use_posix_spawn=True)).
+The child program is /bin/true.  Measured:
+
+- sequential: processes per second when each process is spawned after the
+  previous one exited
+- concurrent: processes per second when batches of processes run
+  concurrently
+
+The cost of fork() grows with the memory of the parent process: use --rss to
+allocate memory in the benchmark process before spawning the processes.
+
+Examples::
+
+    python benchmarks/bench_spawn.py
+    python benchmarks/bench_spawn.py --rss 0,1000 --count 200
+    python benchmarks/bench_spawn.py --json results.json
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+
+import trollius
+from trollius import From
+from trollius import unix_events
+from trollius.time_monotonic import time_monotonic
+
+
+BACKENDS = ('popen', 'posix_spawn')
+
+PROGRAM = '/bin/true'
+
+ARGS = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+ARGS.add_argument(
+    '--backends', action='store', dest='backends',
+    default=','.join(BACKENDS),
+    help='Comma-separated spawn backends (default: %(default)s)')
+ARGS.add_argument(
+    '--rss', action='store', dest='rss', default='0,500',
+    help='Comma-separated memory sizes in MB allocated before spawning '
+         '(default: %(default)s)')
+ARGS.add_argument(
+    '--count', action='store', dest='count', default=500, type=int,
+    help='Number of processes per run (default: %(default)s)')
+ARGS.add_argument(
+    '--concurrency', action='store', dest='concurrency', default=50,
+    type=int,
+    help='Number of concurrent processes (default: %(default)s)')
+ARGS.add_argument(
+    '--repeat', action='store', dest='repeat', default=3, type=int,
+    help='Number of runs, the best one is kept (default: %(default)s)')
+ARGS.add_argument(
+    '--json', action='store', dest='json', default=None,
+    help='Write the results as JSON into this file')
+
+
+def allocate(size_mb):
+    """Allocate and touch size_mb MB of memory."""
+    data = bytearray(size_mb * 1024 * 1024)
+    for pos in range(0, len(data), 4096):
+        data[pos] = 1
+    return data
+
+
+@trollius.coroutine
+def spawn(loop):
+    proc = yield From(trollius.create_subprocess_exec(PROGRAM, loop=loop))
+    yield From(proc.wait())
+
+
+@trollius.coroutine
+def run_sequential(loop, count):
+    for i in range(count):
+        yield From(spawn(loop))
+
+
+@trollius.coroutine
+def run_concurrent(loop, count, concurrency):
+    for start in range(0, count, concurrency):
+        batch = min(concurrency, count - start)
+        yield From(trollius.gather(*[spawn(loop) for i in range(batch)],
+                                   loop=loop))
+
+
+def bench(backend, mode, count, concurrency, repeat):
+    """Return the best rate in processes per second."""
+    best = None
+    for run in range(repeat):
+        loop = trollius.SelectorEventLoop(
+            use_posix_spawn=(backend == 'posix_spawn'))
+        trollius.set_event_loop(loop)
+        watcher = trollius.get_child_watcher()
+        watcher.attach_loop(loop)
+        try:
+            if mode == 'sequential':
+                coro = run_sequential(loop, count)
+            else:
+                coro = run_concurrent(loop, count, concurrency)
+            t0 = time_monotonic()
+            loop.run_until_complete(coro)
+            dt = time_monotonic() - t0
+        finally:
+            trollius.set_event_loop(None)
+            loop.close()
+        rate = count / dt
+        if best is None or rate > best:
+            best = rate
+    return best
+
+
+def main():
+    args = ARGS.parse_args()
+    backends = args.backends.split(',')
+    sizes = [int(size) for size in args.rss.split(',')]
+
+    if 'posix_spawn' in backends and unix_events._spawn_libc is None:
+        print('posix_spawnp() is not available: skip posix_spawn')
+        backends.remove('posix_spawn')
+
+    records = []
+    print('%-12s %-11s %7s %14s' % ('backend', 'mode', 'rss', 'result'))
+    for size in sizes:
+        memory = allocate(size)
+        try:
+            for mode in ('sequential', 'concurrent'):
+                for backend in backends:
+                    rate = bench(backend, mode, args.count, args.concurrency,
+                                 args.repeat)
+                    records.append({'backend': backend,
+                                    'mode': mode,
+                                    'rss_mb': size,
+                                    'value': rate,
+                                    'unit': 'processes/s'})
+                    print('%-12s %-11s %5s MB %10.1f processes/s'
+                          % (backend, mode, size, rate))
+                    sys.stdout.flush()
+        finally:
+            del memory
+
+    if args.json:
+        metadata = {
+            'date': datetime.datetime.utcnow().isoformat(),
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'count': args.count,
+            'concurrency': args.concurrency,
+            'repeat': args.repeat,
+        }
+        with open(args.json, 'w') as fp:
+            json.dump({'metadata': metadata, 'results': records}, fp,
+                      indent=2, sort_keys=True)
+        print('Results written into %s' % args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""Benchmark the subprocess support of the event loop.
+
+Each benchmark runs with each child watcher: SafeChildWatcher,
+FastChildWatcher and PidfdChildWatcher (if pidfd_open() is available).
+Measured:
+
+- spawn: processes per second spawned with create_subprocess_exec() and
+  waited with Process.wait(), one after the other
+- latency: median time in milliseconds between the call to
+  create_subprocess_exec() and the end of Process.wait()
+- fanout: processes per second when --fanout children run concurrently
+- stdout: throughput of the stdout pipe of a child process read by a
+  StreamReader, in MB/s
+- stdin: throughput of the stdin pipe of a child process written through the
+  write pipe transport, in MB/s
+
+Examples::
+
+    python benchmarks/bench_subprocess.py
+    python benchmarks/bench_subprocess.py --watchers safe,fast --size 256
+    python benchmarks/bench_subprocess.py --json new.json --compare old.json
+
+Results are written as JSON with --json.  --compare reads the JSON file of a
+previous run, for example of another commit, and prints the change of each
+result.
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import trollius
+from trollius import From
+from trollius import unix_events
+from trollius.time_monotonic import time_monotonic
+
+
+WATCHERS = (
+    ('safe', 'SafeChildWatcher'),
+    ('fast', 'FastChildWatcher'),
+    ('pidfd', 'PidfdChildWatcher'),
+)
+
+BENCHMARKS = ('spawn', 'latency', 'fanout', 'stdout', 'stdin')
+
+# Results where a lower value is better
+LOWER_IS_BETTER = ('ms',)
+
+if os.path.exists('/bin/true'):
+    PROGRAM_TRUE = ['/bin/true']
+else:
+    PROGRAM_TRUE = [sys.executable, '-c', 'pass']
+
+# Child process writing size bytes into its stdout
+CHILD_WRITE = '''
+import os, sys
+size = int(sys.argv[1])
+block = b'x' * 65536
+while size > 0:
+    size -= os.write(1, block[:size])
+'''
+
+# Child process reading its stdin until the end of file
+CHILD_READ = '''
+import os
+while os.read(0, 65536):
+    pass
+'''
+
+ARGS = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+ARGS.add_argument(
+    '--watchers', action='store', dest='watchers',
+    default=','.join(name for name, class_name in WATCHERS),
+    help='Comma-separated child watchers (default: %(default)s)')
+ARGS.add_argument(
+    '--benchmarks', action='store', dest='benchmarks',
+    default=','.join(BENCHMARKS),
+    help='Comma-separated benchmarks (default: %(default)s)')
+ARGS.add_argument(
+    '--count', action='store', dest='count', default=200, type=int,
+    help='Number of processes of the spawn, latency and fanout benchmarks '
+         '(default: %(default)s)')
+ARGS.add_argument(
+    '--fanout', action='store', dest='fanout', default=50, type=int,
+    help='Number of concurrent processes of the fanout benchmark '
+         '(default: %(default)s)')
+ARGS.add_argument(
+    '--size', action='store', dest='size', default=512, type=int,
+    help='Amount of data in MB of the stdout and stdin benchmarks '
+         '(default: %(default)s)')
+ARGS.add_argument(
+    '--repeat', action='store', dest='repeat', default=3, type=int,
+    help='Number of runs, the best one is kept (default: %(default)s)')
+ARGS.add_argument(
+    '--json', action='store', dest='json', default=None,
+    help='Write the results as JSON into this file')
+ARGS.add_argument(
+    '--compare', action='store', dest='compare', default=None,
+    help='Compare the results to a JSON file written by --json')
+
+
+@trollius.coroutine
+def spawn(loop):
+    proc = yield From(trollius.create_subprocess_exec(*PROGRAM_TRUE,
+                                                      loop=loop))
+    yield From(proc.wait())
+
+
+@trollius.coroutine
+def bench_spawn(loop, args):
+    t0 = time_monotonic()
+    for i in range(args.count):
+        yield From(spawn(loop))
+    dt = time_monotonic() - t0
+    raise trollius.Return(args.count / dt)
+
+
+@trollius.coroutine
+def bench_latency(loop, args):
+    timings = []
+    for i in range(args.count):
+        t0 = time_monotonic()
+        yield From(spawn(loop))
+        timings.append(time_monotonic() - t0)
+    timings.sort()
+    raise trollius.Return(timings[len(timings) // 2] * 1e3)
+
+
+@trollius.coroutine
+def bench_fanout(loop, args):
+    t0 = time_monotonic()
+    for start in range(0, args.count, args.fanout):
+        batch = min(args.fanout, args.count - start)
+        yield From(trollius.gather(*[spawn(loop) for i in range(batch)],
+                                   loop=loop))
+    dt = time_monotonic() - t0
+    raise trollius.Return(args.count / dt)
+
+
+@trollius.coroutine
+def bench_stdout(loop, args):
+    size = args.size * 1024 * 1024
+    t0 = time_monotonic()
+    proc = yield From(trollius.create_subprocess_exec(
+        sys.executable, '-c', CHILD_WRITE, str(size),
+        stdout=subprocess.PIPE, loop=loop))
+    received = 0
+    while True:
+        data = yield From(proc.stdout.read(65536))
+        if not data:
+            break
+        received += len(data)
+    yield From(proc.wait())
+    dt = time_monotonic() - t0
+    if received != size:
+        raise RuntimeError('received %s bytes, expected %s'
+                           % (received, size))
+    raise trollius.Return(args.size / dt)
+
+
+@trollius.coroutine
+def bench_stdin(loop, args):
+    block = b'x' * 65536
+    count = args.size * 16
+    t0 = time_monotonic()
+    proc = yield From(trollius.create_subprocess_exec(
+        sys.executable, '-c', CHILD_READ,
+        stdin=subprocess.PIPE, loop=loop))
+    for i in range(count):
+        proc.stdin.write(block)
+        yield From(proc.stdin.drain())
+    proc.stdin.close()
+    yield From(proc.wait())
+    dt = time_monotonic() - t0
+    raise trollius.Return(args.size / dt)
+
+
+BENCH_FUNCS = {
+    'spawn': (bench_spawn, 'processes/s'),
+    'latency': (bench_latency, 'ms'),
+    'fanout': (bench_fanout, 'processes/s'),
+    'stdout': (bench_stdout, 'MB/s'),
+    'stdin': (bench_stdin, 'MB/s'),
+}
+
+
+def run(watcher_class, benchmark, args):
+    """Return the best result of args.repeat runs."""
+    func, unit = BENCH_FUNCS[benchmark]
+    best = None
+    for run in range(args.repeat):
+        loop = trollius.SelectorEventLoop()
+        watcher = watcher_class()
+        trollius.set_event_loop(loop)
+        trollius.set_child_watcher(watcher)
+        watcher.attach_loop(loop)
+        try:
+            value = loop.run_until_complete(func(loop, args))
+        finally:
+            trollius.set_event_loop(None)
+            # close the watcher
+            trollius.set_child_watcher(None)
+            loop.close()
+        if (best is None
+                or (unit in LOWER_IS_BETTER and value < best)
+                or (unit not in LOWER_IS_BETTER and value > best)):
+            best = value
+    return best
+
+
+def git_revision():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        proc = subprocess.Popen(['git', 'rev-parse', 'HEAD'], cwd=directory,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError:
+        return None
+    stdout = proc.communicate()[0]
+    if proc.returncode:
+        return None
+    return stdout.decode('ascii').strip()
+
+
+def load_reference(filename):
+    with open(filename) as fp:
+        data = json.load(fp)
+    reference = {}
+    for record in data['results']:
+        key = (record['benchmark'], record['watcher'])
+        reference[key] = record['value']
+    return reference
+
+
+def format_change(unit, value, old_value):
+    if not old_value:
+        return ''
+    ratio = value / old_value
+    if unit in LOWER_IS_BETTER:
+        ratio = 1 / ratio
+    # positive percent: faster
+    return ' (%+.1f%%)' % ((ratio - 1) * 100)
+
+
+def main():
+    args = ARGS.parse_args()
+    names = args.watchers.split(',')
+    benchmarks = args.benchmarks.split(',')
+    for benchmark in benchmarks:
+        if benchmark not in BENCH_FUNCS:
+            ARGS.error('unknown benchmark: %s' % benchmark)
+    reference = None
+    if args.compare:
+        reference = load_reference(args.compare)
+
+    watchers = []
+    for name, class_name in WATCHERS:
+        if name not in names:
+            continue
+        if name == 'pidfd' and unix_events._pidfd_open is None:
+            print('pidfd_open() is not available: skip the pidfd watcher')
+            continue
+        watchers.append((name, getattr(unix_events, class_name)))
+
+    records = []
+    print('%-10s %-8s %24s' % ('benchmark', 'watcher', 'result'))
+    for benchmark in benchmarks:
+        unit = BENCH_FUNCS[benchmark][1]
+        for name, watcher_class in watchers:
+            value = run(watcher_class, benchmark, args)
+            records.append({'benchmark': benchmark,
+                            'watcher': name,
+                            'value': value,
+                            'unit': unit})
+            change = ''
+            if reference is not None:
+                change = format_change(unit, value,
+                                       reference.get((benchmark, name)))
+            print('%-10s %-8s %12.1f %-11s%s'
+                  % (benchmark, name, value, unit, change))
+            sys.stdout.flush()
+
+    if args.json:
+        metadata = {
+            'date': datetime.datetime.utcnow().isoformat(),
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'revision': git_revision(),
+            'count': args.count,
+            'fanout': args.fanout,
+            'size_mb': args.size,
+            'repeat': args.repeat,
+        }
+        with open(args.json, 'w') as fp:
+            json.dump({'metadata': metadata, 'results': records}, fp,
+                      indent=2, sort_keys=True)
+        print('Results written into %s' % args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark the steps per second of tasks.
+
+Each benchmark runs --tasks tasks concurrently, each task yielding --count
+times one kind of object to the Task:
+
+- bare: bare yield, "yield None"
+- future: trollius Future, completed by call_soon()
+- asyncio_future: asyncio Future, completed by call_soon() (if asyncio is
+  available)
+- coroutine: nested coroutine which does not block
+- lock: Lock in a "with (yield From(lock))" block
+
+Measured: task steps per second.
+
+Examples::
+
+    python benchmarks/bench_task_step.py
+    python benchmarks/bench_task_step.py --benchmarks future,coroutine
+    python benchmarks/bench_task_step.py --json results.json
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+
+import trollius
+from trollius import From
+from trollius import events
+from trollius.time_monotonic import time_monotonic
+
+
+BENCHMARKS = ('bare', 'future', 'asyncio_future', 'coroutine', 'lock')
+
+ARGS = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+ARGS.add_argument(
+    '--benchmarks', action='store', dest='benchmarks',
+    default=','.join(BENCHMARKS),
+    help='Comma-separated benchmarks (default: %(default)s)')
+ARGS.add_argument(
+    '--count', action='store', dest='count', default=20000, type=int,
+    help='Number of yields per task (default: %(default)s)')
+ARGS.add_argument(
+    '--tasks', action='store', dest='tasks', default=10, type=int,
+    help='Number of concurrent tasks (default: %(default)s)')
+ARGS.add_argument(
+    '--repeat', action='store', dest='repeat', default=3, type=int,
+    help='Number of runs, the best one is kept (default: %(default)s)')
+ARGS.add_argument(
+    '--json', action='store', dest='json', default=None,
+    help='Write the results as JSON into this file')
+
+
+@trollius.coroutine
+def bench_bare(loop, count):
+    for i in range(count):
+        yield None
+
+
+@trollius.coroutine
+def bench_future(loop, count):
+    for i in range(count):
+        fut = trollius.Future(loop=loop)
+        loop.call_soon(fut.set_result, None)
+        yield From(fut)
+
+
+@trollius.coroutine
+def bench_asyncio_future(loop, count):
+    for i in range(count):
+        fut = events.asyncio.Future(loop=loop)
+        loop.call_soon(fut.set_result, None)
+        yield From(fut)
+
+
+@trollius.coroutine
+def nested():
+    raise trollius.Return(1)
+
+
+@trollius.coroutine
+def bench_coroutine(loop, count):
+    for i in range(count):
+        yield From(nested())
+
+
+@trollius.coroutine
+def bench_lock(loop, count):
+    lock = trollius.Lock(loop=loop)
+    for i in range(count):
+        with (yield From(lock)):
+            pass
+
+
+BENCH_FUNCS = {
+    'bare': bench_bare,
+    'future': bench_future,
+    'asyncio_future': bench_asyncio_future,
+    'coroutine': bench_coroutine,
+    'lock': bench_lock,
+}
+
+
+def bench(benchmark, args):
+    """Return the best rate in steps per second."""
+    func = BENCH_FUNCS[benchmark]
+    best = None
+    for run in range(args.repeat):
+        loop = trollius.new_event_loop()
+        try:
+            coros = [func(loop, args.count) for i in range(args.tasks)]
+            t0 = time_monotonic()
+            loop.run_until_complete(trollius.wait(coros, loop=loop))
+            dt = time_monotonic() - t0
+        finally:
+            loop.close()
+        rate = args.count * args.tasks / dt
+        if best is None or rate > best:
+            best = rate
+    return best
+
+
+def main():
+    args = ARGS.parse_args()
+    benchmarks = args.benchmarks.split(',')
+    for benchmark in benchmarks:
+        if benchmark not in BENCH_FUNCS:
+            ARGS.error('unknown benchmark: %s' % benchmark)
+    if 'asyncio_future' in benchmarks and events.asyncio is None:
+        print('asyncio is not available: skip asyncio_future')
+        benchmarks.remove('asyncio_future')
+
+    records = []
+    print('%-15s %20s' % ('benchmark', 'result'))
+    for benchmark in benchmarks:
+        rate = bench(benchmark, args)
+        records.append({'benchmark': benchmark,
+                        'value': rate,
+                        'unit': 'steps/s'})
+        print('%-15s %12.0f steps/s' % (benchmark, rate))
+        sys.stdout.flush()
+
+    if args.json:
+        metadata = {
+            'date': datetime.datetime.utcnow().isoformat(),
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'count': args.count,
+            'tasks': args.tasks,
+            'repeat': args.repeat,
+        }
+        with open(args.json, 'w') as fp:
+            json.dump({'metadata': metadata, 'results': records}, fp,
+                      indent=2, sort_keys=True)
+        print('Results written into %s' % args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -83,6 +83,22 @@ class AsyncioTests(test_utils.TestCase):
         finally:
             trollius.coroutines._DEBUG = old_debug
 
+    def test_yield_future(self):
+        class Fut(asyncio.Future):
+            pass
+
+        @trollius.coroutine
+        def wait_for_future(future):
+            result = yield From(future)
+            raise Return(result)
+
+        # run twice: the second time, the kind of the future is cached
+        for future_class in (asyncio.Future, asyncio.Future, Fut, Fut):
+            future = future_class(loop=self.loop)
+            self.loop.call_soon(future.set_result, "asyncio.Future")
+            result = self.loop.run_until_complete(wait_for_future(future))
+            self.assertEqual(result, "asyncio.Future")
+
     def test_async(self):
         fut = asyncio.Future()
         self.assertIs(fut._loop, self.loop)
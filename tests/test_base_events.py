@@ -55,6 +55,23 @@ class BaseEventLoopTests(test_utils.TestCase):
             self.loop._make_write_pipe_transport, m, m)
         gen = self.loop._make_subprocess_transport(m, m, m, m, m, m, m)
         self.assertRaises(NotImplementedError, next, iter(gen))
+        self.assertRaises(
+            NotImplementedError, self.loop._pause_serving, m)
+        self.assertRaises(
+            NotImplementedError, self.loop._set_idle_timeout, m, m)
+
+    def test_idle_timeout_not_supported(self):
+        # the error is raised before connecting or binding sockets
+        self.loop.getaddrinfo = mock.Mock()
+        self.loop.sock_connect = mock.Mock()
+        coro = self.loop.create_connection(asyncio.Protocol, 'host', 80,
+                                           idle_timeout=10)
+        self.assertRaises(NotImplementedError, next, iter(coro))
+        coro = self.loop.create_server(asyncio.Protocol, '127.0.0.1', 0,
+                                       idle_timeout=10)
+        self.assertRaises(NotImplementedError, next, iter(coro))
+        self.assertFalse(self.loop.getaddrinfo.called)
+        self.assertFalse(self.loop.sock_connect.called)
 
     def test_close(self):
         self.assertFalse(self.loop.is_closed())
@@ -763,6 +780,88 @@ class MyDatagramProto(asyncio.DatagramProtocol):
             self.done.set_result(None)
 
 
+class RelayTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+        if sys.platform != 'win32':
+            # test the copy in user space, the splice() path is tested
+            # by test_unix_events
+            patcher = mock.patch('trollius.unix_events._splice', None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def connect(self):
+        sock, peer = test_utils.socketpair()
+        peer.setblocking(False)
+        self.addCleanup(peer.close)
+        transport, protocol = self.loop.run_until_complete(
+            self.loop.create_connection(asyncio.Protocol, sock=sock))
+        return transport, peer
+
+    def recv(self, sock, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.loop.run_until_complete(
+                self.loop.sock_recv(sock, size - len(data)))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def test_relay(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        done = self.loop.relay(tr_a, tr_b)
+
+        self.loop.run_until_complete(self.loop.sock_sendall(peer_a, b'ping'))
+        self.assertEqual(self.recv(peer_b, 4), b'ping')
+        self.loop.run_until_complete(self.loop.sock_sendall(peer_b, b'pong'))
+        self.assertEqual(self.recv(peer_a, 4), b'pong')
+
+        # end of file is forwarded
+        peer_a.shutdown(socket.SHUT_WR)
+        self.assertEqual(self.recv(peer_b, 1), b'')
+        self.assertFalse(done.done())
+
+        self.loop.run_until_complete(self.loop.sock_sendall(peer_b, b'end'))
+        peer_b.shutdown(socket.SHUT_WR)
+        self.assertEqual(self.recv(peer_a, 10), b'end')
+        self.assertIsNone(self.loop.run_until_complete(done))
+
+    def test_relay_flow_control(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        tr_b.set_write_buffer_limits(high=1024)
+        done = self.loop.relay(tr_a, tr_b)
+
+        # peer_b doesn't read: reading from tr_a is paused
+        data = b'x' * (4 * 1024 * 1024)
+        send = self.loop.sock_sendall(peer_a, data)
+        test_utils.run_until(self.loop, lambda: tr_a._paused)
+        self.assertFalse(send.done())
+
+        self.assertEqual(self.recv(peer_b, len(data)), data)
+        self.assertFalse(tr_a._paused)
+        self.loop.run_until_complete(send)
+
+        done.cancel()
+        test_utils.run_briefly(self.loop)
+        self.assertTrue(tr_a._closing)
+        self.assertTrue(tr_b._closing)
+
+    def test_relay_connection_lost(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        done = self.loop.relay(tr_a, tr_b)
+
+        # closing one side closes the other side
+        tr_a.abort()
+        self.assertIsNone(self.loop.run_until_complete(done))
+        self.assertEqual(self.recv(peer_b, 1), b'')
+
+
 class BaseEventLoopWithSelectorTests(test_utils.TestCase):
 
     def setUp(self):
@@ -1188,6 +1287,131 @@ class BaseEventLoopWithSelectorTests(test_utils.TestCase):
                                                 mock.ANY,
                                                 MyProto, sock, None, None)
 
+    def test_server_invalid_limits(self):
+        self.assertRaises(ValueError, base_events.Server, self.loop, [],
+                          max_connections=0)
+        self.assertRaises(ValueError, base_events.Server, self.loop, [],
+                          accept_pause_threshold=0)
+
+    def _connect_clients(self, server, count):
+        addr = server.sockets[0].getsockname()
+        clients = []
+        for i in range(count):
+            client = socket.socket()
+            self.addCleanup(client.close)
+            client.connect(addr)
+            clients.append(client)
+        return clients
+
+    def test_create_server_accept_pause_threshold(self):
+        protocols = []
+
+        def factory():
+            proto = MyProto()
+            protocols.append(proto)
+            return proto
+
+        server = self.loop.run_until_complete(
+            self.loop.create_server(factory, '127.0.0.1', 0,
+                                    accept_pause_threshold=4))
+        self.addCleanup(server.close)
+        self.assertFalse(server.accept_paused)
+
+        # the 5th client waits in the listen backlog
+        self._connect_clients(server, 5)
+        test_utils.run_until(self.loop, lambda: len(protocols) == 4)
+        test_utils.run_briefly(self.loop)
+        self.assertTrue(server.accept_paused)
+        self.assertEqual(server.active_count, 4)
+        self.assertEqual(len(protocols), 4)
+
+        # accept again when the number of connections drops to 3
+        protocols[0].transport.close()
+        test_utils.run_until(self.loop, lambda: len(protocols) == 5)
+        self.assertTrue(server.accept_paused)
+        self.assertEqual(server.active_count, 4)
+
+        protocols[1].transport.close()
+        protocols[2].transport.close()
+        test_utils.run_briefly(self.loop)
+        self.assertFalse(server.accept_paused)
+        self.assertEqual(server.active_count, 2)
+        self.assertEqual(server.rejected_count, 0)
+
+        for proto in protocols[3:]:
+            proto.transport.close()
+        test_utils.run_briefly(self.loop)
+
+    def test_create_server_max_connections(self):
+        protocols = []
+
+        def factory():
+            proto = MyProto()
+            protocols.append(proto)
+            return proto
+
+        server = self.loop.run_until_complete(
+            self.loop.create_server(factory, '127.0.0.1', 0,
+                                    max_connections=1,
+                                    accept_pause_threshold=10))
+        self.addCleanup(server.close)
+
+        clients = self._connect_clients(server, 2)
+        test_utils.run_until(self.loop, lambda: server.rejected_count == 1)
+        self.assertEqual(server.active_count, 1)
+        self.assertEqual(len(protocols), 1)
+        self.assertFalse(server.accept_paused)
+
+        # the rejected connection was closed
+        clients[1].settimeout(5.0)
+        self.assertEqual(clients[1].recv(1), b'')
+
+        protocols[0].transport.close()
+        test_utils.run_briefly(self.loop)
+        self.assertEqual(server.active_count, 0)
+
+    def _idle_protocol(self, protocols):
+        loop = self.loop
+
+        class IdleProto(asyncio.Protocol):
+            def __init__(self):
+                self.done = asyncio.Future(loop=loop)
+                protocols.append(self)
+
+            def connection_lost(self, exc):
+                self.done.set_result(exc)
+
+        return IdleProto
+
+    def test_create_server_idle_timeout(self):
+        protocols = []
+        server = self.loop.run_until_complete(
+            self.loop.create_server(self._idle_protocol(protocols),
+                                    '127.0.0.1', 0, idle_timeout=0.05))
+        self.addCleanup(server.close)
+
+        self._connect_clients(server, 1)
+        test_utils.run_until(self.loop, lambda: protocols)
+        self.assertIsNone(self.loop.run_until_complete(protocols[0].done))
+        self.assertEqual(server.active_count, 0)
+
+    def test_create_connection_idle_timeout(self):
+        server = self.loop.run_until_complete(
+            self.loop.create_server(asyncio.Protocol, '127.0.0.1', 0))
+        self.addCleanup(server.close)
+        host, port = server.sockets[0].getsockname()
+
+        self.assertRaises(
+            ValueError, self.loop.run_until_complete,
+            self.loop.create_connection(asyncio.Protocol, host, port,
+                                        idle_timeout=0))
+
+        protocols = []
+        self.loop.run_until_complete(
+            self.loop.create_connection(self._idle_protocol(protocols),
+                                        host, port, idle_timeout=0.05))
+        self.assertIsNone(self.loop.run_until_complete(protocols[0].done))
+
     def test_call_coroutine(self):
         @asyncio.coroutine
         def simple_coroutine():
@@ -1923,6 +1923,15 @@ else:
             def create_event_loop(self):
                 return asyncio.SelectorEventLoop(selectors.EpollSelector())
 
+    if hasattr(selectors, 'EdgeTriggeredEpollSelector'):
+        class EdgeTriggeredEPollEventLoopTests(UnixEventLoopTestsMixin,
+                                               SubprocessTestsMixin,
+                                               test_utils.TestCase):
+
+            def create_event_loop(self):
+                return asyncio.SelectorEventLoop(
+                    selectors.EdgeTriggeredEpollSelector())
+
     if hasattr(selectors, 'PollSelector'):
         class PollEventLoopTests(UnixEventLoopTestsMixin,
                                  SubprocessTestsMixin,
@@ -1931,6 +1940,152 @@ else:
             def create_event_loop(self):
                 return asyncio.SelectorEventLoop(selectors.PollSelector())
 
+    class UnixProactorEventLoopTests(EventLoopTestsMixin,
+                                     test_utils.TestCase):
+
+        def create_event_loop(self):
+            return asyncio.SelectorProactorEventLoop()
+
+        if not sslproto._is_sslproto_available():
+            def test_create_ssl_connection(self):
+                raise unittest.SkipTest("need python 3.5 (ssl.MemoryBIO)")
+
+            def test_create_server_ssl(self):
+                raise unittest.SkipTest("need python 3.5 (ssl.MemoryBIO)")
+
+            def test_create_server_ssl_verify_failed(self):
+                raise unittest.SkipTest("need python 3.5 (ssl.MemoryBIO)")
+
+            def test_create_server_ssl_match_failed(self):
+                raise unittest.SkipTest("need python 3.5 (ssl.MemoryBIO)")
+
+            def test_create_server_ssl_verified(self):
+                raise unittest.SkipTest("need python 3.5 (ssl.MemoryBIO)")
+
+        def test_legacy_create_ssl_connection(self):
+            raise unittest.SkipTest("ProactorEventLoop incompatible with "
+                                    "legacy SSL")
+
+        def test_legacy_create_server_ssl(self):
+            raise unittest.SkipTest("ProactorEventLoop incompatible with "
+                                    "legacy SSL")
+
+        def test_legacy_create_server_ssl_verify_failed(self):
+            raise unittest.SkipTest("ProactorEventLoop incompatible with "
+                                    "legacy SSL")
+
+        def test_legacy_create_server_ssl_match_failed(self):
+            raise unittest.SkipTest("ProactorEventLoop incompatible with "
+                                    "legacy SSL")
+
+        def test_legacy_create_server_ssl_verified(self):
+            raise unittest.SkipTest("ProactorEventLoop incompatible with "
+                                    "legacy SSL")
+
+        def test_reader_callback(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_reader()")
+
+        def test_reader_callback_cancel(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_reader()")
+
+        def test_writer_callback(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_writer()")
+
+        def test_writer_callback_cancel(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_writer()")
+
+        def test_create_datagram_endpoint(self):
+            raise unittest.SkipTest(
+                "ProactorEventLoop does not have create_datagram_endpoint()")
+
+        def test_remove_fds_after_closing(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_reader()")
+
+        def test_add_signal_handler(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_signal_handler()")
+
+        def test_signal_handling_args(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_signal_handler()")
+
+        def test_signal_handling_while_selecting(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "add_signal_handler()")
+
+        def test_create_unix_connection(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_connection()")
+
+        def test_create_unix_server(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_create_unix_server_path_socket_error(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_create_ssl_unix_connection(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_connection()")
+
+        def test_legacy_create_ssl_unix_connection(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_connection()")
+
+        def test_create_unix_server_ssl(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_legacy_create_unix_server_ssl(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_create_unix_server_ssl_verify_failed(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_legacy_create_unix_server_ssl_verify_failed(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_create_unix_server_ssl_verified(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_legacy_create_unix_server_ssl_verified(self):
+            raise unittest.SkipTest("ProactorEventLoop does not have "
+                                    "create_unix_server()")
+
+        def test_write_pipe(self):
+            raise unittest.SkipTest("the test expects write() to write "
+                                    "synchronously")
+
+        def test_write_pty(self):
+            raise unittest.SkipTest("the test expects write() to write "
+                                    "synchronously")
+
+    def _has_io_uring():
+        try:
+            proactor = asyncio.IoUringProactor()
+        except OSError:
+            return False
+        proactor.close()
+        return True
+
+    @unittest.skipUnless(_has_io_uring(), 'io_uring is not available')
+    class IoUringEventLoopTests(UnixProactorEventLoopTests):
+
+        def create_event_loop(self):
+            loop = asyncio.IoUringEventLoop()
+            self.assertIsInstance(loop._proactor, asyncio.IoUringProactor)
+            return loop
+
     # Should always exist.
     class SelectEventLoopTests(UnixEventLoopTestsMixin,
                                SubprocessTestsMixin,
@@ -298,7 +298,7 @@ class EventTests(test_utils.TestCase):
 
         ev.set()
         test_utils.run_briefly(self.loop, 2)
-        self.assertEqual([1, 2, 3], result)
+        self.assertEqual([3, 1, 2], result)
 
         self.assertTrue(t1.done())
         self.assertIsNone(t1.result())
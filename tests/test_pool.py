@@ -0,0 +1,214 @@
+"""Tests for pool.py"""
+
+import unittest
+
+import trollius as asyncio
+from trollius import From, Return
+from trollius import test_utils
+from trollius.test_utils import mock
+
+
+class EchoProtocol(asyncio.Protocol):
+
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.transports.append(transport)
+
+    def data_received(self, data):
+        self.transport.write(data)
+
+
+class ConnectionPoolTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+        self.transports = []
+        self.server = self.loop.run_until_complete(
+            self.loop.create_server(lambda: EchoProtocol(self),
+                                    '127.0.0.1', 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def tearDown(self):
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        for transport in self.transports:
+            transport.close()
+        test_utils.run_briefly(self.loop)
+        super(ConnectionPoolTests, self).tearDown()
+
+    def new_pool(self, **kw):
+        pool = asyncio.ConnectionPool(loop=self.loop, **kw)
+        self.addCleanup(pool.close)
+        return pool
+
+    def acquire(self, pool):
+        return self.loop.run_until_complete(
+            pool.acquire('127.0.0.1', self.port))
+
+    def test_reuse(self):
+        pool = self.new_pool()
+        conn = self.acquire(pool)
+        self.assertEqual(conn.key, ('127.0.0.1', self.port, None))
+        conn.writer.write(b'ping\n')
+        line = self.loop.run_until_complete(conn.reader.readline())
+        self.assertEqual(line, b'ping\n')
+        pool.release(conn)
+
+        self.assertIs(self.acquire(pool), conn)
+        stats = pool.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertEqual(stats['open'], 1)
+        self.assertEqual(stats['idle'], 0)
+        self.assertEqual(len(self.transports), 1)
+
+    def test_release_not_in_use(self):
+        pool = self.new_pool()
+        conn = self.acquire(pool)
+        pool.release(conn)
+        self.assertRaises(RuntimeError, pool.release, conn)
+
+    def test_discard(self):
+        pool = self.new_pool()
+        conn = self.acquire(pool)
+        pool.release(conn, discard=True)
+        self.assertTrue(conn.writer.transport._closing)
+        self.assertIsNot(self.acquire(pool), conn)
+        self.assertEqual(pool.get_stats()['misses'], 2)
+
+    def test_stale_connection(self):
+        pool = self.new_pool()
+        conn = self.acquire(pool)
+        pool.release(conn)
+
+        # the server closes the idle connection
+        self.transports[0].close()
+        test_utils.run_until(self.loop, lambda: conn.reader.at_eof())
+
+        self.assertIsNot(self.acquire(pool), conn)
+        self.assertEqual(pool.get_stats()['open'], 1)
+
+    def test_unexpected_data(self):
+        pool = self.new_pool()
+        conn = self.acquire(pool)
+        pool.release(conn)
+
+        self.transports[0].write(b'garbage')
+        test_utils.run_until(self.loop, lambda: conn.reader._buffer)
+
+        self.assertIsNot(self.acquire(pool), conn)
+
+    def test_idle_timeout(self):
+        pool = self.new_pool(idle_timeout=0.01)
+        conn = self.acquire(pool)
+        pool.release(conn)
+        test_utils.run_until(self.loop,
+                             lambda: not pool.get_stats()['open'])
+        self.assertTrue(conn.writer.transport._closing)
+
+    def test_max_per_key(self):
+        pool = self.new_pool(max_per_key=1)
+        conn = self.acquire(pool)
+
+        @asyncio.coroutine
+        def acquire():
+            conn = yield From(pool.acquire('127.0.0.1', self.port))
+            raise Return(conn)
+
+        task = asyncio.Task(acquire(), loop=self.loop)
+        test_utils.run_briefly(self.loop)
+        self.assertFalse(task.done())
+
+        pool.release(conn)
+        self.assertIs(self.loop.run_until_complete(task), conn)
+        stats = pool.get_stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreaterEqual(stats['wait_time'], 0.0)
+
+    def test_max_total_closes_idle(self):
+        pool = self.new_pool(max_total=1)
+        conn = self.acquire(pool)
+        pool.release(conn)
+
+        conn2 = self.loop.run_until_complete(
+            pool.acquire('localhost', self.port))
+        self.assertTrue(conn.writer.transport._closing)
+        self.assertEqual(conn2.key, ('localhost', self.port, None))
+        self.assertEqual(pool.get_stats()['open'], 1)
+
+    def test_close_oldest_idle(self):
+        pool = self.new_pool()
+        conn = self.acquire(pool)
+        conn2 = self.loop.run_until_complete(
+            pool.acquire('localhost', self.port))
+        with mock.patch.object(self.loop, 'time', return_value=10.0):
+            pool.release(conn2)
+        with mock.patch.object(self.loop, 'time', return_value=20.0):
+            pool.release(conn)
+
+        # the connection idle for the longest time is closed
+        self.assertTrue(pool._close_oldest_idle())
+        self.assertTrue(conn2.writer.transport._closing)
+        self.assertFalse(conn.writer.transport._closing)
+        self.assertEqual(pool.get_stats()['open'], 1)
+
+    def test_max_total_wait(self):
+        pool = self.new_pool(max_total=1)
+        conn = self.acquire(pool)
+
+        task = asyncio.Task(pool.acquire('localhost', self.port),
+                            loop=self.loop)
+        test_utils.run_briefly(self.loop)
+        self.assertFalse(task.done())
+
+        # the released connection is closed to open a connection to the
+        # other key
+        pool.release(conn)
+        conn2 = self.loop.run_until_complete(task)
+        self.assertEqual(conn2.key, ('localhost', self.port, None))
+        self.assertTrue(conn.writer.transport._closing)
+
+    def test_cancel_waiter(self):
+        pool = self.new_pool(max_per_key=1)
+        conn = self.acquire(pool)
+
+        task1 = asyncio.Task(pool.acquire('127.0.0.1', self.port),
+                             loop=self.loop)
+        task2 = asyncio.Task(pool.acquire('127.0.0.1', self.port),
+                             loop=self.loop)
+        test_utils.run_briefly(self.loop)
+
+        # task1 is woken up but cancelled: task2 gets the connection
+        pool.release(conn)
+        task1.cancel()
+        self.assertIs(self.loop.run_until_complete(task2), conn)
+        self.assertTrue(task1.cancelled())
+
+    def test_connect_error(self):
+        pool = self.new_pool()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.assertRaises(OSError, self.acquire, pool)
+        self.assertEqual(pool.get_stats()['open'], 0)
+
+    def test_close(self):
+        pool = self.new_pool()
+        conn1 = self.acquire(pool)
+        conn2 = self.acquire(pool)
+        pool.release(conn1)
+        pool.close()
+        self.assertTrue(conn1.writer.transport._closing)
+        self.assertRaises(RuntimeError, self.acquire, pool)
+
+        pool.release(conn2)
+        self.assertTrue(conn2.writer.transport._closing)
+        self.assertEqual(pool.get_stats()['open'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
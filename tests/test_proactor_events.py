@@ -3,6 +3,7 @@
 import socket
 import unittest
 
+from trollius import base_events
 from trollius import test_utils
 from trollius.proactor_events import BaseProactorEventLoop
 from trollius.proactor_events import _ProactorDuplexPipeTransport
@@ -577,6 +578,34 @@ class BaseProactorEventLoopTests(test_utils.TestCase):
         loop(fut)
         self.assertTrue(self.sock.close.called)
 
+    def test_create_server_limits(self):
+        pf = mock.Mock()
+        call_soon = self.loop.call_soon = mock.Mock()
+        make_tr = self.loop._make_socket_transport = mock.Mock()
+        server = base_events.Server(self.loop, [self.sock], pf,
+                                    max_connections=1,
+                                    accept_pause_threshold=2)
+        server._active_count = 1
+
+        self.loop._start_serving(pf, self.sock, server=server)
+        loop = call_soon.call_args[0][0]
+        loop()
+
+        # max_connections reached: the connection is rejected
+        conn = mock.Mock()
+        fut = mock.Mock()
+        fut.result.return_value = (conn, mock.Mock())
+        loop(fut)
+        self.assertTrue(conn.close.called)
+        self.assertFalse(make_tr.called)
+        self.assertEqual(server.rejected_count, 1)
+        self.assertEqual(self.proactor.accept.call_count, 2)
+
+        # accepting is paused: don't accept the next connection
+        server._accept_paused = True
+        loop(fut)
+        self.assertEqual(self.proactor.accept.call_count, 2)
+
     def test_stop_serving(self):
         sock = mock.Mock()
         self.loop._stop_serving(sock)
@@ -0,0 +1,95 @@
+"""Tests for process_pool.py"""
+
+import operator
+import os
+import sys
+import unittest
+
+import trollius as asyncio
+from trollius import process_pool
+from trollius import test_utils
+
+
+@test_utils.skipIf(sys.platform == 'win32', 'Unix only')
+class ProcessPoolTests(test_utils.TestCase):
+
+    def setUp(self):
+        policy = asyncio.get_event_loop_policy()
+        self.loop = policy.new_event_loop()
+        self.set_event_loop(self.loop)
+
+        watcher = asyncio.SafeChildWatcher()
+        watcher.attach_loop(self.loop)
+        policy.set_child_watcher(watcher)
+        self.addCleanup(policy.set_child_watcher, None)
+        self.pools = []
+
+    def tearDown(self):
+        # wait for the worker processes before tearDown() detaches the child
+        # watcher from the event loop
+        for pool in self.pools:
+            pool.close()
+            self.loop.run_until_complete(pool.wait_closed())
+        super(ProcessPoolTests, self).tearDown()
+
+    def new_pool(self, **kw):
+        pool = asyncio.ProcessPool(loop=self.loop, **kw)
+        self.pools.append(pool)
+        return pool
+
+    def run_job(self, future):
+        return self.loop.run_until_complete(future)
+
+    def test_submit(self):
+        pool = self.new_pool(max_workers=1)
+        self.assertEqual(self.run_job(pool.submit(operator.add, 1, 2)), 3)
+        self.assertEqual(self.run_job(pool.submit(int, '101', base=2)), 5)
+
+    def test_exception(self):
+        pool = self.new_pool(max_workers=1)
+        self.assertRaises(ValueError, self.run_job, pool.submit(int, 'x'))
+
+    def test_unpicklable(self):
+        pool = self.new_pool(max_workers=1)
+        self.assertRaises((process_pool.pickle.PicklingError, AttributeError,
+                           TypeError),
+                          pool.submit, lambda: 1)
+        self.assertFalse(pool._queue)
+
+    def test_many_jobs(self):
+        pool = self.new_pool(max_workers=2, batch_size=8)
+        jobs = [pool.submit(operator.mul, i, 2) for i in range(100)]
+        results = self.run_job(asyncio.gather(*jobs, loop=self.loop))
+        self.assertEqual(results, [i * 2 for i in range(100)])
+        self.assertEqual(len(pool._workers), 2)
+
+    def test_workers_are_kept(self):
+        pool = self.new_pool(max_workers=1)
+        pid = self.run_job(pool.submit(os.getpid))
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(self.run_job(pool.submit(os.getpid)), pid)
+
+    def test_worker_crash(self):
+        pool = self.new_pool(max_workers=1)
+        pid = self.run_job(pool.submit(os.getpid))
+        self.assertRaises(RuntimeError, self.run_job, pool.submit(os._exit, 3))
+
+        # a new worker is started
+        self.assertNotEqual(self.run_job(pool.submit(os.getpid)), pid)
+
+    def test_close(self):
+        pool = self.new_pool(max_workers=1, batch_size=1)
+        running = pool.submit(operator.add, 1, 2)
+        queued = pool.submit(operator.add, 3, 4)
+        test_utils.run_until(self.loop, lambda: pool._workers)
+
+        pool.close()
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(self.run_job(running), 3)
+        self.run_job(pool.wait_closed())
+        self.assertEqual(pool._workers, [])
+        self.assertRaises(RuntimeError, pool.submit, operator.add, 1, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""Tests for resolver.py"""
+
+import socket
+import unittest
+
+import trollius as asyncio
+from trollius import test_utils
+from trollius.test_utils import mock
+
+
+INFOS = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 80))]
+
+
+class FakeResolver(asyncio.AbstractResolver):
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.lookups = []
+        self.closed = False
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        fut = asyncio.Future(loop=self.loop)
+        self.lookups.append(((host, port, family, type, proto, flags), fut))
+        return fut
+
+    def close(self):
+        self.closed = True
+
+
+class CachingResolverTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = self.new_test_loop()
+        self.inner = FakeResolver(self.loop)
+        self.resolver = asyncio.CachingResolver(self.inner, ttl=10.0,
+                                                negative_ttl=1.0, maxsize=2,
+                                                loop=self.loop)
+
+    def resolve(self, host, port=80):
+        fut = self.resolver.getaddrinfo(host, port)
+        if self.inner.lookups and not self.inner.lookups[-1][1].done():
+            self.inner.lookups[-1][1].set_result(INFOS)
+        return self.loop.run_until_complete(fut)
+
+    def test_cache_hit(self):
+        self.assertEqual(self.resolve('example.com'), INFOS)
+        self.assertEqual(self.resolve('example.com'), INFOS)
+        self.assertEqual(len(self.inner.lookups), 1)
+
+    def test_results_are_copies(self):
+        self.resolve('example.com').append(None)
+        self.assertEqual(self.resolve('example.com'), INFOS)
+
+    def test_expiration(self):
+        self.resolve('example.com')
+        self.loop.advance_time(11.0)
+        self.resolve('example.com')
+        self.assertEqual(len(self.inner.lookups), 2)
+
+    def test_lru_eviction(self):
+        self.resolve('a.example.com')
+        self.resolve('b.example.com')
+        # use 'a' so 'b' becomes the least recently used entry
+        self.resolve('a.example.com')
+        self.resolve('c.example.com')
+        self.assertEqual(len(self.inner.lookups), 3)
+
+        self.resolve('a.example.com')
+        self.assertEqual(len(self.inner.lookups), 3)
+        self.resolve('b.example.com')
+        self.assertEqual(len(self.inner.lookups), 4)
+
+    def test_negative_cache(self):
+        fut = self.resolver.getaddrinfo('invalid', 80)
+        self.inner.lookups[0][1].set_exception(
+            socket.gaierror(socket.EAI_NONAME, 'Name or service not known'))
+        self.assertRaises(socket.gaierror,
+                          self.loop.run_until_complete, fut)
+
+        fut = self.resolver.getaddrinfo('invalid', 80)
+        self.assertRaises(socket.gaierror,
+                          self.loop.run_until_complete, fut)
+        self.assertEqual(len(self.inner.lookups), 1)
+
+        self.loop.advance_time(2.0)
+        self.resolver.getaddrinfo('invalid', 80)
+        self.assertEqual(len(self.inner.lookups), 2)
+
+    def test_other_errors_not_cached(self):
+        fut = self.resolver.getaddrinfo('example.com', 80)
+        self.inner.lookups[0][1].set_exception(socket.error('boom'))
+        self.assertRaises(socket.error, self.loop.run_until_complete, fut)
+
+        self.resolver.getaddrinfo('example.com', 80)
+        self.assertEqual(len(self.inner.lookups), 2)
+
+    def test_coalesce_concurrent_lookups(self):
+        fut1 = self.resolver.getaddrinfo('example.com', 80)
+        fut2 = self.resolver.getaddrinfo('example.com', 80)
+        fut3 = self.resolver.getaddrinfo('example.com', 443)
+        self.assertEqual(len(self.inner.lookups), 2)
+
+        fut1.cancel()
+        for key, lookup in self.inner.lookups:
+            lookup.set_result(INFOS)
+        test_utils.run_briefly(self.loop)
+
+        self.assertTrue(fut1.cancelled())
+        self.assertEqual(fut2.result(), INFOS)
+        self.assertEqual(fut3.result(), INFOS)
+        self.assertIsNot(fut2.result(), fut3.result())
+
+    def test_no_ttl(self):
+        resolver = asyncio.CachingResolver(self.inner, ttl=0, loop=self.loop)
+        for i in range(2):
+            fut = resolver.getaddrinfo('example.com', 80)
+            self.inner.lookups[-1][1].set_result(INFOS)
+            self.loop.run_until_complete(fut)
+        self.assertEqual(len(self.inner.lookups), 2)
+
+    def test_close(self):
+        self.resolve('example.com')
+        self.resolver.close()
+        self.assertTrue(self.inner.closed)
+        self.assertEqual(len(self.resolver._cache), 0)
+
+
+class ThreadedResolverTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+
+    def test_getaddrinfo(self):
+        resolver = asyncio.ThreadedResolver(max_workers=1, loop=self.loop)
+        self.addCleanup(resolver.close)
+        infos = self.loop.run_until_complete(
+            resolver.getaddrinfo('127.0.0.1', 80,
+                                 type=socket.SOCK_STREAM))
+        self.assertEqual(infos,
+                         socket.getaddrinfo('127.0.0.1', 80,
+                                            0, socket.SOCK_STREAM))
+        self.assertIsNot(resolver._executor, self.loop._default_executor)
+
+    def test_loop_set_resolver(self):
+        resolver = mock.Mock()
+        self.assertIsNone(self.loop.get_resolver())
+        self.loop.set_resolver(resolver)
+        self.assertIs(self.loop.get_resolver(), resolver)
+
+        self.loop.getaddrinfo('example.com', 80)
+        resolver.getaddrinfo.assert_called_with('example.com', 80,
+                                                0, 0, 0, 0)
+        self.loop.getnameinfo(('127.0.0.1', 80))
+        resolver.getnameinfo.assert_called_with(('127.0.0.1', 80), 0)
+
+        self.loop.close()
+        self.assertTrue(resolver.close.called)
+        self.assertIsNone(self.loop.get_resolver())
+
+
+if __name__ == '__main__':
+    unittest.main()
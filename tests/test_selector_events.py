@@ -18,6 +18,8 @@ from trollius.py33_exceptions import (
 from trollius import selectors
 from trollius import test_utils
 from trollius.selector_events import BaseSelectorEventLoop
+from trollius.selector_events import _FdHandles
+from trollius.selector_events import _IdleSweeper
 from trollius.selector_events import _SelectorDatagramTransport
 from trollius.selector_events import _SelectorSocketTransport
 from trollius.selector_events import _SelectorSslTransport
@@ -512,7 +514,8 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
         self.loop.add_reader(1, cb)
 
         self.assertTrue(self.loop._selector.register.called)
-        fd, mask, (r, w) = self.loop._selector.register.call_args[0]
+        fd, mask, handles = self.loop._selector.register.call_args[0]
+        r, w = handles.reader, handles.writer
         self.assertEqual(1, fd)
         self.assertEqual(selectors.EVENT_READ, mask)
         self.assertEqual(cb, r._callback)
@@ -521,38 +524,50 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
     def test_add_reader_existing(self):
         reader = mock.Mock()
         writer = mock.Mock()
+        handles = _FdHandles(reader, writer)
         self.loop._selector.get_key.return_value = selectors.SelectorKey(
-            1, 1, selectors.EVENT_WRITE, (reader, writer))
+            1, 1, selectors.EVENT_WRITE, handles)
         cb = lambda: True
         self.loop.add_reader(1, cb)
 
         self.assertTrue(reader.cancel.called)
         self.assertFalse(self.loop._selector.register.called)
-        self.assertTrue(self.loop._selector.modify.called)
-        fd, mask, (r, w) = self.loop._selector.modify.call_args[0]
-        self.assertEqual(1, fd)
-        self.assertEqual(selectors.EVENT_WRITE | selectors.EVENT_READ, mask)
+        # the handles are replaced in place, the event mask is updated
+        # before the next select() call
+        self.assertFalse(self.loop._selector.modify.called)
+        self.assertEqual({1}, self.loop._interest_changes)
+        r, w = handles.reader, handles.writer
         self.assertEqual(cb, r._callback)
         self.assertEqual(writer, w)
 
     def test_add_reader_existing_writer(self):
         writer = mock.Mock()
+        handles = _FdHandles(None, writer)
         self.loop._selector.get_key.return_value = selectors.SelectorKey(
-            1, 1, selectors.EVENT_WRITE, (None, writer))
+            1, 1, selectors.EVENT_WRITE, handles)
         cb = lambda: True
         self.loop.add_reader(1, cb)
 
         self.assertFalse(self.loop._selector.register.called)
-        self.assertTrue(self.loop._selector.modify.called)
-        fd, mask, (r, w) = self.loop._selector.modify.call_args[0]
-        self.assertEqual(1, fd)
-        self.assertEqual(selectors.EVENT_WRITE | selectors.EVENT_READ, mask)
+        self.assertFalse(self.loop._selector.modify.called)
+        self.assertEqual({1}, self.loop._interest_changes)
+        r, w = handles.reader, handles.writer
         self.assertEqual(cb, r._callback)
         self.assertEqual(writer, w)
 
+    def test_add_reader_existing_reader(self):
+        reader = mock.Mock()
+        handles = _FdHandles(reader, None)
+        self.loop._selector.get_key.return_value = selectors.SelectorKey(
+            1, 1, selectors.EVENT_READ, handles)
+        self.loop.add_reader(1, lambda: True)
+
+        self.assertTrue(reader.cancel.called)
+        self.assertEqual(set(), self.loop._interest_changes)
+
     def test_remove_reader(self):
         self.loop._selector.get_key.return_value = selectors.SelectorKey(
-            1, 1, selectors.EVENT_READ, (None, None))
+            1, 1, selectors.EVENT_READ, _FdHandles(None, None))
         self.assertFalse(self.loop.remove_reader(1))
 
         self.assertTrue(self.loop._selector.unregister.called)
@@ -560,16 +575,17 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
     def test_remove_reader_read_write(self):
         reader = mock.Mock()
         writer = mock.Mock()
+        handles = _FdHandles(reader, writer)
         self.loop._selector.get_key.return_value = selectors.SelectorKey(
-            1, 1, selectors.EVENT_READ | selectors.EVENT_WRITE,
-            (reader, writer))
+            1, 1, selectors.EVENT_READ | selectors.EVENT_WRITE, handles)
         self.assertTrue(
             self.loop.remove_reader(1))
 
         self.assertFalse(self.loop._selector.unregister.called)
-        self.assertEqual(
-            (1, selectors.EVENT_WRITE, (None, writer)),
-            self.loop._selector.modify.call_args[0])
+        self.assertFalse(self.loop._selector.modify.called)
+        self.assertIsNone(handles.reader)
+        self.assertEqual(writer, handles.writer)
+        self.assertEqual({1}, self.loop._interest_changes)
 
     def test_remove_reader_unknown(self):
         self.loop._selector.get_key.side_effect = KeyError
@@ -582,7 +598,8 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
         self.loop.add_writer(1, cb)
 
         self.assertTrue(self.loop._selector.register.called)
-        fd, mask, (r, w) = self.loop._selector.register.call_args[0]
+        fd, mask, handles = self.loop._selector.register.call_args[0]
+        r, w = handles.reader, handles.writer
         self.assertEqual(1, fd)
         self.assertEqual(selectors.EVENT_WRITE, mask)
         self.assertIsNone(r)
@@ -591,23 +608,23 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
     def test_add_writer_existing(self):
         reader = mock.Mock()
         writer = mock.Mock()
+        handles = _FdHandles(reader, writer)
         self.loop._selector.get_key.return_value = selectors.SelectorKey(
-            1, 1, selectors.EVENT_READ, (reader, writer))
+            1, 1, selectors.EVENT_READ, handles)
         cb = lambda: True
         self.loop.add_writer(1, cb)
 
         self.assertTrue(writer.cancel.called)
         self.assertFalse(self.loop._selector.register.called)
-        self.assertTrue(self.loop._selector.modify.called)
-        fd, mask, (r, w) = self.loop._selector.modify.call_args[0]
-        self.assertEqual(1, fd)
-        self.assertEqual(selectors.EVENT_WRITE | selectors.EVENT_READ, mask)
+        self.assertFalse(self.loop._selector.modify.called)
+        self.assertEqual({1}, self.loop._interest_changes)
+        r, w = handles.reader, handles.writer
         self.assertEqual(reader, r)
         self.assertEqual(cb, w._callback)
 
     def test_remove_writer(self):
         self.loop._selector.get_key.return_value = selectors.SelectorKey(
-            1, 1, selectors.EVENT_WRITE, (None, None))
+            1, 1, selectors.EVENT_WRITE, _FdHandles(None, None))
         self.assertFalse(self.loop.remove_writer(1))
 
         self.assertTrue(self.loop._selector.unregister.called)
@@ -615,22 +632,128 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
     def test_remove_writer_read_write(self):
         reader = mock.Mock()
         writer = mock.Mock()
+        handles = _FdHandles(reader, writer)
         self.loop._selector.get_key.return_value = selectors.SelectorKey(
-            1, 1, selectors.EVENT_READ | selectors.EVENT_WRITE,
-            (reader, writer))
+            1, 1, selectors.EVENT_READ | selectors.EVENT_WRITE, handles)
         self.assertTrue(
             self.loop.remove_writer(1))
 
         self.assertFalse(self.loop._selector.unregister.called)
-        self.assertEqual(
-            (1, selectors.EVENT_READ, (reader, None)),
-            self.loop._selector.modify.call_args[0])
+        self.assertFalse(self.loop._selector.modify.called)
+        self.assertEqual(reader, handles.reader)
+        self.assertIsNone(handles.writer)
+        self.assertEqual({1}, self.loop._interest_changes)
 
     def test_remove_writer_unknown(self):
         self.loop._selector.get_key.side_effect = KeyError
         self.assertFalse(
             self.loop.remove_writer(1))
 
+    def test_apply_interest_changes(self):
+        reader = mock.Mock()
+        writer = mock.Mock()
+        handles = _FdHandles(reader, writer)
+        self.loop._selector.get_key.return_value = selectors.SelectorKey(
+            1, 1, selectors.EVENT_READ, handles)
+        self.loop._interest_changes.add(1)
+        self.loop._apply_interest_changes()
+
+        self.loop._selector.modify.assert_called_with(
+            1, selectors.EVENT_READ | selectors.EVENT_WRITE, handles)
+        self.assertEqual(set(), self.loop._interest_changes)
+
+    def test_apply_interest_changes_error(self):
+        reader = mock.Mock()
+        writer = mock.Mock()
+        self.loop._selector.get_key.return_value = selectors.SelectorKey(
+            1, 1, selectors.EVENT_READ, _FdHandles(reader, writer))
+        self.loop._selector.modify.side_effect = OSError(errno.EBADF, 'bad')
+        self.loop._interest_changes.add(1)
+        self.loop._add_callback = mock.Mock()
+        self.loop._apply_interest_changes()
+
+        # the file descriptor is unregistered and its callbacks are called
+        # to get the error
+        self.loop._selector.unregister.assert_called_with(1)
+        self.assertEqual(
+            [mock.call(reader), mock.call(writer)],
+            self.loop._add_callback.call_args_list)
+        self.assertEqual(set(), self.loop._interest_changes)
+
+    def test_interest_changes_merged(self):
+        loop = asyncio.SelectorEventLoop(selectors.SelectSelector())
+        self.addCleanup(loop.close)
+        rsock, wsock = test_utils.socketpair()
+        self.addCleanup(rsock.close)
+        self.addCleanup(wsock.close)
+        selector = loop._selector
+        loop.add_reader(wsock.fileno(), lambda: None)
+
+        with mock.patch.object(selector, 'modify',
+                               wraps=selector.modify) as modify:
+            # add_writer() followed by remove_writer() is a no-op
+            loop.add_writer(wsock.fileno(), lambda: None)
+            loop.remove_writer(wsock.fileno())
+            loop._apply_interest_changes()
+            events = [call[0][1] for call in modify.call_args_list]
+            self.assertNotIn(selectors.EVENT_READ | selectors.EVENT_WRITE,
+                             events)
+            self.assertEqual(selectors.EVENT_READ,
+                             selector.get_key(wsock.fileno()).events)
+
+            loop.add_writer(wsock.fileno(), lambda: None)
+            self.assertEqual(selectors.EVENT_READ,
+                             selector.get_key(wsock.fileno()).events)
+            loop._apply_interest_changes()
+            self.assertEqual(selectors.EVENT_READ | selectors.EVENT_WRITE,
+                             selector.get_key(wsock.fileno()).events)
+
+        # removing the last callback unregisters immediately
+        loop.remove_reader(wsock.fileno())
+        loop.remove_writer(wsock.fileno())
+        self.assertRaises(KeyError, selector.get_key, wsock.fileno())
+        self.assertEqual(set(), loop._interest_changes)
+
+    @unittest.skipUnless(hasattr(selectors, 'EpollSelector'),
+                         'need selectors.EpollSelector')
+    def test_select_fused_dispatch(self):
+        loop = asyncio.SelectorEventLoop(selectors.EpollSelector())
+        self.addCleanup(loop.close)
+        # the fast path is disabled in debug mode (TROLLIUSDEBUG=1)
+        loop.set_debug(False)
+        self.assertTrue(loop._fused_dispatch)
+        rsock, wsock = test_utils.socketpair()
+        self.addCleanup(rsock.close)
+        self.addCleanup(wsock.close)
+        wsock.send(b'x')
+
+        loop.add_reader(rsock.fileno(), lambda: None)
+        loop.add_writer(wsock.fileno(), lambda: None)
+        reader = loop._selector.get_key(rsock.fileno()).data.reader
+        writer = loop._selector.get_key(wsock.fileno()).data.writer
+        self.assertEqual((), loop._select(0))
+        self.assertEqual({reader, writer}, set(loop._ready))
+
+        # cancelled handles are removed
+        loop._ready.clear()
+        reader.cancel()
+        self.assertEqual((), loop._select(0))
+        self.assertEqual([writer], list(loop._ready))
+        self.assertRaises(KeyError, loop._selector.get_key, rsock.fileno())
+
+        # the debug mode uses select() and _process_events()
+        loop._ready.clear()
+        loop.set_debug(True)
+        event_list = loop._select(0)
+        self.assertEqual([(loop._selector.get_key(wsock.fileno()),
+                           selectors.EVENT_WRITE)], event_list)
+        self.assertEqual(0, len(loop._ready))
+
+    def test_select_no_fused_dispatch(self):
+        loop = asyncio.SelectorEventLoop(selectors.SelectSelector())
+        self.addCleanup(loop.close)
+        self.assertFalse(loop._fused_dispatch)
+
     def test_process_events_read(self):
         reader = mock.Mock()
         reader._cancelled = False
@@ -638,7 +761,7 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
         self.loop._add_callback = mock.Mock()
         self.loop._process_events(
             [(selectors.SelectorKey(
-                1, 1, selectors.EVENT_READ, (reader, None)),
+                1, 1, selectors.EVENT_READ, _FdHandles(reader, None)),
               selectors.EVENT_READ)])
         self.assertTrue(self.loop._add_callback.called)
         self.loop._add_callback.assert_called_with(reader)
@@ -650,7 +773,7 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
         self.loop.remove_reader = mock.Mock()
         self.loop._process_events(
             [(selectors.SelectorKey(
-                1, 1, selectors.EVENT_READ, (reader, None)),
+                1, 1, selectors.EVENT_READ, _FdHandles(reader, None)),
              selectors.EVENT_READ)])
         self.loop.remove_reader.assert_called_with(1)
 
@@ -661,7 +784,7 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
         self.loop._add_callback = mock.Mock()
         self.loop._process_events(
             [(selectors.SelectorKey(1, 1, selectors.EVENT_WRITE,
-                                    (None, writer)),
+                                    _FdHandles(None, writer)),
               selectors.EVENT_WRITE)])
         self.loop._add_callback.assert_called_with(writer)
 
@@ -672,7 +795,7 @@ class BaseSelectorEventLoopTests(test_utils.TestCase):
 
         self.loop._process_events(
             [(selectors.SelectorKey(1, 1, selectors.EVENT_WRITE,
-                                    (None, writer)),
+                                    _FdHandles(None, writer)),
               selectors.EVENT_WRITE)])
         self.loop.remove_writer.assert_called_with(1)
 
@@ -1117,6 +1240,56 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         self.sock.shutdown.assert_called_with(socket.SHUT_WR)
         tr.close()
 
+    def test_idle_timeout(self):
+        tr = self.socket_transport()
+        sweeper = _IdleSweeper(self.loop, 10.0)
+        tr._set_idle_sweeper(sweeper)
+        self.assertEqual(tr._last_activity, self.loop.time())
+
+        # reading data postpones the timeout
+        self.loop.advance_time(6.0)
+        self.sock.recv.return_value = b'data'
+        tr._read_ready()
+        self.loop.advance_time(6.0)
+        sweeper._sweep()
+        self.assertFalse(tr._closing)
+
+        # writing data postpones the timeout
+        self.sock.send.return_value = 4
+        tr.write(b'data')
+        self.loop.advance_time(9.0)
+        sweeper._sweep()
+        self.assertFalse(tr._closing)
+
+        self.loop.advance_time(4.0)
+        sweeper._sweep()
+        self.assertTrue(tr._closing)
+        self.assertEqual(tr._conn_lost, 1)
+        self.assertIsNone(tr._idle_sweeper)
+        self.assertFalse(sweeper._transports)
+        self.assertIsNone(sweeper._handle)
+
+    def test_idle_timeout_buffer(self):
+        tr = self.socket_transport()
+        sweeper = _IdleSweeper(self.loop, 10.0)
+        tr._set_idle_sweeper(sweeper)
+        self.sock.send.side_effect = BlockingIOError
+        tr.write(b'data')
+
+        # the peer doesn't read: don't wait until the buffer is flushed
+        self.loop.advance_time(13.0)
+        sweeper._sweep()
+        self.assertFalse(tr._buffer)
+        self.assertFalse(7 in self.loop.writers)
+        self.assertEqual(tr._conn_lost, 1)
+
+    def test_idle_timeout_connection_lost(self):
+        tr = self.socket_transport()
+        sweeper = _IdleSweeper(self.loop, 10.0)
+        tr._set_idle_sweeper(sweeper)
+        tr._call_connection_lost(None)
+        self.assertFalse(sweeper._transports)
+
 
 @test_utils.skipIf(ssl is None, 'No ssl module')
 class SelectorSslTransportTests(test_utils.TestCase):
@@ -422,6 +422,59 @@ class EpollSelectorTestCase(BaseSelectorTestCase, ScalableSelectorMixIn):
     SELECTOR = getattr(selectors, 'EpollSelector', None)
 
 
+@test_utils.skipUnless(hasattr(selectors, 'EdgeTriggeredEpollSelector'),
+                       "Test needs selectors.EdgeTriggeredEpollSelector")
+class EdgeTriggeredEpollSelectorTestCase(BaseSelectorTestCase,
+                                         ScalableSelectorMixIn):
+
+    SELECTOR = getattr(selectors, 'EdgeTriggeredEpollSelector', None)
+
+    def test_edge_triggered(self):
+        s = self.SELECTOR()
+        self.addCleanup(s.close)
+
+        rd, wr = self.make_socketpair()
+        s.register(rd, selectors.EVENT_READ)
+        wr.send(b'x')
+        self.assertEqual([key.fileobj for key, events in s.select(0)], [rd])
+        # no new notification until new data is received
+        self.assertEqual(s.select(0), [])
+
+        s.set_ready(rd, selectors.EVENT_READ)
+        self.assertEqual([key.fileobj for key, events in s.select(0)], [rd])
+        self.assertEqual(s.select(0), [])
+
+        wr.send(b'y')
+        self.assertEqual([key.fileobj for key, events in s.select(0)], [rd])
+
+    def test_cached_readiness(self):
+        s = self.SELECTOR()
+        self.addCleanup(s.close)
+
+        rd, wr = self.make_socketpair()
+        s.register(wr, selectors.EVENT_READ)
+        self.assertEqual(s.select(0), [])
+
+        # the write notification received while not interested is
+        # returned when the interest is added, without epoll_ctl()
+        s._epoll = mock.Mock(wraps=s._epoll)
+        s.modify(wr, selectors.EVENT_READ | selectors.EVENT_WRITE)
+        self.assertFalse(s._epoll.modify.called)
+        self.assertEqual(s.select(0),
+                         [(s.get_key(wr), selectors.EVENT_WRITE)])
+
+        # removing an event doesn't call epoll_ctl()
+        s.modify(wr, selectors.EVENT_READ)
+        self.assertFalse(s._epoll.modify.called)
+
+        # adding an event which was already returned asks the kernel for
+        # the current state
+        s.modify(wr, selectors.EVENT_READ | selectors.EVENT_WRITE)
+        self.assertTrue(s._epoll.modify.called)
+        self.assertEqual(s.select(0),
+                         [(s.get_key(wr), selectors.EVENT_WRITE)])
+
+
 @test_utils.skipUnless(hasattr(selectors, 'KqueueSelector'),
                        "Test needs selectors.KqueueSelector)")
 class KqueueSelectorTestCase(BaseSelectorTestCase, ScalableSelectorMixIn):
@@ -440,6 +493,7 @@ class DevpollSelectorTestCase(BaseSelectorTestCase, ScalableSelectorMixIn):
 def test_main():
     tests = [DefaultSelectorTestCase, SelectSelectorTestCase,
              PollSelectorTestCase, EpollSelectorTestCase,
+             EdgeTriggeredEpollSelectorTestCase,
              KqueueSelectorTestCase, DevpollSelectorTestCase]
     support.run_unittest(*tests)
     support.reap_children()
@@ -1,9 +1,11 @@
+from trollius import compat
 from trollius import subprocess
 from trollius import test_utils
 import trollius as asyncio
 import os
 import signal
 import sys
+import tempfile
 import unittest
 from trollius import From, Return
 from trollius import test_support as support
@@ -11,6 +13,7 @@ from trollius.test_utils import mock
 from trollius.py33_exceptions import BrokenPipeError, ConnectionResetError
 
 if sys.platform != 'win32':
+    import fcntl
     from trollius import unix_events
 
 
@@ -76,6 +79,297 @@ class SubprocessMixin(object):
         self.assertEqual(exitcode, 0)
         self.assertEqual(stdout, b'some data')
 
+    def test_read_after_exit(self):
+        # The pipes are closed when they are drained, not when the process
+        # exits: the reader is paused, the output left in the pipe must not
+        # be lost
+        code = 'import sys; sys.stdout.write("x" * 50000)'
+
+        @asyncio.coroutine
+        def run():
+            proc = yield From(asyncio.create_subprocess_exec(
+                                          sys.executable, '-c', code,
+                                          stdout=subprocess.PIPE,
+                                          limit=100,
+                                          loop=self.loop))
+            returncode = yield From(proc.wait())
+            output = yield From(proc.stdout.read())
+            raise Return(returncode, output)
+
+        returncode, output = self.loop.run_until_complete(run())
+        self.assertEqual(returncode, 0)
+        self.assertEqual(output, b'x' * 50000)
+
+    def test_communicate_stream_fd(self):
+        data = b'x' * (support.PIPE_MAX_SIZE * 2)
+
+        @asyncio.coroutine
+        def run(output):
+            proc = yield From(asyncio.create_subprocess_exec(
+                                          *PROGRAM_CAT,
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          loop=self.loop))
+            returncode = yield From(proc.communicate_stream(
+                data, stdout=output.fileno(), chunk_size=4096))
+            raise Return(returncode)
+
+        with tempfile.TemporaryFile() as output:
+            returncode = self.loop.run_until_complete(run(output))
+            output.seek(0)
+            self.assertEqual(output.read(), data)
+        self.assertEqual(returncode, 0)
+
+    def test_communicate_stream_callbacks(self):
+        code = '\n'.join((
+            'import sys',
+            'sys.stdout.write("o" * 100000)',
+            'sys.stderr.write("e" * 50000)',
+        ))
+        stdout_chunks = []
+        stderr_chunks = []
+
+        @asyncio.coroutine
+        def write_stderr(data):
+            yield From(asyncio.sleep(0, loop=self.loop))
+            stderr_chunks.append(data)
+
+        @asyncio.coroutine
+        def run():
+            proc = yield From(asyncio.create_subprocess_exec(
+                                          sys.executable, '-c', code,
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          stderr=subprocess.PIPE,
+                                          limit=1000,
+                                          loop=self.loop))
+            returncode = yield From(proc.communicate_stream(
+                stdout=stdout_chunks.append, stderr=write_stderr))
+            raise Return(returncode)
+
+        returncode = self.loop.run_until_complete(run())
+        self.assertEqual(returncode, 0)
+        self.assertEqual(b''.join(stdout_chunks), b'o' * 100000)
+        self.assertEqual(b''.join(stderr_chunks), b'e' * 50000)
+        self.assertLessEqual(max(map(len, stdout_chunks)), 1000)
+        self.assertLessEqual(max(map(len, stderr_chunks)), 1000)
+
+    def test_communicate_stream_input(self):
+        chunks = []
+
+        @asyncio.coroutine
+        def run(input):
+            proc = yield From(asyncio.create_subprocess_exec(
+                                          *PROGRAM_CAT,
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          loop=self.loop))
+            returncode = yield From(proc.communicate_stream(
+                input, stdout=chunks.append))
+            raise Return(returncode)
+
+        # iterable of bytes
+        input = (b'%d,' % i for i in range(10000))
+        self.assertEqual(self.loop.run_until_complete(run(input)), 0)
+        self.assertEqual(b''.join(chunks),
+                         b''.join(b'%d,' % i for i in range(10000)))
+
+        # file descriptor
+        del chunks[:]
+        data = b'y' * 100000
+        with tempfile.TemporaryFile() as input:
+            input.write(data)
+            input.flush()
+            input.seek(0)
+            returncode = self.loop.run_until_complete(run(input.fileno()))
+        self.assertEqual(returncode, 0)
+        self.assertEqual(b''.join(chunks), data)
+
+    @test_utils.skipIf(sys.platform == 'win32', 'need pipe transports')
+    def test_communicate_stream_pipe_fd(self):
+        # the pipes are written and read by the event loop running
+        # communicate_stream(): blocking reads or writes would hang
+        data = b'z' * (support.PIPE_MAX_SIZE * 2)
+        input_rfd, input_wfd = subprocess._make_pipe()
+        output_rfd, output_wfd = subprocess._make_pipe()
+        if not compat.PY3:
+            # file descriptors can be long integers
+            input_rfd, output_wfd = long(input_rfd), long(output_wfd)
+
+        @asyncio.coroutine
+        def feed_input():
+            pipe = os.fdopen(input_wfd, 'wb', 0)
+            transport, protocol = yield From(self.loop.connect_write_pipe(
+                asyncio.Protocol, pipe))
+            transport.write(data)
+            transport.close()
+
+        @asyncio.coroutine
+        def read_output():
+            reader = asyncio.StreamReader(loop=self.loop)
+            pipe = os.fdopen(output_rfd, 'rb', 0)
+            transport, protocol = yield From(self.loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader,
+                                                     loop=self.loop),
+                pipe))
+            output = yield From(reader.read())
+            transport.close()
+            raise Return(output)
+
+        @asyncio.coroutine
+        def run():
+            proc = yield From(asyncio.create_subprocess_exec(
+                                          *PROGRAM_CAT,
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          loop=self.loop))
+            output = asyncio.Task(read_output(), loop=self.loop)
+            yield From(feed_input())
+            returncode = yield From(proc.communicate_stream(
+                input_rfd, stdout=output_wfd, chunk_size=4096))
+            os.close(output_wfd)
+            output = yield From(output)
+            raise Return(returncode, output)
+
+        try:
+            returncode, output = self.loop.run_until_complete(run())
+            self.assertEqual(returncode, 0)
+            self.assertEqual(output, data)
+            # the file descriptors are still blocking
+            flags = fcntl.fcntl(input_rfd, fcntl.F_GETFL)
+            self.assertFalse(flags & os.O_NONBLOCK)
+        finally:
+            os.close(input_rfd)
+
+    def test_communicate_stream_discard(self):
+        @asyncio.coroutine
+        def run():
+            # stdin is closed and the output is discarded
+            proc = yield From(asyncio.create_subprocess_exec(
+                                          *PROGRAM_CAT,
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          loop=self.loop))
+            returncode = yield From(proc.communicate_stream())
+            raise Return(returncode)
+
+        self.assertEqual(self.loop.run_until_complete(run()), 0)
+
+    def test_communicate_stream_errors(self):
+        proc = self.loop.run_until_complete(asyncio.create_subprocess_exec(
+                                          sys.executable, '-c', 'pass',
+                                          stdout=subprocess.PIPE,
+                                          loop=self.loop))
+        try:
+            self.assertRaises(ValueError, self.loop.run_until_complete,
+                              proc.communicate_stream(b'data'))
+            self.assertRaises(ValueError, self.loop.run_until_complete,
+                              proc.communicate_stream(stderr=1))
+            self.assertRaises(TypeError, self.loop.run_until_complete,
+                              proc.communicate_stream(stdout=3.0))
+            self.assertRaises(ValueError, self.loop.run_until_complete,
+                              proc.communicate_stream(chunk_size=0))
+        finally:
+            self.loop.run_until_complete(proc.communicate())
+
+    def test_pipeline_communicate(self):
+        upper = [sys.executable, '-c',
+                 'import sys; sys.stdout.write(sys.stdin.read().upper())']
+
+        @asyncio.coroutine
+        def run(data):
+            pipeline = yield From(asyncio.create_subprocess_pipeline(
+                                          [PROGRAM_CAT, upper, PROGRAM_CAT],
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          loop=self.loop))
+            self.assertEqual(len(pipeline.processes), 3)
+            self.assertIs(pipeline.stdin, pipeline.processes[0].stdin)
+            self.assertIs(pipeline.stdout, pipeline.processes[2].stdout)
+            self.assertIsNone(pipeline.processes[0].stdout)
+            self.assertIsNone(pipeline.processes[1].stdin)
+            stdout, stderr = yield From(pipeline.communicate(data))
+            raise Return(pipeline.returncodes, stdout)
+
+        task = asyncio.wait_for(run(b'some data'), 60.0, loop=self.loop)
+        returncodes, stdout = self.loop.run_until_complete(task)
+        self.assertEqual(returncodes, [0, 0, 0])
+        self.assertEqual(stdout, b'SOME DATA')
+
+    def test_pipeline_large_data(self):
+        data = b'x' * (support.PIPE_MAX_SIZE * 4)
+
+        @asyncio.coroutine
+        def run():
+            pipeline = yield From(asyncio.create_subprocess_pipeline(
+                                          [PROGRAM_CAT, PROGRAM_CAT],
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          loop=self.loop))
+            stdout, stderr = yield From(pipeline.communicate(data))
+            raise Return(stdout)
+
+        task = asyncio.wait_for(run(), 60.0, loop=self.loop)
+        self.assertEqual(self.loop.run_until_complete(task), data)
+
+    def test_pipeline_returncodes(self):
+        @asyncio.coroutine
+        def run():
+            pipeline = yield From(asyncio.create_subprocess_pipeline(
+                                          [[sys.executable, '-c', 'exit(3)'],
+                                           PROGRAM_CAT,
+                                           [sys.executable, '-c', 'exit(5)']],
+                                          loop=self.loop))
+            returncodes = yield From(pipeline.wait())
+            raise Return(pipeline, returncodes)
+
+        pipeline, returncodes = self.loop.run_until_complete(run())
+        self.assertEqual(returncodes, [3, 0, 5])
+        self.assertEqual(pipeline.returncodes, [3, 0, 5])
+        self.assertEqual(pipeline.returncode, 5)
+        # the processes already exited
+        pipeline.kill()
+
+    def test_pipeline_kill(self):
+        @asyncio.coroutine
+        def run():
+            pipeline = yield From(asyncio.create_subprocess_pipeline(
+                                          [PROGRAM_BLOCKED, PROGRAM_BLOCKED],
+                                          loop=self.loop))
+            pipeline.kill()
+            returncodes = yield From(pipeline.wait())
+            raise Return(returncodes)
+
+        returncodes = self.loop.run_until_complete(run())
+        if sys.platform != 'win32':
+            self.assertEqual(returncodes, [-signal.SIGKILL] * 2)
+
+    def test_pipeline_errors(self):
+        self.assertRaises(ValueError, self.loop.run_until_complete,
+                          asyncio.create_subprocess_pipeline(
+                              [], loop=self.loop))
+
+        processes = []
+        create_subprocess_exec = subprocess.create_subprocess_exec
+
+        @asyncio.coroutine
+        def create_exec(*args, **kwds):
+            proc = yield From(create_subprocess_exec(*args, **kwds))
+            processes.append(proc)
+            raise Return(proc)
+
+        # if a process cannot be spawned, the previous ones are terminated
+        create = asyncio.create_subprocess_pipeline(
+            [PROGRAM_BLOCKED, ['/nonexistent/program']], loop=self.loop)
+        with mock.patch.object(subprocess, 'create_subprocess_exec',
+                               create_exec):
+            self.assertRaises((OSError, IOError),
+                              self.loop.run_until_complete, create)
+        self.assertEqual(len(processes), 1)
+        returncode = self.loop.run_until_complete(processes[0].wait())
+        if sys.platform != 'win32':
+            self.assertEqual(returncode, -signal.SIGTERM)
+
     def test_shell(self):
         create = asyncio.create_subprocess_shell('exit 7',
                                                  loop=self.loop)
@@ -339,6 +633,77 @@ if sys.platform != 'win32':
 
         Watcher = unix_events.FastChildWatcher
 
+    class SubprocessPidfdWatcherTests(SubprocessWatcherMixin,
+                                      test_utils.TestCase):
+
+        Watcher = unix_events.PidfdChildWatcher
+
+    @test_utils.skipUnless(unix_events._spawn_libc is not None,
+                           'posix_spawnp() is not available')
+    class SubprocessPosixSpawnTests(SubprocessWatcherMixin,
+                                    test_utils.TestCase):
+
+        Watcher = unix_events.SafeChildWatcher
+
+        def setUp(self):
+            super(SubprocessPosixSpawnTests, self).setUp()
+            self.loop._use_posix_spawn = True
+
+        def test_spawned_process(self):
+            @asyncio.coroutine
+            def run():
+                proc = yield From(asyncio.create_subprocess_exec(
+                    sys.executable, '-c', 'import sys; sys.exit(3)',
+                    loop=self.loop))
+                exitcode = yield From(proc.wait())
+                raise Return(proc, exitcode)
+
+            proc, exitcode = self.loop.run_until_complete(run())
+            self.assertEqual(exitcode, 3)
+            self.assertIsInstance(proc._transport.get_extra_info('subprocess'),
+                                  unix_events._SpawnedProcess)
+
+        def test_popen_fallback(self):
+            @asyncio.coroutine
+            def run():
+                proc = yield From(asyncio.create_subprocess_exec(
+                    sys.executable, '-c', 'pass',
+                    cwd=os.path.dirname(__file__), loop=self.loop))
+                yield From(proc.wait())
+                raise Return(proc)
+
+            proc = self.loop.run_until_complete(run())
+            self.assertIsInstance(proc._transport.get_extra_info('subprocess'),
+                                  subprocess.subprocess.Popen)
+
+        def test_fd_keeps_close_on_exec(self):
+            # stdin=0: the file descriptor of the parent is passed to the
+            # child without becoming inheritable
+            rfd, wfd = subprocess._make_pipe()
+            saved_stdin = os.dup(0)
+            try:
+                os.dup2(rfd, 0)
+                unix_events._set_inheritable(0, False)
+                os.write(wfd, b'data')
+                os.close(wfd)
+                code = 'import sys; sys.exit(len(sys.stdin.read()))'
+                proc = self.loop.run_until_complete(
+                    asyncio.create_subprocess_exec(sys.executable, '-c', code,
+                                                   stdin=0, loop=self.loop))
+                exitcode = self.loop.run_until_complete(proc.wait())
+                flags = fcntl.fcntl(0, fcntl.F_GETFD)
+            finally:
+                os.dup2(saved_stdin, 0)
+                os.close(saved_stdin)
+                os.close(rfd)
+            self.assertEqual(exitcode, 4)
+            self.assertTrue(flags & fcntl.FD_CLOEXEC)
+
+        def test_program_not_found(self):
+            create = asyncio.create_subprocess_exec(
+                'trollius-nonexistent-program', loop=self.loop)
+            self.assertRaises(OSError, self.loop.run_until_complete, create)
+
 else:
     # Windows
     class SubprocessProactorTests(SubprocessMixin, test_utils.TestCase):
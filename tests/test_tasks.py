@@ -3,6 +3,7 @@
 import os
 import re
 import sys
+import traceback
 import types
 import unittest
 import weakref
@@ -475,7 +476,7 @@ class TaskTests(test_utils.TestCase):
                 waiters.append(asyncio.sleep(0.1, loop=loop))
                 yield From(waiters[-1])
                 non_local['x'] += 1
-                if non_local['x'] == 3:
+                if non_local['x'] == 2:
                     loop.stop()
 
         t = asyncio.Task(task(), loop=loop)
@@ -484,7 +485,7 @@ class TaskTests(test_utils.TestCase):
         self.assertEqual(str(cm.exception),
                          'Event loop stopped before Future completed.')
         self.assertFalse(t.done())
-        self.assertEqual(non_local['x'], 3)
+        self.assertEqual(non_local['x'], 2)
         self.assertAlmostEqual(0.3, loop.time())
 
         # close generators
@@ -1207,6 +1208,72 @@ class TaskTests(test_utils.TestCase):
         self.assertTrue(t.done())
         self.assertIsNone(t.result())
 
+    def test_step_yield_kinds(self):
+        class Fut(asyncio.Future):
+            pass
+
+        kinds = asyncio.tasks._yield_kinds
+        self.addCleanup(kinds.pop, Fut, None)
+        fake = mock.Mock(spec=asyncio.Future)
+        non_local = {'results': []}
+
+        @asyncio.coroutine
+        def wait_for_future(fut):
+            result = yield From(fut)
+            non_local['results'].append(result)
+
+        @asyncio.coroutine
+        def yield_fake():
+            yield From(fake)
+
+        # the kind of a type is computed once, then taken from the cache
+        for i in range(2):
+            fut = Fut(loop=self.loop)
+            self.loop.call_soon(fut.set_result, i)
+            self.loop.run_until_complete(wait_for_future(fut))
+            self.assertEqual(kinds[Fut], asyncio.tasks._YIELD_FUTURE)
+        self.assertEqual(non_local['results'], [0, 1])
+
+        # a mock with a spec is handled as a future, but its type is not
+        # cached
+        task = asyncio.Task(yield_fake(), loop=self.loop)
+        test_utils.run_briefly(self.loop)
+        self.assertIs(task._fut_waiter, fake)
+        self.assertTrue(fake.add_done_callback.called)
+        self.assertNotIn(type(fake), kinds)
+        task.cancel()
+
+        # bad yields are not cached
+        @asyncio.coroutine
+        def bad_yield():
+            yield From(3)
+
+        self.assertRaises(RuntimeError,
+                          self.loop.run_until_complete, bad_yield())
+        self.assertNotIn(int, kinds)
+
+    @mock.patch.dict('trollius.tasks._yield_kinds')
+    @mock.patch('trollius.tasks._YIELD_KINDS_MAX', 3)
+    def test_step_yield_kinds_max(self):
+        kinds = asyncio.tasks._yield_kinds
+        non_local = {'results': []}
+
+        @asyncio.coroutine
+        def wait_for_future(fut):
+            result = yield From(fut)
+            non_local['results'].append(result)
+            # None is still handled when the cache was cleared
+            yield From(None)
+
+        for i in range(10):
+            cls = type('Fut%s' % i, (asyncio.Future,), {})
+            fut = cls(loop=self.loop)
+            self.loop.call_soon(fut.set_result, i)
+            self.loop.run_until_complete(wait_for_future(fut))
+            self.assertLessEqual(len(kinds), 3)
+            self.assertEqual(kinds[cls], asyncio.tasks._YIELD_FUTURE)
+        self.assertEqual(non_local['results'], list(range(10)))
+
     def test_step_with_baseexception(self):
         @asyncio.coroutine
         def notmutch():
@@ -1335,6 +1402,205 @@ class TaskTests(test_utils.TestCase):
                                                   loop=self.loop))
         self.assertIsNone(asyncio.Task.current_task(loop=self.loop))
 
+    def test_eager_tasks(self):
+        self.assertFalse(self.loop.get_eager_tasks())
+
+        @asyncio.coroutine
+        def notmuch():
+            return 'ok'
+
+        @asyncio.coroutine
+        def outer():
+            task = self.loop.create_task(notmuch())
+            # the first step is scheduled
+            self.assertFalse(task.done())
+            self.loop.set_eager_tasks(True)
+            task = self.loop.create_task(notmuch())
+            # the coroutine completed in create_task()
+            self.assertTrue(task.done())
+            self.assertEqual(task.result(), 'ok')
+            self.assertIs(asyncio.Task.current_task(loop=self.loop), main)
+
+        main = asyncio.Task(outer(), loop=self.loop)
+        self.loop.run_until_complete(main)
+        self.assertTrue(self.loop.get_eager_tasks())
+
+        # the event loop is not running: the first step is scheduled
+        task = self.loop.create_task(notmuch())
+        self.assertFalse(task.done())
+        self.assertEqual(self.loop.run_until_complete(task), 'ok')
+
+    def test_eager_start_blocking(self):
+        fut = asyncio.Future(loop=self.loop)
+        steps = []
+
+        @asyncio.coroutine
+        def waiter():
+            steps.append(asyncio.Task.current_task(loop=self.loop))
+            result = yield From(fut)
+            steps.append(asyncio.Task.current_task(loop=self.loop))
+            raise Return(result)
+
+        @asyncio.coroutine
+        def outer():
+            task = asyncio.Task(waiter(), loop=self.loop, eager_start=True)
+            self.assertEqual(steps, [task])
+            self.assertFalse(task.done())
+            self.assertIs(asyncio.Task.current_task(loop=self.loop), main)
+            fut.set_result(5)
+            result = yield From(task)
+            self.assertEqual(steps, [task, task])
+            raise Return(result)
+
+        main = asyncio.Task(outer(), loop=self.loop)
+        self.assertEqual(self.loop.run_until_complete(main), 5)
+        self.assertIsNone(asyncio.Task.current_task(loop=self.loop))
+
+    def test_eager_start_from_callback(self):
+        @asyncio.coroutine
+        def fail():
+            self.assertIsNotNone(asyncio.Task.current_task(loop=self.loop))
+            raise ValueError
+
+        tasks = []
+
+        def callback():
+            task = asyncio.Task(fail(), loop=self.loop, eager_start=True)
+            tasks.append(task)
+            # the current task is restored to None
+            self.assertIsNone(asyncio.Task.current_task(loop=self.loop))
+            self.loop.stop()
+
+        self.loop.call_soon(callback)
+        self.loop.run_forever()
+        task, = tasks
+        self.assertTrue(task.done())
+        self.assertIsInstance(task.exception(), ValueError)
+
+    def test_nested_coroutines(self):
+        tasks = []
+
+        @asyncio.coroutine
+        def inner(x):
+            tasks.append(asyncio.Task.current_task(loop=self.loop))
+            raise Return(x * 2)
+
+        @asyncio.coroutine
+        def middle(x):
+            value = yield From(inner(x))
+            raise Return(value + 1)
+
+        @asyncio.coroutine
+        def outer():
+            a = yield From(middle(1))
+            b = yield From(middle(a))
+            raise Return(a, b)
+
+        task = asyncio.Task(outer(), loop=self.loop)
+        test_utils.run_briefly(self.loop)
+        # nested coroutines run in the task, without blocking
+        self.assertTrue(task.done())
+        self.assertEqual(task.result(), (3, 7))
+        self.assertEqual(tasks, [task, task])
+        self.assertEqual(task._stack, [])
+
+    def test_nested_coroutine_exception(self):
+        fut = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def inner():
+            yield From(fut)
+            raise ValueError('inner')
+
+        @asyncio.coroutine
+        def outer():
+            try:
+                yield From(inner())
+            except ValueError as exc:
+                tb = traceback.extract_tb(sys.exc_info()[2])
+                raise Return(str(exc), [frame[2] for frame in tb])
+
+        task = asyncio.Task(outer(), loop=self.loop)
+        test_utils.run_briefly(self.loop)
+        fut.set_result(None)
+        message, names = self.loop.run_until_complete(task)
+        self.assertEqual(message, 'inner')
+        # the traceback goes through the nested coroutine (ignore the
+        # frames of CoroWrapper in debug mode)
+        names = [name for name in names if name in ('outer', 'inner')]
+        self.assertEqual(names, ['outer', 'inner'])
+
+        @asyncio.coroutine
+        def fail():
+            yield From(inner())
+
+        task = asyncio.Task(fail(), loop=self.loop)
+        self.assertRaises(ValueError, self.loop.run_until_complete, task)
+
+    def test_nested_coroutine_cancel(self):
+        fut = asyncio.Future(loop=self.loop)
+        events = []
+
+        @asyncio.coroutine
+        def inner():
+            try:
+                yield From(fut)
+            except asyncio.CancelledError:
+                events.append('inner')
+                raise
+
+        @asyncio.coroutine
+        def outer():
+            try:
+                yield From(inner())
+            finally:
+                events.append('outer')
+
+        task = asyncio.Task(outer(), loop=self.loop)
+        test_utils.run_briefly(self.loop)
+        self.assertIs(task._fut_waiter, fut)
+        self.assertTrue(task.cancel())
+        self.assertRaises(asyncio.CancelledError,
+                          self.loop.run_until_complete, task)
+        self.assertTrue(fut.cancelled())
+        self.assertTrue(task.cancelled())
+        self.assertEqual(events, ['inner', 'outer'])
+
+    def test_nested_coroutine_get_stack(self):
+        fut = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def inner():
+            yield From(fut)
+
+        @asyncio.coroutine
+        def outer():
+            yield From(inner())
+
+        task = asyncio.Task(outer(), loop=self.loop)
+        test_utils.run_briefly(self.loop)
+        names = [frame.f_code.co_name for frame in task.get_stack()]
+        self.assertEqual(names, ['outer', 'inner'])
+        names = [frame.f_code.co_name for frame in task.get_stack(limit=1)]
+        self.assertEqual(names, ['inner'])
+
+        fut.set_result(None)
+        self.loop.run_until_complete(task)
+        self.assertEqual(task.get_stack(), [])
+
+    def test_deeply_nested_coroutines(self):
+        @asyncio.coroutine
+        def countdown(n):
+            if not n:
+                raise Return(0)
+            value = yield From(countdown(n - 1))
+            raise Return(value + 1)
+
+        # deeper than the recursion limit
+        depth = sys.getrecursionlimit() * 2
+        task = asyncio.Task(countdown(depth), loop=self.loop)
+        self.assertEqual(self.loop.run_until_complete(task), depth)
+
     # Some thorough tests for cancellation propagation through
     # coroutines, tasks and wait().
 
@@ -1577,6 +1843,30 @@ class TaskTests(test_utils.TestCase):
         finally:
             asyncio.coroutines._DEBUG = old_debug
 
+    def test_return_value(self):
+        def create(*args):
+            exc = Return(*args)
+            # not raised: don't log "Return(...) used without raise" in
+            # debug mode
+            exc.raised = True
+            return exc
+
+        self.assertIsNone(create().value)
+        self.assertIsNone(create(None).value)
+        self.assertEqual(create(1).value, 1)
+        self.assertEqual(create(1, 2).value, (1, 2))
+        self.assertEqual(create((1, 2)).value, (1, 2))
+        self.assertIsInstance(create(1), StopIteration)
+
+        @asyncio.coroutine
+        def returns(*args):
+            yield From(None)
+            raise Return(*args)
+
+        for args, value in (((), None), ((1,), 1), ((1, 2), (1, 2))):
+            result = self.loop.run_until_complete(returns(*args))
+            self.assertEqual(result, value)
+
     def test_yield_from_corowrapper_send(self):
         def foo():
             a = yield
@@ -1798,6 +2088,64 @@ class GatherTestsBase:
         cb.assert_called_once_with(fut)
         self.assertEqual(fut.result(), [3, 1, exc, exc2])
 
+    def test_result_callback(self):
+        a, b, c = [asyncio.Future(loop=self.one_loop) for i in range(3)]
+        results = []
+        fut = asyncio.gather(
+            *self.wrap_futures(a, b, c),
+            result_callback=lambda *args: results.append(args))
+        b.set_result(1)
+        self._run_loop(self.one_loop)
+        self.assertEqual(results, [(1, 1)])
+        self.assertFalse(fut.done())
+        a.set_result(2)
+        c.set_result(3)
+        self._run_loop(self.one_loop)
+        self.assertEqual(results, [(1, 1), (0, 2), (2, 3)])
+        self.assertTrue(fut.done())
+        self.assertIsNone(fut.result())
+
+    def test_result_callback_exceptions(self):
+        a, b = [asyncio.Future(loop=self.one_loop) for i in range(2)]
+        results = []
+        fut = asyncio.gather(
+            *self.wrap_futures(a, b), return_exceptions=True,
+            result_callback=lambda *args: results.append(args))
+        exc = ZeroDivisionError()
+        a.set_exception(exc)
+        b.set_result(1)
+        self._run_loop(self.one_loop)
+        self.assertEqual(results, [(0, exc), (1, 1)])
+        self.assertIsNone(fut.result())
+
+        a, b = [asyncio.Future(loop=self.one_loop) for i in range(2)]
+        results = []
+        fut = asyncio.gather(
+            *self.wrap_futures(a, b),
+            result_callback=lambda *args: results.append(args))
+        a.set_exception(exc)
+        self._run_loop(self.one_loop)
+        self.assertEqual(results, [])
+        self.assertIs(fut.exception(), exc)
+        b.cancel()
+        self._run_loop(self.one_loop)
+
+    def test_result_callback_error(self):
+        a, b = [asyncio.Future(loop=self.one_loop) for i in range(2)]
+        exc = ZeroDivisionError()
+
+        def result_callback(index, result):
+            raise exc
+
+        fut = asyncio.gather(*self.wrap_futures(a, b),
+                             result_callback=result_callback)
+        a.set_result(1)
+        self._run_loop(self.one_loop)
+        self.assertIs(fut.exception(), exc)
+        # Does nothing
+        b.set_result(2)
+        self._run_loop(self.one_loop)
+
     def test_env_var_debug(self):
         aio_path = os.path.dirname(os.path.dirname(asyncio.__file__))
 
@@ -1839,6 +2187,41 @@ class FutureGatherTests(GatherTestsBase, test_utils.TestCase):
         self._check_empty_sequence(set())
         self._check_empty_sequence(iter(""))
 
+    def test_result_callback_empty_sequence(self):
+        fut = asyncio.gather(loop=self.one_loop,
+                             result_callback=lambda *args: None)
+        self.assertIsNone(fut.result())
+
+    def test_result_callback_duplicates(self):
+        a, b = [asyncio.Future(loop=self.one_loop) for i in range(2)]
+        results = []
+        fut = asyncio.gather(
+            a, b, a, loop=self.one_loop,
+            result_callback=lambda *args: results.append(args))
+        a.set_result(1)
+        b.set_result(2)
+        self._run_loop(self.one_loop)
+        self.assertEqual(results, [(0, 1), (2, 1), (1, 2)])
+        self.assertIsNone(fut.result())
+
+    def test_result_callback_release(self):
+        a, b = [asyncio.Future(loop=self.one_loop) for i in range(2)]
+        fut = asyncio.gather(a, b, result_callback=lambda *args: None)
+        a.set_result(object())
+        self._run_loop(self.one_loop)
+        self.assertFalse(fut.done())
+        # the completed child is not kept alive by gather()
+        ref = weakref.ref(a)
+        a = None
+        support.gc_collect()
+        self.assertIsNone(ref())
+
+        # cancel the pending children
+        self.assertTrue(fut.cancel())
+        self.assertTrue(b.cancelled())
+        self._run_loop(self.one_loop)
+        self.assertIsInstance(fut.exception(), asyncio.CancelledError)
+
     def test_constructor_heterogenous_futures(self):
         fut1 = asyncio.Future(loop=self.one_loop)
         fut2 = asyncio.Future(loop=self.other_loop)
@@ -8,20 +8,28 @@ import os
 import signal
 import socket
 import stat
+import subprocess
 import sys
 import tempfile
 import threading
 import unittest
+try:
+    import ctypes
+except ImportError:
+    ctypes = None
 
 if sys.platform == 'win32':
     raise unittest.SkipTest('UNIX only')
 
 
 import trollius as asyncio
+from trollius import From, Return
 from trollius import log
+from trollius import selectors
 from trollius import test_utils
 from trollius import unix_events
-from trollius.py33_exceptions import BlockingIOError, ChildProcessError
+from trollius.py33_exceptions import (
+    BlockingIOError, ChildProcessError, ConnectionRefusedError)
 from trollius.test_utils import mock
 
 
@@ -230,6 +238,136 @@ class SelectorEventLoopSignalTests(test_utils.TestCase):
         m_signal.set_wakeup_fd.assert_called_once_with(-1)
 
 
+@test_utils.skipUnless(sys.platform.startswith('linux') and ctypes is not None,
+                       'Linux and ctypes are required')
+class PthreadSigmaskTests(test_utils.TestCase):
+
+    def test_ctypes(self):
+        # signal.pthread_sigmask() is missing on Python 3.2 and older
+        fake_signal = mock.Mock(spec=['NSIG'], NSIG=signal.NSIG)
+        with mock.patch('trollius.unix_events.signal', fake_signal):
+            pthread_sigmask = unix_events._find_pthread_sigmask()
+        self.assertIsNotNone(pthread_sigmask)
+
+        blocked = pthread_sigmask(unix_events._SIG_BLOCK, (signal.SIGUSR1,))
+        self.assertNotIn(signal.SIGUSR1, blocked)
+        try:
+            blocked = pthread_sigmask(unix_events._SIG_BLOCK, ())
+            self.assertIn(signal.SIGUSR1, blocked)
+        finally:
+            pthread_sigmask(unix_events._SIG_UNBLOCK, (signal.SIGUSR1,))
+        blocked = pthread_sigmask(unix_events._SIG_BLOCK, ())
+        self.assertNotIn(signal.SIGUSR1, blocked)
+
+
+@test_utils.skipUnless(unix_events._signalfd_func is not None,
+                       'signalfd() is not available')
+class SelectorEventLoopSignalfdTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.SelectorEventLoop(use_signalfd=True)
+        self.set_event_loop(self.loop)
+
+    def blocked_signals(self):
+        return set(unix_events._pthread_sigmask(unix_events._SIG_BLOCK, ()))
+
+    def send_signal(self, sig):
+        # Send the signal to the main thread: a signal sent to the process can
+        # be delivered to a thread started before the signal was blocked
+        if hasattr(signal, 'pthread_kill'):
+            signal.pthread_kill(threading.current_thread().ident, sig)
+        else:
+            libc = ctypes.CDLL(None)
+            libc.pthread_self.restype = ctypes.c_ulong
+            libc.pthread_kill(ctypes.c_ulong(libc.pthread_self()), sig)
+
+    def test_signal(self):
+        calls = []
+        self.loop.add_signal_handler(signal.SIGUSR1, calls.append, 1)
+        self.loop.add_signal_handler(signal.SIGUSR2, calls.append, 2)
+        self.assertIsNotNone(self.loop._signalfd)
+        self.assertEqual(self.loop._internal_fds, 2)
+        self.assertIn(signal.SIGUSR1, self.blocked_signals())
+        self.assertEqual(signal.getsignal(signal.SIGUSR1), signal.SIG_DFL)
+
+        self.send_signal(signal.SIGUSR1)
+        self.send_signal(signal.SIGUSR2)
+        test_utils.run_until(self.loop, lambda: len(calls) == 2)
+        self.assertEqual(sorted(calls), [1, 2])
+
+    def test_remove_signal_handler(self):
+        calls = []
+        self.loop.add_signal_handler(signal.SIGUSR1, calls.append, 1)
+        self.loop.add_signal_handler(signal.SIGUSR2, calls.append, 2)
+
+        # the pending signal is consumed, not delivered by the default action
+        self.send_signal(signal.SIGUSR1)
+        self.assertTrue(self.loop.remove_signal_handler(signal.SIGUSR1))
+        self.assertNotIn(signal.SIGUSR1, self.blocked_signals())
+        self.assertIn(signal.SIGUSR2, self.blocked_signals())
+        self.assertFalse(self.loop.remove_signal_handler(signal.SIGUSR1))
+
+        self.assertTrue(self.loop.remove_signal_handler(signal.SIGUSR2))
+        self.assertNotIn(signal.SIGUSR2, self.blocked_signals())
+        self.assertIsNone(self.loop._signalfd)
+        self.assertEqual(self.loop._internal_fds, 1)
+        test_utils.run_briefly(self.loop)
+        self.assertEqual(calls, [])
+
+    def test_cancelled_handler(self):
+        calls = []
+        self.loop.add_signal_handler(signal.SIGUSR1, calls.append, 1)
+        self.loop._signal_handlers[signal.SIGUSR1].cancel()
+
+        self.send_signal(signal.SIGUSR1)
+        test_utils.run_until(self.loop, lambda: not self.loop._signal_handlers)
+        self.assertIsNone(self.loop._signalfd)
+        self.assertNotIn(signal.SIGUSR1, self.blocked_signals())
+        self.assertEqual(calls, [])
+
+    def test_uncatchable_signal(self):
+        self.assertRaises(
+            RuntimeError,
+            self.loop.add_signal_handler, signal.SIGKILL, lambda: True)
+        self.assertIsNone(self.loop._signalfd)
+
+    def test_close(self):
+        self.loop.add_signal_handler(signal.SIGUSR1, lambda: True)
+        self.loop.close()
+        self.assertEqual(self.loop._signal_handlers, {})
+        self.assertIsNone(self.loop._signalfd)
+        self.assertNotIn(signal.SIGUSR1, self.blocked_signals())
+
+    def check_subprocess_signals_unblocked(self):
+        self.loop.add_signal_handler(signal.SIGUSR1, lambda: True)
+        watcher = asyncio.SafeChildWatcher()
+        watcher.attach_loop(self.loop)
+        asyncio.set_child_watcher(watcher)
+        self.addCleanup(asyncio.set_child_watcher, None)
+
+        # signal.pthread_sigmask() is new in Python 3.3
+        code = '\n'.join((
+            'import signal',
+            'for line in open("/proc/self/status"):',
+            '    if line.startswith("SigBlk:"):',
+            '        mask = int(line.split()[1], 16)',
+            'print((mask >> (signal.SIGUSR1 - 1)) & 1)'))
+        proc = self.loop.run_until_complete(asyncio.create_subprocess_exec(
+            sys.executable, '-c', code,
+            stdout=asyncio.subprocess.PIPE, loop=self.loop))
+        stdout, stderr = self.loop.run_until_complete(proc.communicate())
+        self.assertEqual(stdout.strip(), b'0')
+
+    def test_subprocess_signals_unblocked(self):
+        self.check_subprocess_signals_unblocked()
+
+    @test_utils.skipUnless(unix_events._spawn_libc is not None,
+                           'posix_spawnp() is not available')
+    def test_posix_spawn_signals_unblocked(self):
+        self.loop._use_posix_spawn = True
+        self.check_subprocess_signals_unblocked()
+
+
 @test_utils.skipUnless(hasattr(socket, 'AF_UNIX'),
                        'UNIX Sockets are not supported')
 class SelectorEventLoopUnixSocketTests(test_utils.TestCase):
@@ -326,6 +464,157 @@ class SelectorEventLoopUnixSocketTests(test_utils.TestCase):
             self.loop.run_until_complete(coro)
 
 
+@test_utils.skipUnless(unix_events._splice is not None,
+                       'need splice()')
+class SpliceRelayTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.SelectorEventLoop()
+        self.set_event_loop(self.loop)
+
+    def connect(self):
+        sock, peer = test_utils.socketpair()
+        peer.setblocking(False)
+        self.addCleanup(peer.close)
+        transport, protocol = self.loop.run_until_complete(
+            self.loop.create_connection(asyncio.Protocol, sock=sock))
+        return transport, peer
+
+    @asyncio.coroutine
+    def recv(self, sock, size):
+        data = b''
+        while len(data) < size:
+            chunk = yield From(self.loop.sock_recv(sock, size - len(data)))
+            if not chunk:
+                break
+            data += chunk
+        raise Return(data)
+
+    def test_relay(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        done = self.loop.relay(tr_a, tr_b)
+        self.assertIsInstance(tr_a._protocol, unix_events._SpliceRelay)
+        self.assertIs(tr_b._protocol, tr_a._protocol)
+
+        self.loop.run_until_complete(self.loop.sock_sendall(peer_a, b'ping'))
+        self.assertEqual(
+            self.loop.run_until_complete(self.recv(peer_b, 4)), b'ping')
+        self.loop.run_until_complete(self.loop.sock_sendall(peer_b, b'pong'))
+        self.assertEqual(
+            self.loop.run_until_complete(self.recv(peer_a, 4)), b'pong')
+
+        # end of file is forwarded
+        peer_a.shutdown(socket.SHUT_WR)
+        self.assertEqual(
+            self.loop.run_until_complete(self.recv(peer_b, 1)), b'')
+        self.assertFalse(done.done())
+
+        self.loop.run_until_complete(self.loop.sock_sendall(peer_b, b'end'))
+        peer_b.shutdown(socket.SHUT_WR)
+        self.assertEqual(
+            self.loop.run_until_complete(self.recv(peer_a, 10)), b'end')
+        self.assertIsNone(self.loop.run_until_complete(done))
+
+    def test_relay_large_data(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        done = self.loop.relay(tr_a, tr_b)
+
+        # peer_b doesn't read: the relay waits until tr_b is writable
+        data = os.urandom(4 * 1024 * 1024)
+        send = self.loop.sock_sendall(peer_a, data)
+        test_utils.run_until(
+            self.loop,
+            lambda: any(direction._writing
+                        for direction in tr_a._protocol._directions))
+        self.assertFalse(send.done())
+
+        recv = self.recv(peer_b, len(data))
+        self.assertEqual(self.loop.run_until_complete(recv), data)
+        self.loop.run_until_complete(send)
+
+        done.cancel()
+        test_utils.run_briefly(self.loop)
+        self.assertTrue(tr_a._closing)
+        self.assertTrue(tr_b._closing)
+
+    def test_relay_eof_after_data(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        done = self.loop.relay(tr_a, tr_b)
+
+        # more data than a single splice() call and the end of file are
+        # pending before the relay reads
+        data = os.urandom(unix_events._SPLICE_SIZE + 1000)
+        peer_a.sendall(data)
+        peer_a.shutdown(socket.SHUT_WR)
+        recv = asyncio.wait_for(self.recv(peer_b, len(data) + 1), 10,
+                                loop=self.loop)
+        self.assertEqual(self.loop.run_until_complete(recv), data)
+        self.assertFalse(done.done())
+        done.cancel()
+        test_utils.run_briefly(self.loop)
+
+    def test_relay_connection_lost(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        done = self.loop.relay(tr_a, tr_b)
+
+        # closing one side closes the other side
+        tr_a.abort()
+        self.assertIsNone(self.loop.run_until_complete(done))
+        self.assertEqual(
+            self.loop.run_until_complete(self.recv(peer_b, 1)), b'')
+
+    def test_relay_error(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        done = self.loop.relay(tr_a, tr_b)
+
+        exc = OSError(errno.EINVAL, 'splice')
+        with mock.patch('trollius.unix_events._splice', side_effect=exc):
+            self.loop.run_until_complete(
+                self.loop.sock_sendall(peer_a, b'data'))
+            self.assertRaises(OSError, self.loop.run_until_complete, done)
+        self.assertTrue(tr_a._closing)
+        self.assertTrue(tr_b._closing)
+
+    def test_relay_fallback(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        # data waiting in the write buffer: copy the data in user space
+        tr_b._buffer.extend(b'data')
+        done = self.loop.relay(tr_a, tr_b)
+        self.assertNotIsInstance(tr_a._protocol, unix_events._SpliceRelay)
+        done.cancel()
+        test_utils.run_briefly(self.loop)
+
+    def test_relay_no_pipe(self):
+        tr_a, peer_a = self.connect()
+        tr_b, peer_b = self.connect()
+        exc = OSError(errno.EMFILE, 'Too many open files')
+        with mock.patch('trollius.unix_events.os.pipe', side_effect=exc):
+            done = self.loop.relay(tr_a, tr_b)
+        self.assertNotIsInstance(tr_a._protocol, unix_events._SpliceRelay)
+
+        self.loop.run_until_complete(self.loop.sock_sendall(peer_a, b'ping'))
+        self.assertEqual(
+            self.loop.run_until_complete(self.recv(peer_b, 4)), b'ping')
+        done.cancel()
+        test_utils.run_briefly(self.loop)
+
+
+@test_utils.skipUnless(hasattr(selectors, 'EdgeTriggeredEpollSelector'),
+                       'need selectors.EdgeTriggeredEpollSelector')
+class EdgeTriggeredSpliceRelayTests(SpliceRelayTests):
+
+    def setUp(self):
+        self.loop = asyncio.SelectorEventLoop(
+            selectors.EdgeTriggeredEpollSelector())
+        self.set_event_loop(self.loop)
+
+
 class UnixReadPipeTransportTests(test_utils.TestCase):
 
     def setUp(self):
@@ -504,6 +793,10 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
         self.addCleanup(close_pipe_transport, transport)
         return transport
 
+    def fill_buffer(self, tr, chunks):
+        tr._buffer.extend(chunks)
+        tr._buffer_size += sum(len(chunk) for chunk in chunks)
+
     def test_ctor(self):
         tr = self.write_pipe_transport()
         self.loop.assert_reader(5, tr._read_ready)
@@ -528,7 +821,7 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
         tr.write(b'data')
         m_write.assert_called_with(5, b'data')
         self.assertFalse(self.loop.writers)
-        self.assertEqual([], tr._buffer)
+        self.assertEqual([], list(tr._buffer))
 
     @mock.patch('os.write')
     def test_write_no_data(self, m_write):
@@ -536,7 +829,7 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
         tr.write(b'')
         self.assertFalse(m_write.called)
         self.assertFalse(self.loop.writers)
-        self.assertEqual([], tr._buffer)
+        self.assertEqual([], list(tr._buffer))
 
     @mock.patch('os.write')
     def test_write_partial(self, m_write):
@@ -545,17 +838,21 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
         tr.write(b'data')
         m_write.assert_called_with(5, b'data')
         self.loop.assert_writer(5, tr._write_ready)
-        self.assertEqual([b'ta'], tr._buffer)
+        self.assertEqual([b'data'], list(tr._buffer))
+        self.assertEqual(2, tr._buffer_offset)
+        self.assertEqual(2, tr.get_write_buffer_size())
 
     @mock.patch('os.write')
     def test_write_buffer(self, m_write):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
-        tr._buffer = [b'previous']
-        tr.write(b'data')
+        self.fill_buffer(tr, [b'previous'])
+        tr.write(bytearray(b'data'))
         self.assertFalse(m_write.called)
         self.loop.assert_writer(5, tr._write_ready)
-        self.assertEqual([b'previous', b'data'], tr._buffer)
+        self.assertEqual([b'previous', b'data'], list(tr._buffer))
+        self.assertIsInstance(tr._buffer[1], bytes)
+        self.assertEqual(12, tr.get_write_buffer_size())
 
     @mock.patch('os.write')
     def test_write_again(self, m_write):
@@ -564,7 +861,7 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
         tr.write(b'data')
         m_write.assert_called_with(5, b'data')
         self.loop.assert_writer(5, tr._write_ready)
-        self.assertEqual([b'data'], tr._buffer)
+        self.assertEqual([b'data'], list(tr._buffer))
 
     @mock.patch('trollius.unix_events.logger')
     @mock.patch('os.write')
@@ -576,7 +873,7 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
         tr.write(b'data')
         m_write.assert_called_with(5, b'data')
         self.assertFalse(self.loop.writers)
-        self.assertEqual([], tr._buffer)
+        self.assertEqual([], list(tr._buffer))
         tr._fatal_error.assert_called_with(
                             err,
                             'Fatal write error on pipe transport')
@@ -616,58 +913,68 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
     def test__write_ready(self, m_write):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
-        tr._buffer = [b'da', b'ta']
+        self.fill_buffer(tr, [b'data'])
         m_write.return_value = 4
         tr._write_ready()
         m_write.assert_called_with(5, b'data')
         self.assertFalse(self.loop.writers)
-        self.assertEqual([], tr._buffer)
+        self.assertEqual([], list(tr._buffer))
 
     @mock.patch('os.write')
     def test__write_ready_partial(self, m_write):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
-        tr._buffer = [b'da', b'ta']
+        self.fill_buffer(tr, [b'data'])
         m_write.return_value = 3
         tr._write_ready()
         m_write.assert_called_with(5, b'data')
         self.loop.assert_writer(5, tr._write_ready)
-        self.assertEqual([b'a'], tr._buffer)
+        self.assertEqual([b'data'], list(tr._buffer))
+        self.assertEqual(3, tr._buffer_offset)
+        self.assertEqual(1, tr.get_write_buffer_size())
+
+        m_write.return_value = 1
+        tr._write_ready()
+        self.assertEqual(b'a', m_write.call_args[0][1].tobytes())
+        self.assertFalse(self.loop.writers)
+        self.assertEqual([], list(tr._buffer))
+        self.assertEqual(0, tr._buffer_offset)
+        self.assertEqual(0, tr.get_write_buffer_size())
 
     @mock.patch('os.write')
     def test__write_ready_again(self, m_write):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
-        tr._buffer = [b'da', b'ta']
+        self.fill_buffer(tr, [b'data'])
         m_write.side_effect = BlockingIOError()
         tr._write_ready()
         m_write.assert_called_with(5, b'data')
         self.loop.assert_writer(5, tr._write_ready)
-        self.assertEqual([b'data'], tr._buffer)
+        self.assertEqual([b'data'], list(tr._buffer))
 
     @mock.patch('os.write')
     def test__write_ready_empty(self, m_write):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
-        tr._buffer = [b'da', b'ta']
+        self.fill_buffer(tr, [b'data'])
         m_write.return_value = 0
         tr._write_ready()
         m_write.assert_called_with(5, b'data')
         self.loop.assert_writer(5, tr._write_ready)
-        self.assertEqual([b'data'], tr._buffer)
+        self.assertEqual([b'data'], list(tr._buffer))
 
     @mock.patch('trollius.log.logger.error')
     @mock.patch('os.write')
     def test__write_ready_err(self, m_write, m_logexc):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
-        tr._buffer = [b'da', b'ta']
+        self.fill_buffer(tr, [b'data'])
         m_write.side_effect = err = OSError()
         tr._write_ready()
         m_write.assert_called_with(5, b'data')
         self.assertFalse(self.loop.writers)
         self.assertFalse(self.loop.readers)
-        self.assertEqual([], tr._buffer)
+        self.assertEqual([], list(tr._buffer))
         self.assertTrue(tr._closing)
         m_logexc.assert_called_with(
             test_utils.MockPattern(
@@ -683,27 +990,73 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
         tr._closing = True
-        tr._buffer = [b'da', b'ta']
+        self.fill_buffer(tr, [b'data'])
         m_write.return_value = 4
         tr._write_ready()
         m_write.assert_called_with(5, b'data')
         self.assertFalse(self.loop.writers)
         self.assertFalse(self.loop.readers)
-        self.assertEqual([], tr._buffer)
+        self.assertEqual([], list(tr._buffer))
         self.protocol.connection_lost.assert_called_with(None)
         self.pipe.close.assert_called_with()
 
+    @test_utils.skipUnless(unix_events._HAVE_WRITEV, 'need os.writev()')
+    @mock.patch('os.writev', create=True)
+    def test__write_ready_writev(self, m_writev):
+        tr = self.write_pipe_transport()
+        self.loop.add_writer(5, tr._write_ready)
+        self.fill_buffer(tr, [b'da', b'ta', b'xyz'])
+        m_writev.return_value = 3
+        tr._write_ready()
+        m_writev.assert_called_with(5, [b'da', b'ta', b'xyz'])
+        self.loop.assert_writer(5, tr._write_ready)
+        self.assertEqual([b'ta', b'xyz'], list(tr._buffer))
+        self.assertEqual(1, tr._buffer_offset)
+        self.assertEqual(4, tr.get_write_buffer_size())
+
+        m_writev.return_value = 4
+        tr._write_ready()
+        self.assertEqual([b'a', b'xyz'],
+                         [bytes(data) for data in m_writev.call_args[0][1]])
+        self.assertFalse(self.loop.writers)
+        self.assertEqual([], list(tr._buffer))
+        self.assertEqual(0, tr.get_write_buffer_size())
+
+    @test_utils.skipUnless(unix_events._HAVE_WRITEV, 'need os.writev()')
+    @mock.patch('os.writev', create=True)
+    def test__write_ready_writev_iov_max(self, m_writev):
+        tr = self.write_pipe_transport()
+        self.loop.add_writer(5, tr._write_ready)
+        self.fill_buffer(tr, [b'x'] * (unix_events._IOV_MAX + 5))
+        m_writev.return_value = unix_events._IOV_MAX
+        tr._write_ready()
+        self.assertEqual(len(m_writev.call_args[0][1]),
+                         unix_events._IOV_MAX)
+        self.assertEqual(5, len(tr._buffer))
+
+    @mock.patch('trollius.unix_events._HAVE_WRITEV', False)
+    @mock.patch('os.write')
+    def test__write_ready_no_writev(self, m_write):
+        tr = self.write_pipe_transport()
+        self.loop.add_writer(5, tr._write_ready)
+        self.fill_buffer(tr, [b'da', b'ta'])
+        m_write.return_value = 2
+        tr._write_ready()
+        m_write.assert_called_with(5, b'da')
+        self.loop.assert_writer(5, tr._write_ready)
+        self.assertEqual([b'ta'], list(tr._buffer))
+
     @mock.patch('os.write')
     def test_abort(self, m_write):
         tr = self.write_pipe_transport()
         self.loop.add_writer(5, tr._write_ready)
         self.loop.add_reader(5, tr._read_ready)
-        tr._buffer = [b'da', b'ta']
+        self.fill_buffer(tr, [b'data'])
         tr.abort()
         self.assertFalse(m_write.called)
         self.assertFalse(self.loop.readers)
         self.assertFalse(self.loop.writers)
-        self.assertEqual([], tr._buffer)
+        self.assertEqual([], list(tr._buffer))
         self.assertTrue(tr._closing)
         test_utils.run_briefly(self.loop)
         self.protocol.connection_lost.assert_called_with(None)
@@ -760,12 +1113,301 @@ class UnixWritePipeTransportTests(test_utils.TestCase):
 
     def test_write_eof_pending(self):
         tr = self.write_pipe_transport()
-        tr._buffer = [b'data']
+        self.fill_buffer(tr, [b'data'])
         tr.write_eof()
         self.assertTrue(tr._closing)
         self.assertFalse(self.protocol.connection_lost.called)
 
 
+class SelectorProactorTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.SelectorProactorEventLoop()
+        self.set_event_loop(self.loop)
+        self.proactor = self.loop._proactor
+        self.rsock, self.wsock = test_utils.socketpair()
+        self.rsock.setblocking(False)
+        self.wsock.setblocking(False)
+
+    def tearDown(self):
+        self.rsock.close()
+        self.wsock.close()
+        super(SelectorProactorTests, self).tearDown()
+
+    def test_proactor_event_loop_name(self):
+        # ProactorEventLoop is only defined on Windows: code uses it to
+        # detect Windows
+        self.assertFalse(hasattr(asyncio, 'ProactorEventLoop'))
+        self.assertIsInstance(self.loop, asyncio.SelectorProactorEventLoop)
+
+    def registered(self, sock):
+        return sock.fileno() in self.proactor._selector.get_map()
+
+    def test_recv(self):
+        fut = self.proactor.recv(self.rsock, 100)
+        self.assertFalse(fut.done())
+        self.assertTrue(self.registered(self.rsock))
+
+        self.wsock.send(b'data')
+        self.assertEqual(b'data', self.loop.run_until_complete(fut))
+        self.assertFalse(self.registered(self.rsock))
+
+    def test_recv_ready(self):
+        # the operation is attempted immediately
+        self.wsock.send(b'data')
+        fut = self.proactor.recv(self.rsock, 100)
+        self.assertEqual(b'data', fut.result())
+        self.assertFalse(self.registered(self.rsock))
+
+    def test_send_all(self):
+        data = b'x' * (4 * 1024 * 1024)
+        fut = self.proactor.send(self.wsock, data)
+        self.assertFalse(fut.done())
+
+        received = bytearray()
+        while not fut.done():
+            self.loop.run_until_complete(asyncio.sleep(0, loop=self.loop))
+            try:
+                received += self.rsock.recv(1024 * 1024)
+            except BlockingIOError:
+                pass
+            except socket.error as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise
+        self.assertEqual(len(data), fut.result())
+        while len(received) < len(data):
+            received += self.rsock.recv(1024 * 1024)
+        self.assertEqual(data, received)
+
+    def test_operations_ordered(self):
+        fut1 = self.proactor.recv(self.rsock, 2)
+        fut2 = self.proactor.recv(self.rsock, 2)
+        self.wsock.send(b'abcd')
+        self.assertEqual(b'ab', self.loop.run_until_complete(fut1))
+        self.assertEqual(b'cd', self.loop.run_until_complete(fut2))
+
+    def test_cancel(self):
+        fut = self.proactor.recv(self.rsock, 100)
+        fut.cancel()
+        # the file descriptor is unregistered immediately
+        self.assertFalse(self.registered(self.rsock))
+
+        self.wsock.send(b'data')
+        fut = self.proactor.recv(self.rsock, 100)
+        self.assertEqual(b'data', fut.result())
+
+    def test_connect_refused(self):
+        sock = socket.socket()
+        self.addCleanup(sock.close)
+        sock.bind(('127.0.0.1', 0))
+        address = sock.getsockname()
+        client = socket.socket()
+        self.addCleanup(client.close)
+        client.setblocking(False)
+        fut = self.proactor.connect(client, address)
+        self.assertRaises(ConnectionRefusedError,
+                          self.loop.run_until_complete, fut)
+
+    def test_accept(self):
+        listener = socket.socket()
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        listener.setblocking(False)
+        fut = self.proactor.accept(listener)
+        self.assertFalse(fut.done())
+
+        client = socket.socket()
+        self.addCleanup(client.close)
+        client.connect(listener.getsockname())
+        conn, address = self.loop.run_until_complete(fut)
+        conn.close()
+        self.assertEqual(client.getsockname(), address)
+
+    def test_close(self):
+        fut = self.proactor.recv(self.rsock, 100)
+        self.loop.close()
+        self.assertTrue(fut.cancelled())
+        self.assertIsNone(self.proactor._selector)
+
+
+def _has_io_uring():
+    try:
+        proactor = asyncio.IoUringProactor()
+    except OSError:
+        return False
+    proactor.close()
+    return True
+
+
+@test_utils.skipUnless(_has_io_uring(), 'io_uring is not available')
+class IoUringProactorTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.IoUringEventLoop()
+        self.set_event_loop(self.loop)
+        self.proactor = self.loop._proactor
+        self.rsock, self.wsock = test_utils.socketpair()
+        self.rsock.setblocking(False)
+        self.wsock.setblocking(False)
+
+    def tearDown(self):
+        self.rsock.close()
+        self.wsock.close()
+        super(IoUringProactorTests, self).tearDown()
+
+    def test_recv(self):
+        fut = self.proactor.recv(self.rsock, 100)
+        self.assertFalse(fut.done())
+
+        self.wsock.send(b'data')
+        self.assertEqual(b'data', self.loop.run_until_complete(fut))
+
+    def test_send_all(self):
+        data = os.urandom(4 * 1024 * 1024)
+        fut = self.proactor.send(self.wsock, data)
+
+        @asyncio.coroutine
+        def recv_all():
+            received = bytearray()
+            while len(received) < len(data):
+                chunk = yield From(self.proactor.recv(self.rsock, 1024 * 1024))
+                received += chunk
+            raise Return(received)
+
+        outer = asyncio.gather(fut, recv_all(), loop=self.loop)
+        size, received = self.loop.run_until_complete(outer)
+        self.assertEqual(len(data), size)
+        self.assertEqual(data, received)
+
+    def pipe(self):
+        rfd, wfd = os.pipe()
+        rpipe = io.open(rfd, 'rb', 0)
+        wpipe = io.open(wfd, 'wb', 0)
+        self.addCleanup(rpipe.close)
+        self.addCleanup(wpipe.close)
+        unix_events._set_nonblocking(rfd)
+        unix_events._set_nonblocking(wfd)
+        return rpipe, wpipe
+
+    def test_pipe(self):
+        rpipe, wpipe = self.pipe()
+        fut = self.proactor.recv(rpipe, 100)
+        test_utils.run_briefly(self.loop)
+        self.assertFalse(fut.done())
+
+        self.loop.run_until_complete(self.proactor.send(wpipe, b'data'))
+        self.assertEqual(b'data', self.loop.run_until_complete(fut))
+
+    def test_eagain(self):
+        # Old kernels fail with EAGAIN on non-blocking pipes: the proactor
+        # waits until the pipe is readable and submits the read again
+        rpipe, wpipe = self.pipe()
+        fut = self.proactor.recv(rpipe, 100)
+        operation = fut._operation
+        self.proactor._pending.remove(operation)
+        operation.user_data = 0x7fffffff
+        self.proactor._cache[operation.user_data] = operation
+        self.proactor._complete(operation.user_data, -errno.EAGAIN)
+        self.assertEqual(unix_events._POLLIN, operation.poll)
+        self.assertEqual([operation], list(self.proactor._pending))
+
+        test_utils.run_briefly(self.loop)
+        self.assertFalse(fut.done())
+        wpipe.write(b'data')
+        self.assertEqual(b'data', self.loop.run_until_complete(fut))
+        self.assertEqual(0, operation.poll)
+
+    def test_cancel(self):
+        fut = self.proactor.recv(self.rsock, 100)
+        test_utils.run_briefly(self.loop)
+        self.assertIn(fut._operation.user_data, self.proactor._cache)
+        fut.cancel()
+        test_utils.run_briefly(self.loop)
+        self.assertNotIn(fut._operation.user_data, self.proactor._cache)
+
+        self.wsock.send(b'data')
+        fut = self.proactor.recv(self.rsock, 100)
+        self.assertEqual(b'data', self.loop.run_until_complete(fut))
+
+    def test_cancel_before_submit(self):
+        fut = self.proactor.recv(self.rsock, 100)
+        fut.cancel()
+        self.wsock.send(b'data')
+        test_utils.run_briefly(self.loop)
+        self.assertEqual({}, dict(
+            (user_data, operation)
+            for user_data, operation in self.proactor._cache.items()
+            if operation.fd == self.rsock.fileno()))
+        self.assertEqual(b'data', self.rsock.recv(100))
+
+    def test_connect_refused(self):
+        sock = socket.socket()
+        self.addCleanup(sock.close)
+        sock.bind(('127.0.0.1', 0))
+        address = sock.getsockname()
+        client = socket.socket()
+        self.addCleanup(client.close)
+        client.setblocking(False)
+        fut = self.proactor.connect(client, address)
+        self.assertRaises(ConnectionRefusedError,
+                          self.loop.run_until_complete, fut)
+
+    def test_accept(self):
+        listener = socket.socket()
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        listener.setblocking(False)
+        fut = self.proactor.accept(listener)
+        self.assertFalse(fut.done())
+
+        client = socket.socket()
+        self.addCleanup(client.close)
+        client.connect(listener.getsockname())
+        conn, address = self.loop.run_until_complete(fut)
+        self.addCleanup(conn.close)
+        self.assertEqual(client.getsockname(), address)
+        self.assertEqual(0, conn.gettimeout())
+
+        client.send(b'data')
+        data = self.loop.run_until_complete(self.proactor.recv(conn, 10))
+        self.assertEqual(data, b'data')
+
+    def test_send_error(self):
+        # not connected
+        sock = socket.socket()
+        self.addCleanup(sock.close)
+        fut = self.proactor.send(sock, b'data')
+        self.assertRaises(OSError, self.loop.run_until_complete, fut)
+
+    def test_close(self):
+        fut = self.proactor.recv(self.rsock, 100)
+        test_utils.run_briefly(self.loop)
+        self.loop.close()
+        self.assertTrue(fut.cancelled())
+        self.assertEqual({}, self.proactor._cache)
+        self.assertIsNone(self.proactor._ring_fd)
+
+
+class IoUringEventLoopFallbackTests(test_utils.TestCase):
+
+    def test_fallback(self):
+        with mock.patch('trollius.unix_events._io_uring', None):
+            self.assertRaises(OSError, asyncio.IoUringProactor)
+            loop = asyncio.IoUringEventLoop()
+        self.addCleanup(loop.close)
+        self.assertIsInstance(loop._proactor, asyncio.SelectorProactor)
+
+        rsock, wsock = test_utils.socketpair()
+        self.addCleanup(rsock.close)
+        self.addCleanup(wsock.close)
+        rsock.setblocking(False)
+        wsock.send(b'data')
+        self.assertEqual(b'data',
+                         loop.run_until_complete(loop.sock_recv(rsock, 10)))
+
+
 class AbstractChildWatcherTests(test_utils.TestCase):
 
     def test_not_implemented(self):
@@ -1498,6 +2140,156 @@ class FastChildWatcherTests (ChildWatcherTestsMixin, test_utils.TestCase):
         return asyncio.FastChildWatcher()
 
 
+@test_utils.skipUnless(unix_events.ctypes is not None, 'need ctypes')
+class SyscallNumberTests(test_utils.TestCase):
+
+    def syscall_number(self, machine, pointer_size=8):
+        with mock.patch('trollius.unix_events.platform.machine',
+                        return_value=machine):
+            with mock.patch('trollius.unix_events.ctypes.sizeof',
+                            return_value=pointer_size):
+                return unix_events._syscall_number(434)
+
+    def test_generic(self):
+        self.assertEqual(434, self.syscall_number('x86_64'))
+        self.assertEqual(434, self.syscall_number('aarch64'))
+        self.assertEqual(434, self.syscall_number('armv7l', 4))
+        self.assertEqual(434, self.syscall_number('i686', 4))
+        self.assertEqual(434, self.syscall_number('ppc64le'))
+
+    def test_offset(self):
+        self.assertEqual(544, self.syscall_number('alpha'))
+        self.assertEqual(1458, self.syscall_number('ia64'))
+        self.assertEqual(4434, self.syscall_number('mipsel', 4))
+        self.assertEqual(5434, self.syscall_number('mips64'))
+
+    def test_unknown(self):
+        # o32 or n32 ABI
+        self.assertIsNone(self.syscall_number('mips64', 4))
+        # i386 or x32 ABI
+        self.assertIsNone(self.syscall_number('x86_64', 4))
+        self.assertIsNone(self.syscall_number('vax'))
+
+
+@test_utils.skipUnless(unix_events._pidfd_open is not None,
+                       'pidfd_open() is not available')
+class PidfdChildWatcherTests(test_utils.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.SelectorEventLoop()
+        self.set_event_loop(self.loop)
+        self.watcher = asyncio.PidfdChildWatcher()
+        self.watcher.attach_loop(self.loop)
+        self.addCleanup(self.watcher.close)
+        self.results = []
+
+    def callback(self, pid, returncode, *args):
+        self.results.append((pid, returncode) + args)
+
+    def spawn(self, code):
+        with self.watcher:
+            proc = subprocess.Popen([sys.executable, '-c', code])
+            self.watcher.add_child_handler(proc.pid, self.callback, 'arg')
+        return proc
+
+    def test_child_exit(self):
+        proc = self.spawn('import sys; sys.exit(3)')
+        self.assertIn(proc.pid, self.watcher._pidfds)
+        test_utils.run_until(self.loop, lambda: self.results)
+        self.assertEqual(self.results, [(proc.pid, 3, 'arg')])
+        self.assertEqual(self.watcher._pidfds, {})
+        self.assertEqual(self.watcher._callbacks, {})
+        self.assertNotIn(signal.SIGCHLD, self.loop._signal_handlers)
+
+    def test_reap_only_terminated_child(self):
+        sleeper = self.spawn('import time; time.sleep(60)')
+        self.addCleanup(sleeper.wait)
+        self.addCleanup(sleeper.kill)
+        procs = [self.spawn('pass') for i in range(10)]
+        test_utils.run_until(self.loop, lambda: len(self.results) == 10)
+        self.assertEqual(sorted(self.results),
+                         sorted((proc.pid, 0, 'arg') for proc in procs))
+        self.assertEqual(list(self.watcher._pidfds), [sleeper.pid])
+
+        self.assertTrue(self.watcher.remove_child_handler(sleeper.pid))
+        self.assertEqual(self.watcher._pidfds, {})
+        self.assertFalse(self.watcher.remove_child_handler(sleeper.pid))
+
+    def test_already_reaped(self):
+        proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+        proc.wait()
+        with mock.patch('trollius.unix_events.logger'):
+            with self.watcher:
+                self.watcher.add_child_handler(proc.pid, self.callback)
+        self.assertEqual(self.results, [(proc.pid, 255)])
+        self.assertEqual(self.watcher._pidfds, {})
+
+    def test_pidfd_open_error(self):
+        # the child process is running but cannot be watched: the error is
+        # raised instead of reporting the child process as already reaped
+        proc = subprocess.Popen([sys.executable, '-c',
+                                 'import time; time.sleep(60)'])
+        self.addCleanup(proc.wait)
+        self.addCleanup(proc.kill)
+        exc = OSError(errno.EMFILE, os.strerror(errno.EMFILE))
+        with mock.patch('trollius.unix_events._pidfd_open',
+                        side_effect=exc):
+            with self.watcher:
+                with self.assertRaises(OSError) as cm:
+                    self.watcher.add_child_handler(proc.pid, self.callback)
+        self.assertEqual(cm.exception.errno, errno.EMFILE)
+        self.assertEqual(self.watcher._callbacks, {})
+        self.assertEqual(self.watcher._pidfds, {})
+        self.assertEqual(self.results, [])
+        self.assertIsNone(proc.poll())
+
+    def test_subprocess_pidfd_open_error(self):
+        # the child process is terminated if it cannot be watched
+        asyncio.set_child_watcher(self.watcher)
+        self.addCleanup(asyncio.set_child_watcher, None)
+        pids = []
+
+        def pidfd_open(pid):
+            pids.append(pid)
+            raise OSError(errno.EMFILE, os.strerror(errno.EMFILE))
+
+        create = asyncio.create_subprocess_exec(
+            sys.executable, '-c', 'import time; time.sleep(60)',
+            loop=self.loop)
+        with mock.patch('trollius.unix_events._pidfd_open', pidfd_open):
+            self.assertRaises(OSError, self.loop.run_until_complete, create)
+        self.assertEqual(len(pids), 1)
+        pid, status = os.waitpid(pids[0], 0)
+        self.assertTrue(os.WIFSIGNALED(status))
+        self.assertEqual(os.WTERMSIG(status), signal.SIGTERM)
+
+    def test_attach_loop(self):
+        proc = self.spawn('import sys; sys.exit(5)')
+        self.watcher.attach_loop(None)
+        loop = asyncio.SelectorEventLoop()
+        self.addCleanup(loop.close)
+        self.watcher.attach_loop(loop)
+        test_utils.run_until(loop, lambda: self.results)
+        self.assertEqual(self.results, [(proc.pid, 5, 'arg')])
+
+    def test_close(self):
+        proc = self.spawn('import time; time.sleep(60)')
+        self.addCleanup(proc.wait)
+        self.addCleanup(proc.kill)
+        pidfd = self.watcher._pidfds[proc.pid]
+        self.watcher.close()
+        self.assertEqual(self.watcher._pidfds, {})
+        self.assertRaises(OSError, os.fstat, pidfd)
+
+    def test_fallback(self):
+        with mock.patch('trollius.unix_events._pidfd_open', None):
+            watcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(self.loop)
+        self.assertIn(signal.SIGCHLD, self.loop._signal_handlers)
+        watcher.close()
+        self.assertNotIn(signal.SIGCHLD, self.loop._signal_handlers)
+
+
 class PolicyTests(test_utils.TestCase):
 
     def create_policy(self):
@@ -23,9 +23,12 @@ from .coroutines import *
 from .events import *
 from .futures import *
 from .locks import *
+from .pool import *
+from .process_pool import *
 from .protocols import *
 from .py33_exceptions import *
 from .queues import *
+from .resolver import *
 from .streams import *
 from .subprocess import *
 from .tasks import *
@@ -37,8 +40,11 @@ __all__ = (base_events.__all__ +
            py33_exceptions.__all__ +
            futures.__all__ +
            locks.__all__ +
+           pool.__all__ +
+           process_pool.__all__ +
            protocols.__all__ +
            queues.__all__ +
+           resolver.__all__ +
            streams.__all__ +
            subprocess.__all__ +
            tasks.__all__ +
@@ -38,6 +38,7 @@ from . import compat
 from . import coroutines
 from . import events
 from . import futures
+from . import protocols
 from . import tasks
 from .coroutines import coroutine, From, Return
 from .executor import get_default_executor
@@ -125,24 +126,99 @@ def _run_until_complete_cb(fut):
 
 class Server(events.AbstractServer):
 
-    def __init__(self, loop, sockets):
+    def __init__(self, loop, sockets, protocol_factory=None, ssl=None,
+                 max_connections=None, accept_pause_threshold=None,
+                 idle_timeout=None):
+        if max_connections is not None and max_connections < 1:
+            raise ValueError('max_connections must be at least 1')
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError('idle_timeout must be positive')
+        if accept_pause_threshold is None:
+            accept_pause_threshold = max_connections
+        elif accept_pause_threshold < 1:
+            raise ValueError('accept_pause_threshold must be at least 1')
         self._loop = loop
         self.sockets = sockets
+        self._protocol_factory = protocol_factory
+        self._ssl = ssl
+        self._max_connections = max_connections
+        self._accept_pause_threshold = accept_pause_threshold
+        if accept_pause_threshold is not None:
+            # Accept again when the number of connections drops to 3/4 of
+            # the threshold, to not toggle on each connection
+            self._accept_resume_threshold = accept_pause_threshold * 3 // 4
+        else:
+            self._accept_resume_threshold = None
+        self._accept_paused = False
+        self._idle_timeout = idle_timeout
         self._active_count = 0
+        self._rejected_count = 0
         self._waiters = []
 
     def __repr__(self):
         return '<%s sockets=%r>' % (self.__class__.__name__, self.sockets)
 
+    @property
+    def active_count(self):
+        """Number of open connections."""
+        return self._active_count
+
+    @property
+    def rejected_count(self):
+        """Number of connections closed because max_connections was
+        reached."""
+        return self._rejected_count
+
+    @property
+    def accept_paused(self):
+        """True if the server stopped accepting new connections because
+        accept_pause_threshold was reached."""
+        return self._accept_paused
+
     def _attach(self):
         assert self.sockets is not None
         self._active_count += 1
+        if (self._accept_pause_threshold is not None
+        and not self._accept_paused
+        and self._active_count >= self._accept_pause_threshold):
+            self._pause_accepting()
 
     def _detach(self):
         assert self._active_count > 0
         self._active_count -= 1
         if self._active_count == 0 and self.sockets is None:
             self._wakeup()
+        elif (self._accept_paused
+        and self._active_count <= self._accept_resume_threshold):
+            self._resume_accepting()
+
+    def _reject_connection(self):
+        """Return True if a new connection must be closed because
+        max_connections is reached."""
+        if (self._max_connections is not None
+        and self._active_count >= self._max_connections):
+            self._rejected_count += 1
+            return True
+        return False
+
+    def _pause_accepting(self):
+        self._accept_paused = True
+        if self._loop._debug:
+            logger.debug("%r pauses accepting connections: %s active",
+                         self, self._active_count)
+        for sock in self.sockets:
+            self._loop._pause_serving(sock)
+
+    def _resume_accepting(self):
+        self._accept_paused = False
+        if self.sockets is None:
+            return
+        if self._loop._debug:
+            logger.debug("%r resumes accepting connections: %s active",
+                         self, self._active_count)
+        for sock in self.sockets:
+            self._loop._start_serving(self._protocol_factory, sock,
+                                      self._ssl, self)
 
     def close(self):
         sockets = self.sockets
@@ -170,14 +246,87 @@ class Server(events.AbstractServer):
         yield From(waiter)
 
 
+def _set_transport_protocol(transport, protocol):
+    ssl_protocol = getattr(transport, '_ssl_protocol', None)
+    if ssl_protocol is not None:
+        # _SSLProtocolTransport: replace the application protocol
+        ssl_protocol._app_protocol = protocol
+    else:
+        transport._protocol = protocol
+
+
+class _RelayProtocol(protocols.Protocol):
+    """Protocol forwarding the data read from its transport to the
+    transport of its peer, used by BaseEventLoop.relay()."""
+
+    def __init__(self, transport, done):
+        self._transport = transport
+        self._done = done
+        self._peer = None
+        self._eof = False
+        self._closed = False
+        self._exc = None
+        self._peer_paused = False
+
+    def data_received(self, data):
+        self._peer._transport.write(data)
+
+    def eof_received(self):
+        self._eof = True
+        peer = self._peer
+        if peer._closed:
+            return False
+        if peer._eof or not peer._transport.can_write_eof():
+            # Both directions are finished, or the peer cannot be half
+            # closed: close() flushes the write buffers
+            peer._transport.close()
+            return False
+        peer._transport.write_eof()
+        return True
+
+    def pause_writing(self):
+        # The peer sends faster than our transport writes
+        peer = self._peer
+        if peer._closed or peer._eof or self._peer_paused:
+            return
+        self._peer_paused = True
+        peer._transport.pause_reading()
+
+    def resume_writing(self):
+        if not self._peer_paused:
+            return
+        self._peer_paused = False
+        if not self._peer._closed:
+            self._peer._transport.resume_reading()
+
+    def connection_lost(self, exc):
+        self._closed = True
+        self._exc = exc
+        peer = self._peer
+        if not peer._closed:
+            peer._transport.close()
+            return
+        if self._done.done():
+            return
+        exc = peer._exc or exc
+        if exc is not None:
+            self._done.set_exception(exc)
+        else:
+            self._done.set_result(None)
+
+
 class BaseEventLoop(events.AbstractEventLoop):
 
+    # True if the loop implements _set_idle_timeout()
+    _supports_idle_timeout = False
+
     def __init__(self):
         self._timer_cancelled_count = 0
         self._closed = False
         self._ready = collections.deque()
         self._scheduled = []
         self._default_executor = None
+        self._resolver = None
         self._internal_fds = 0
         # Identifier of the thread running the event loop, or None if the
         # event loop is not running
@@ -189,6 +338,7 @@ class BaseEventLoop(events.AbstractEventLoop):
         # exceed this duration in seconds, the slow callback/task is logged.
         self.slow_callback_duration = 0.1
         self._current_handle = None
+        self._eager_tasks = False
 
     def __repr__(self):
         return ('<%s running=%s closed=%s debug=%s>'
@@ -201,7 +351,7 @@ class BaseEventLoop(events.AbstractEventLoop):
         Return a task object.
         """
         self._check_closed()
-        task = tasks.Task(coro, loop=self)
+        task = tasks.Task(coro, loop=self, eager_start=self._eager_tasks)
         if task._source_traceback:
             del task._source_traceback[-1]
         return task
@@ -239,6 +389,26 @@ class BaseEventLoop(events.AbstractEventLoop):
         """Create subprocess transport."""
         raise NotImplementedError
 
+    def _pause_serving(self, sock):
+        """Stop accepting connections on a listening socket until
+        _start_serving() is called again."""
+        raise NotImplementedError
+
+    def _set_idle_timeout(self, transport, timeout):
+        """Close the transport after timeout seconds without activity."""
+        raise NotImplementedError
+
+    def _check_idle_timeout(self, idle_timeout):
+        # Check the idle_timeout parameter before creating a connection or a
+        # server, so nothing has to be closed on error
+        if idle_timeout is None:
+            return
+        if idle_timeout <= 0:
+            raise ValueError('idle_timeout must be positive')
+        if not self._supports_idle_timeout:
+            raise NotImplementedError('%s does not support idle_timeout'
+                                      % self.__class__.__name__)
+
     def _write_to_self(self):
         """Write a byte to self-pipe, to wake up the event loop.
 
@@ -248,6 +418,14 @@ class BaseEventLoop(events.AbstractEventLoop):
         """
         raise NotImplementedError
 
+    def _apply_interest_changes(self):
+        """Apply pending changes of the selector before polling."""
+        pass
+
+    def _select(self, timeout):
+        """Poll for I/O and return the events for _process_events()."""
+        return self._selector.select(timeout)
+
     def _process_events(self, event_list):
         """Process selector events."""
         raise NotImplementedError
@@ -337,6 +515,10 @@ class BaseEventLoop(events.AbstractEventLoop):
         if executor is not None:
             self._default_executor = None
             executor.shutdown(wait=False)
+        resolver = self._resolver
+        if resolver is not None:
+            self._resolver = None
+            resolver.close()
 
     def is_closed(self):
         """Returns True if the event loop was closed."""
@@ -470,6 +652,22 @@ class BaseEventLoop(events.AbstractEventLoop):
     def set_default_executor(self, executor):
         self._default_executor = executor
 
+    def get_resolver(self):
+        """Return the resolver used by getaddrinfo() and getnameinfo().
+
+        Return None if the default executor is used.
+        """
+        return self._resolver
+
+    def set_resolver(self, resolver):
+        """Set the resolver used by getaddrinfo() and getnameinfo().
+
+        resolver must be an AbstractResolver instance, or None to run the
+        blocking socket functions in the default executor.  The resolver is
+        closed when the event loop is closed.
+        """
+        self._resolver = resolver
+
     def _getaddrinfo_debug(self, host, port, family, type, proto, flags):
         msg = ["%s:%r" % (host, port)]
         if family:
@@ -497,6 +695,9 @@ class BaseEventLoop(events.AbstractEventLoop):
 
     def getaddrinfo(self, host, port,
                     family=0, type=0, proto=0, flags=0):
+        if self._resolver is not None:
+            return self._resolver.getaddrinfo(host, port,
+                                              family, type, proto, flags)
         if self._debug:
             return self.run_in_executor(None, self._getaddrinfo_debug,
                                         host, port, family, type, proto, flags)
@@ -505,12 +706,15 @@ class BaseEventLoop(events.AbstractEventLoop):
                                         host, port, family, type, proto, flags)
 
     def getnameinfo(self, sockaddr, flags=0):
+        if self._resolver is not None:
+            return self._resolver.getnameinfo(sockaddr, flags)
         return self.run_in_executor(None, socket.getnameinfo, sockaddr, flags)
 
     @coroutine
     def create_connection(self, protocol_factory, host=None, port=None,
                           ssl=None, family=0, proto=0, flags=0, sock=None,
-                          local_addr=None, server_hostname=None):
+                          local_addr=None, server_hostname=None,
+                          idle_timeout=None):
         """Connect to a TCP server.
 
         Create a streaming transport connection to a given Internet host and
@@ -521,7 +725,13 @@ class BaseEventLoop(events.AbstractEventLoop):
         This method is a coroutine which will try to establish the connection
         in the background.  When successful, the coroutine returns a
         (transport, protocol) pair.
+
+        If idle_timeout is set, the transport is closed when nothing was
+        read or written during idle_timeout seconds.  Only selector event
+        loops support idle_timeout, other loops raise NotImplementedError.
         """
+        self._check_idle_timeout(idle_timeout)
+
         if server_hostname is not None and not ssl:
             raise ValueError('server_hostname is only meaningful with ssl')
 
@@ -623,6 +833,8 @@ class BaseEventLoop(events.AbstractEventLoop):
 
         transport, protocol = yield From(self._create_connection_transport(
             sock, protocol_factory, ssl, server_hostname))
+        if idle_timeout is not None:
+            self._set_idle_timeout(transport, idle_timeout)
         if self._debug:
             # Get the socket from the transport because SSL transport closes
             # the old socket and creates a new SSL socket
@@ -749,15 +961,30 @@ class BaseEventLoop(events.AbstractEventLoop):
                       sock=None,
                       backlog=100,
                       ssl=None,
-                      reuse_address=None):
+                      reuse_address=None,
+                      max_connections=None,
+                      accept_pause_threshold=None,
+                      idle_timeout=None):
         """Create a TCP server bound to host and port.
 
         Return a Server object which can be used to stop the service.
 
+        If max_connections is set, new connections are closed while the
+        server has max_connections open connections.  When the server has
+        accept_pause_threshold open connections (defaults to
+        max_connections), it stops accepting connections until the number
+        of connections drops to 3/4 of the threshold; pending clients wait
+        in the listen backlog meanwhile.
+
+        If idle_timeout is set, connections are closed when nothing was read
+        or written during idle_timeout seconds.  Only selector event loops
+        support idle_timeout, other loops raise NotImplementedError.
+
         This method is a coroutine.
         """
         if isinstance(ssl, bool):
             raise TypeError('ssl argument must be an SSLContext or None')
+        self._check_idle_timeout(idle_timeout)
         if host is not None or port is not None:
             if sock is not None:
                 raise ValueError(
@@ -817,7 +1044,9 @@ class BaseEventLoop(events.AbstractEventLoop):
                 raise ValueError('Neither host/port nor sock were specified')
             sockets = [sock]
 
-        server = Server(self, sockets)
+        server = Server(self, sockets, protocol_factory, ssl,
+                        max_connections, accept_pause_threshold,
+                        idle_timeout)
         for sock in sockets:
             sock.listen(backlog)
             sock.setblocking(False)
@@ -826,6 +1055,36 @@ class BaseEventLoop(events.AbstractEventLoop):
             logger.info("%r is serving", server)
         raise Return(server)
 
+    def relay(self, transport_a, transport_b):
+        """Relay data between two connected transports.
+
+        The protocols of the transports are replaced: data read from each
+        transport is written to the other one, without intermediate buffer.
+        While the write buffer of a transport is over its high-water mark,
+        reading from the other transport is paused. End of file is forwarded
+        with write_eof() when the transport supports it.
+
+        Return a Future which completes when both transports are closed. Its
+        exception is the first error which closed a transport, if any.
+        Cancelling it aborts both transports.
+        """
+        done = futures.Future(loop=self)
+        proto_a = _RelayProtocol(transport_a, done)
+        proto_b = _RelayProtocol(transport_b, done)
+        proto_a._peer = proto_b
+        proto_b._peer = proto_a
+        _set_transport_protocol(transport_a, proto_a)
+        _set_transport_protocol(transport_b, proto_b)
+
+        def abort_on_cancel(fut):
+            if fut.cancelled():
+                for proto in (proto_a, proto_b):
+                    if not proto._closed:
+                        proto._transport.abort()
+
+        done.add_done_callback(abort_on_cancel)
+        return done
+
     @coroutine
     def connect_read_pipe(self, protocol_factory, pipe):
         protocol = protocol_factory()
@@ -1104,9 +1363,10 @@ class BaseEventLoop(events.AbstractEventLoop):
             when = self._scheduled[0]._when
             timeout = max(0, when - self.time())
 
+        self._apply_interest_changes()
         if self._debug and timeout != 0:
             t0 = self.time()
-            event_list = self._selector.select(timeout)
+            event_list = self._select(timeout)
             dt = self.time() - t0
             if dt >= 1.0:
                 level = logging.INFO
@@ -1125,7 +1385,7 @@ class BaseEventLoop(events.AbstractEventLoop):
                            'poll %.3f ms took %.3f ms: timeout',
                            timeout * 1e3, dt * 1e3)
         else:
-            event_list = self._selector.select(timeout)
+            event_list = self._select(timeout)
         self._process_events(event_list)
 
         # Handle 'later' callbacks that are ready.
@@ -1169,3 +1429,16 @@ class BaseEventLoop(events.AbstractEventLoop):
 
     def set_debug(self, enabled):
         self._debug = enabled
+
+    def get_eager_tasks(self):
+        return self._eager_tasks
+
+    def set_eager_tasks(self, enabled):
+        """Enable or disable the eager execution of tasks.
+
+        When enabled, create_task() runs the first step of the coroutine
+        immediately if the event loop is running, instead of scheduling it
+        with call_soon().  A coroutine which completes without blocking
+        returns a task which is already done.
+        """
+        self._eager_tasks = bool(enabled)
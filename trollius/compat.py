@@ -52,6 +52,20 @@ def flatten_bytes(data):
     else:
         return data
 
+if PY26:
+    def buffer_tail(data, offset):
+        """
+        Return data[offset:] without copying the data.
+        """
+        # Python 2.6 has no memoryview
+        return buffer(data, offset)
+else:
+    def buffer_tail(data, offset):
+        """
+        Return data[offset:] without copying the data.
+        """
+        return memoryview(data)[offset:]
+
 if PY3:
     def reraise(tp, value, tb=None):
         if value.__traceback__ is not tb:
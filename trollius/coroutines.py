@@ -77,33 +77,43 @@ if compat.PY33:
         return StopIteration(value)
 else:
     class Return(StopIteration):
-        def __init__(self, *args):
-            StopIteration.__init__(self)
+        # The value is computed from the arguments of the exception, so
+        # creating a Return object does not run a __init__() method written
+        # in Python: "raise Return(value)" ends most coroutines.
+        @property
+        def value(self):
+            args = self.args
             if not args:
-                self.value = None
+                return None
             elif len(args) == 1:
-                self.value = args[0]
+                return args[0]
             else:
-                self.value = args
-            self.raised = False
-            if _DEBUG:
+                return args
+
+    if _DEBUG:
+        # Like the CoroWrapper of @coroutine, the check is enabled when the
+        # module is imported with _DEBUG true
+        _Return = Return
+
+        class Return(_Return):
+            def __init__(self, *args):
+                _Return.__init__(self, *args)
+                self.raised = False
                 frame = sys._getframe(1)
                 self._source_traceback = traceback.extract_stack(frame)
                 # explicitly clear the reference to avoid reference cycles
                 frame = None
-            else:
-                self._source_traceback = None
 
-        def __del__(self):
-            if self.raised:
-                return
+            def __del__(self):
+                if self.raised:
+                    return
 
-            fmt = 'Return(%r) used without raise'
-            if self._source_traceback:
-                fmt += '\nReturn created at (most recent call last):\n'
-                tb = ''.join(traceback.format_list(self._source_traceback))
-                fmt += tb.rstrip()
-            logger.error(fmt, self.value)
+                fmt = 'Return(%r) used without raise'
+                if self._source_traceback:
+                    fmt += '\nReturn created at (most recent call last):\n'
+                    tb = ''.join(traceback.format_list(self._source_traceback))
+                    fmt += tb.rstrip()
+                logger.error(fmt, self.value)
 
 
 def _coroutine_at_yield_from(coro):
@@ -162,8 +172,8 @@ class CoroWrapper(object):
         def send(self, value):
             return self.gen.send(value)
 
-    def throw(self, exc):
-        return self.gen.throw(exc)
+    def throw(self, exc_type, exc_value=None, exc_tb=None):
+        return self.gen.throw(exc_type, exc_value, exc_tb)
 
     def close(self):
         return self.gen.close()
@@ -325,12 +325,15 @@ else:
 
         def create_connection(self, protocol_factory, host=None, port=None,
                               ssl=None, family=0, proto=0, flags=0, sock=None,
-                              local_addr=None, server_hostname=None):
+                              local_addr=None, server_hostname=None,
+                              idle_timeout=None):
             raise NotImplementedError
 
         def create_server(self, protocol_factory, host=None, port=None,
                           family=socket.AF_UNSPEC, flags=socket.AI_PASSIVE,
-                          sock=None, backlog=100, ssl=None, reuse_address=None):
+                          sock=None, backlog=100, ssl=None, reuse_address=None,
+                          max_connections=None, accept_pause_threshold=None,
+                          idle_timeout=None):
             """A coroutine which creates a TCP server bound to host and port.
 
             The return value is a Server object which can be used to stop
@@ -359,6 +362,17 @@ else:
             TIME_WAIT state, without waiting for its natural timeout to
             expire. If not specified will automatically be set to True on
             UNIX.
+
+            max_connections is the maximum number of open connections: new
+            connections are closed when it is reached.
+
+            accept_pause_threshold is the number of open connections from
+            which the server stops accepting connections, until the number
+            of connections drops to 3/4 of the threshold (defaults to
+            max_connections).
+
+            idle_timeout is the number of seconds after which a connection
+            is closed if nothing was read or written.
             """
             raise NotImplementedError
 
@@ -393,6 +407,16 @@ else:
                                      family=0, proto=0, flags=0):
             raise NotImplementedError
 
+        def relay(self, transport_a, transport_b):
+            """Relay data between two connected transports.
+
+            Data read from each transport is written to the other one. The
+            reading side is paused while the writing side buffers more than
+            its high-water mark. Return a Future which completes when both
+            transports are closed.
+            """
+            raise NotImplementedError
+
         # Pipes and subprocesses.
 
         def connect_read_pipe(self, protocol_factory, pipe):
@@ -487,6 +511,12 @@ else:
         def set_debug(self, enabled):
             raise NotImplementedError
 
+        def get_eager_tasks(self):
+            raise NotImplementedError
+
+        def set_eager_tasks(self, enabled):
+            raise NotImplementedError
+
 
     class AbstractEventLoopPolicy(object):
         """Abstract policy for accessing the event loop."""
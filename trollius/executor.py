@@ -66,7 +66,7 @@ except ImportError:
         def shutdown(self, wait):
             pass
 
-    def get_default_executor():
+    def get_default_executor(max_workers=_MAX_WORKERS):
         logger.error("concurrent.futures module is missing: "
                      "use a synchrounous executor as fallback!")
         return SynchronousExecutor()
@@ -80,5 +80,5 @@ else:
     CancelledError = concurrent.futures.CancelledError
     TimeoutError = concurrent.futures.TimeoutError
 
-    def get_default_executor():
-        return concurrent.futures.ThreadPoolExecutor(_MAX_WORKERS)
+    def get_default_executor(max_workers=_MAX_WORKERS):
+        return concurrent.futures.ThreadPoolExecutor(max_workers)
@@ -0,0 +1,295 @@
+"""Pool of stream connections."""
+
+__all__ = ['ConnectionPool', 'PooledConnection']
+
+import collections
+
+from . import events
+from . import futures
+from . import streams
+from .coroutines import coroutine, From, Return
+
+
+class PooledConnection(object):
+    """Connection of a ConnectionPool.
+
+    The reader and writer attributes are the StreamReader and StreamWriter
+    of the connection.  Give the connection back to the pool with
+    ConnectionPool.release().
+    """
+
+    def __init__(self, key, reader, writer):
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self._in_use = True
+        self._expire_handle = None
+        # loop time when the connection was released to the pool
+        self._idle_since = None
+
+    def __repr__(self):
+        info = [self.__class__.__name__, 'key=%r' % (self.key,)]
+        if self._in_use:
+            info.append('in use')
+        else:
+            info.append('idle')
+        return '<%s>' % ' '.join(info)
+
+    def _close(self):
+        if self._expire_handle is not None:
+            self._expire_handle.cancel()
+            self._expire_handle = None
+        self.writer.close()
+
+
+class ConnectionPool(object):
+    """Pool of connections, to reuse connections to the same server.
+
+    Connections are grouped by (host, port, ssl) key.  At most max_per_key
+    connections are open for a key and at most max_total connections are open
+    in the pool.  When a limit is reached, acquire() waits until a connection
+    is released or closed.
+
+    A connection which stays idle in the pool longer than idle_timeout seconds
+    is closed.  Connections closed by the peer, or having received unexpected
+    data while idle, are considered stale and are never reused.
+
+    Extra keyword arguments are passed to open_connection().
+    """
+
+    def __init__(self, max_per_key=10, max_total=100, idle_timeout=60.0,
+                 loop=None, **connect_kwds):
+        if max_per_key < 1 or max_total < 1:
+            raise ValueError('max_per_key and max_total must be at least 1')
+        if loop is None:
+            self._loop = events.get_event_loop()
+        else:
+            self._loop = loop
+        self._max_per_key = max_per_key
+        self._max_total = max_total
+        self._idle_timeout = idle_timeout
+        self._connect_kwds = connect_kwds
+        self._closed = False
+
+        # {key: deque of idle PooledConnection}, most recently released last
+        self._idle = {}
+        # {key: number of open connections, idle or in use}
+        self._open = collections.defaultdict(int)
+        self._total = 0
+        # {key: deque of Futures of acquire() calls waiting for the limits}
+        self._waiters = {}
+
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+    def __repr__(self):
+        idle = sum(len(conns) for conns in self._idle.values())
+        info = [self.__class__.__name__,
+                'open=%s' % self._total, 'idle=%s' % idle]
+        if self._closed:
+            info.append('closed')
+        return '<%s>' % ' '.join(info)
+
+    def get_stats(self):
+        """Return a dictionary of statistics.
+
+        - 'hits': number of connections reused from the pool;
+        - 'misses': number of connections opened;
+        - 'hit_rate': hits / (hits + misses), 0.0 before the first acquire();
+        - 'waits': number of acquire() calls which had to wait for a limit;
+        - 'wait_time': total time in seconds spent waiting for a limit;
+        - 'open': number of open connections, idle or in use;
+        - 'idle': number of idle connections.
+        """
+        total = self._hits + self._misses
+        if total:
+            hit_rate = float(self._hits) / total
+        else:
+            hit_rate = 0.0
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': hit_rate,
+            'waits': self._waits,
+            'wait_time': self._wait_time,
+            'open': self._total,
+            'idle': sum(len(conns) for conns in self._idle.values()),
+        }
+
+    def _is_stale(self, conn):
+        # The peer closed the connection, an error occurred, or the peer
+        # sent data which was not requested
+        reader = conn.reader
+        return (reader._eof
+                or reader.exception() is not None
+                or bool(reader._buffer))
+
+    def _get_idle(self, key):
+        conns = self._idle.get(key)
+        while conns:
+            conn = conns.pop()
+            if not conns:
+                del self._idle[key]
+            if self._is_stale(conn):
+                self._discard(conn)
+                continue
+            if conn._expire_handle is not None:
+                conn._expire_handle.cancel()
+                conn._expire_handle = None
+            conn._in_use = True
+            return conn
+        return None
+
+    def _close_oldest_idle(self):
+        # Close the connection idle for the longest time to make room for
+        # a new connection when the global limit is reached.
+        oldest = None
+        for conns in self._idle.values():
+            conn = conns[0]
+            if oldest is None or conn._idle_since < oldest._idle_since:
+                oldest = conn
+        if oldest is None:
+            return False
+        self._remove_idle(oldest)
+        self._discard(oldest)
+        return True
+
+    def _remove_idle(self, conn):
+        conns = self._idle[conn.key]
+        conns.remove(conn)
+        if not conns:
+            del self._idle[conn.key]
+
+    def _discard(self, conn):
+        conn._close()
+        self._open[conn.key] -= 1
+        if not self._open[conn.key]:
+            del self._open[conn.key]
+        self._total -= 1
+        self._wakeup_waiter(conn.key)
+
+    def _expire(self, conn):
+        conn._expire_handle = None
+        self._remove_idle(conn)
+        self._discard(conn)
+
+    def _wakeup_waiter(self, key):
+        # Wake up a waiter of the same key, or else a waiter of any key
+        # blocked by the global limit.
+        keys = [key]
+        keys.extend(other for other in self._waiters if other != key)
+        for key in keys:
+            waiters = self._waiters.get(key)
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiters:
+                    del self._waiters[key]
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+
+    def _can_open(self, key):
+        if self._open.get(key, 0) >= self._max_per_key:
+            return False
+        if self._total < self._max_total:
+            return True
+        return self._close_oldest_idle()
+
+    @coroutine
+    def _open_connection(self, key):
+        host, port, ssl = key
+        self._open[key] += 1
+        self._total += 1
+        try:
+            reader, writer = yield From(streams.open_connection(
+                host, port, ssl=ssl, loop=self._loop, **self._connect_kwds))
+        except:
+            self._open[key] -= 1
+            if not self._open[key]:
+                del self._open[key]
+            self._total -= 1
+            self._wakeup_waiter(key)
+            raise
+        raise Return(PooledConnection(key, reader, writer))
+
+    @coroutine
+    def acquire(self, host, port, ssl=None):
+        """Get an idle connection to (host, port, ssl) or open a new one.
+
+        This method is a coroutine.
+        """
+        key = (host, port, ssl)
+        started = None
+        while True:
+            if self._closed:
+                raise RuntimeError('Connection pool is closed')
+
+            conn = self._get_idle(key)
+            if conn is not None:
+                self._hits += 1
+                break
+
+            if self._can_open(key):
+                conn = yield From(self._open_connection(key))
+                self._misses += 1
+                break
+
+            waiter = futures.Future(loop=self._loop)
+            waiters = self._waiters.setdefault(key, collections.deque())
+            if started is None:
+                self._waits += 1
+                started = self._loop.time()
+                waiters.append(waiter)
+            else:
+                # Woken up but another task was faster: keep our place in
+                # the queue.
+                waiters.appendleft(waiter)
+            try:
+                yield From(waiter)
+            except futures.CancelledError:
+                # Pass the wake up to another waiter
+                if waiter.done() and not waiter.cancelled():
+                    self._wakeup_waiter(key)
+                raise
+
+        if started is not None:
+            self._wait_time += self._loop.time() - started
+        raise Return(conn)
+
+    def release(self, conn, discard=False):
+        """Give a connection back to the pool.
+
+        The connection is closed instead of being kept for reuse if discard
+        is true, if it is stale or if the pool is closed.
+        """
+        if not conn._in_use:
+            raise RuntimeError('%r is not in use' % (conn,))
+        conn._in_use = False
+        if discard or self._closed or self._is_stale(conn):
+            self._discard(conn)
+            return
+
+        self._idle.setdefault(conn.key, collections.deque()).append(conn)
+        conn._idle_since = self._loop.time()
+        conn._expire_handle = self._loop.call_later(self._idle_timeout,
+                                                    self._expire, conn)
+        self._wakeup_waiter(conn.key)
+
+    def close(self):
+        """Close idle connections and refuse new acquire() calls.
+
+        Connections in use are closed when they are released.
+        """
+        self._closed = True
+        for conns in list(self._idle.values()):
+            for conn in list(conns):
+                self._remove_idle(conn)
+                self._discard(conn)
+        for waiters in self._waiters.values():
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+        self._waiters.clear()
@@ -1,11 +1,12 @@
 """Event loop using a proactor and related classes.
 
-A proactor is a "notify-on-completion" multiplexer.  Currently a
-proactor is only implemented on Windows with IOCP.
+A proactor is a "notify-on-completion" multiplexer.  A proactor is
+implemented on Windows with IOCP, and on Unix on top of a selector.
 """
 
 __all__ = ['BaseProactorEventLoop']
 
+import errno
 import socket
 
 from . import base_events
@@ -114,7 +115,13 @@ class _ProactorBasePipeTransport(transports._FlowControlMixin,
             # just close our end.  First calling shutdown() seems to
             # cure it, but maybe using DisconnectEx() would be better.
             if hasattr(self._sock, 'shutdown'):
-                self._sock.shutdown(socket.SHUT_RDWR)
+                try:
+                    self._sock.shutdown(socket.SHUT_RDWR)
+                except socket.error as exc:
+                    # On Unix, shutdown() fails if the socket is not
+                    # connected
+                    if exc.errno != errno.ENOTCONN:
+                        raise
             self._sock.close()
             self._sock = None
             server = self._server
@@ -491,17 +498,23 @@ class BaseProactorEventLoop(base_events.BaseEventLoop):
                     if self._debug:
                         logger.debug("%r got a new connection from %r: %r",
                                      server, addr, conn)
-                    protocol = protocol_factory()
-                    if sslcontext is not None:
-                        self._make_ssl_transport(
-                            conn, protocol, sslcontext, server_side=True,
-                            extra={'peername': addr}, server=server)
+                    if server is not None and server._reject_connection():
+                        conn.close()
                     else:
-                        self._make_socket_transport(
-                            conn, protocol,
-                            extra={'peername': addr}, server=server)
+                        protocol = protocol_factory()
+                        if sslcontext is not None:
+                            self._make_ssl_transport(
+                                conn, protocol, sslcontext, server_side=True,
+                                extra={'peername': addr}, server=server)
+                        else:
+                            self._make_socket_transport(
+                                conn, protocol,
+                                extra={'peername': addr}, server=server)
                 if self.is_closed():
                     return
+                if server is not None and server._accept_paused:
+                    # Server._resume_accepting() calls _start_serving()
+                    return
                 f = self._proactor.accept(sock)
             except OSError as exc:
                 if sock.fileno() != -1:
@@ -526,6 +539,11 @@ class BaseProactorEventLoop(base_events.BaseEventLoop):
         # Events are processed in the IocpProactor._poll() method
         pass
 
+    def _pause_serving(self, sock):
+        # The accept loop of _start_serving() checks Server._accept_paused
+        # before accepting the next connection
+        pass
+
     def _stop_accept_futures(self):
         for future in self._accept_futures.values():
             future.cancel()
@@ -0,0 +1,327 @@
+"""Pool of worker processes for CPU-bound functions."""
+from __future__ import absolute_import
+
+__all__ = ['ProcessPool']
+
+import collections
+import itertools
+import os
+import struct
+import subprocess
+import sys
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from . import events
+from . import futures
+from . import protocols
+from . import tasks
+from .coroutines import coroutine, From
+from .log import logger
+
+
+# A message is the size of its body followed by the body: a sequence of
+# records.  A record is a job identifier and the size of the pickled data,
+# followed by the pickled data.
+_MESSAGE_HEADER = struct.Struct('>I')
+_RECORD_HEADER = struct.Struct('>QI')
+
+_WORKER_CODE = 'from trollius.process_pool import _worker_main; _worker_main()'
+
+
+def _cpu_count():
+    try:
+        return os.cpu_count() or 1
+    except AttributeError:
+        # Python 3.3 and older
+        import multiprocessing
+        return multiprocessing.cpu_count()
+
+
+def _pack_message(records):
+    body = b''.join(_RECORD_HEADER.pack(job_id, len(data)) + data
+                    for job_id, data in records)
+    return _MESSAGE_HEADER.pack(len(body)) + body
+
+
+def _unpack_records(body):
+    records = []
+    pos = 0
+    while pos < len(body):
+        job_id, size = _RECORD_HEADER.unpack_from(body, pos)
+        pos += _RECORD_HEADER.size
+        records.append((job_id, body[pos:pos + size]))
+        pos += size
+    return records
+
+
+def _read_exactly(fd, size):
+    chunks = []
+    while size:
+        data = os.read(fd, size)
+        if not data:
+            return None
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+
+def _dump_result(ok, value):
+    try:
+        return pickle.dumps((ok, value), pickle.HIGHEST_PROTOCOL)
+    except Exception as exc:
+        if ok:
+            error = 'cannot pickle the result %r: %s' % (value, exc)
+        else:
+            error = 'cannot pickle the exception %r: %s' % (value, exc)
+        return pickle.dumps((False, RuntimeError(error)),
+                            pickle.HIGHEST_PROTOCOL)
+
+
+def _worker_main():
+    """Main loop of a worker process: run the jobs read from stdin."""
+    # Send results on a copy of stdout and redirect stdout to stderr, so
+    # that print() in a job cannot corrupt the results.
+    rfd = 0
+    wfd = os.dup(1)
+    os.dup2(2, 1)
+
+    while True:
+        header = _read_exactly(rfd, _MESSAGE_HEADER.size)
+        if header is None:
+            # the pool closed the pipe
+            break
+        size, = _MESSAGE_HEADER.unpack(header)
+        body = _read_exactly(rfd, size)
+        if body is None:
+            break
+
+        results = []
+        for job_id, data in _unpack_records(body):
+            try:
+                func, args, kwargs = pickle.loads(data)
+                value = func(*args, **kwargs)
+            except Exception as exc:
+                results.append((job_id, _dump_result(False, exc)))
+            else:
+                results.append((job_id, _dump_result(True, value)))
+
+        message = _pack_message(results)
+        while message:
+            written = os.write(wfd, message)
+            message = message[written:]
+
+
+class _WorkerProtocol(protocols.SubprocessProtocol):
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._buffer = bytearray()
+        self.transport = None
+        # {job_id: future} of the batch sent to the worker
+        self.jobs = {}
+        self.exited = futures.Future(loop=pool._loop)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, jobs):
+        for job_id, data, future in jobs:
+            self.jobs[job_id] = future
+        message = _pack_message((job_id, data) for job_id, data, fut in jobs)
+        self.transport.get_pipe_transport(0).write(message)
+
+    def pipe_data_received(self, fd, data):
+        if fd != 1:
+            return
+        self._buffer.extend(data)
+        while len(self._buffer) >= _MESSAGE_HEADER.size:
+            size, = _MESSAGE_HEADER.unpack_from(self._buffer)
+            end = _MESSAGE_HEADER.size + size
+            if len(self._buffer) < end:
+                break
+            body = bytes(self._buffer[_MESSAGE_HEADER.size:end])
+            del self._buffer[:end]
+            for job_id, data in _unpack_records(body):
+                self._set_result(job_id, data)
+            self._pool._dispatch()
+
+    def _set_result(self, job_id, data):
+        future = self.jobs.pop(job_id, None)
+        if future is None or future.cancelled():
+            return
+        try:
+            ok, value = pickle.loads(data)
+        except Exception as exc:
+            future.set_exception(exc)
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def connection_lost(self, exc):
+        returncode = self.transport.get_returncode()
+        self.transport.close()
+        if self.jobs:
+            error = RuntimeError('worker process exited with return code %s'
+                                 % returncode)
+            for future in self.jobs.values():
+                if not future.cancelled():
+                    future.set_exception(error)
+            self.jobs.clear()
+        self._pool._worker_exited(self)
+        self.exited.set_result(returncode)
+
+
+class ProcessPool(object):
+    """Pool of worker processes running CPU-bound functions.
+
+    submit() returns a Future of the result of a function called in a worker
+    process.  Workers are started on demand, up to max_workers (the number
+    of CPUs by default), and are kept for the next jobs.  A worker runs a
+    batch of up to batch_size jobs sent in a single message.  If a worker
+    exits unexpectedly, the futures of its jobs get a RuntimeError and a new
+    worker is started for the remaining jobs.
+
+    Workers communicate with the event loop through the stdin and stdout
+    pipes of subprocess_exec(): no thread is used.  Functions, arguments and
+    results are pickled: functions must be importable from the sys.path of
+    the parent process.  Unlike multiprocessing, the __main__ module is not
+    imported by the workers.
+    """
+
+    def __init__(self, max_workers=None, batch_size=16, loop=None):
+        if max_workers is None:
+            max_workers = _cpu_count()
+        if max_workers < 1 or batch_size < 1:
+            raise ValueError('max_workers and batch_size must be at least 1')
+        if loop is None:
+            self._loop = events.get_event_loop()
+        else:
+            self._loop = loop
+        self._max_workers = max_workers
+        self._batch_size = batch_size
+        self._closed = False
+        self._job_ids = itertools.count()
+        # deque of (job_id, data, future) waiting for a worker
+        self._queue = collections.deque()
+        self._workers = []
+        # tasks starting a worker
+        self._starting = set()
+
+    def __repr__(self):
+        info = [self.__class__.__name__,
+                'workers=%s' % len(self._workers),
+                'queued=%s' % len(self._queue)]
+        if self._closed:
+            info.append('closed')
+        return '<%s>' % ' '.join(info)
+
+    def submit(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) in a worker process.
+
+        Return a Future.  Raise an exception if the function or its arguments
+        cannot be pickled.
+        """
+        if self._closed:
+            raise RuntimeError('Process pool is closed')
+        data = pickle.dumps((func, args, kwargs), pickle.HIGHEST_PROTOCOL)
+        future = futures.Future(loop=self._loop)
+        self._queue.append((next(self._job_ids), data, future))
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        queue = self._queue
+        idle = [worker for worker in self._workers
+                if not worker.jobs and worker.transport is not None]
+        for worker in idle:
+            # Split the queue between the workers, in batches of at most
+            # batch_size jobs
+            count = len(queue) // self._max_workers
+            count = max(1, min(self._batch_size, count))
+            jobs = []
+            while queue and len(jobs) < count:
+                job = queue.popleft()
+                if not job[2].cancelled():
+                    jobs.append(job)
+            if not jobs:
+                break
+            worker.send(jobs)
+
+        if queue and not self._closed:
+            missing = min(len(queue),
+                          self._max_workers
+                          - len(self._workers) - len(self._starting))
+            for i in range(missing):
+                task = tasks.Task(self._start_worker(), loop=self._loop)
+                self._starting.add(task)
+                task.add_done_callback(self._starting.discard)
+
+    def _get_env(self):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(path or os.curdir
+                                            for path in sys.path)
+        return env
+
+    @coroutine
+    def _start_worker(self):
+        worker = _WorkerProtocol(self)
+        try:
+            transport, protocol = yield From(self._loop.subprocess_exec(
+                lambda: worker, sys.executable, '-c', _WORKER_CODE,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None,
+                env=self._get_env()))
+        except Exception as exc:
+            logger.error('Failed to start a worker process: %s', exc)
+            if not self._workers:
+                # No worker can run the jobs
+                while self._queue:
+                    job_id, data, future = self._queue.popleft()
+                    if not future.cancelled():
+                        future.set_exception(exc)
+            return
+        # connection_made() may not have been called yet
+        worker.transport = transport
+        self._workers.append(worker)
+        if self._closed:
+            self._close_worker(worker)
+        else:
+            self._dispatch()
+
+    def _worker_exited(self, worker):
+        self._workers.remove(worker)
+        if not self._closed:
+            # Start a new worker if jobs are waiting
+            self._dispatch()
+
+    def _close_worker(self, worker):
+        stdin = worker.transport.get_pipe_transport(0)
+        if stdin is not None:
+            stdin.close()
+
+    def close(self):
+        """Cancel the jobs waiting for a worker and stop the workers.
+
+        Workers exit when they have finished their current batch of jobs.
+        """
+        self._closed = True
+        while self._queue:
+            job_id, data, future = self._queue.popleft()
+            future.cancel()
+        for worker in self._workers:
+            self._close_worker(worker)
+
+    @coroutine
+    def wait_closed(self):
+        """Wait until all worker processes exited.
+
+        This method is a coroutine.
+        """
+        while self._workers or self._starting:
+            waiters = list(self._starting)
+            waiters.extend(worker.exited for worker in self._workers)
+            yield From(tasks.wait(waiters, loop=self._loop))
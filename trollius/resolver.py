@@ -0,0 +1,201 @@
+"""Resolvers used by the event loop to look up host names."""
+
+__all__ = ['AbstractResolver', 'ThreadedResolver', 'CachingResolver']
+
+import functools
+import socket
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6: use ordereddict backport
+    from ordereddict import OrderedDict
+
+from . import events
+from . import executor
+from . import futures
+
+
+# Number of threads of the thread pool of ThreadedResolver.
+_MAX_WORKERS = 5
+
+
+def _copy_lookup(fut, lookup):
+    if fut.cancelled():
+        return
+    if lookup.cancelled():
+        fut.cancel()
+        return
+    exc = lookup.exception()
+    if exc is not None:
+        fut.set_exception(exc)
+    else:
+        # Each caller gets its own list
+        fut.set_result(list(lookup.result()))
+
+
+class AbstractResolver(object):
+    """Abstract resolver.
+
+    A resolver can be installed with BaseEventLoop.set_resolver(). The event
+    loop then delegates getaddrinfo() and getnameinfo() to it.
+    """
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """Return a Future for the socket.getaddrinfo() result."""
+        raise NotImplementedError
+
+    def getnameinfo(self, sockaddr, flags=0):
+        """Return a Future for the socket.getnameinfo() result."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the resources of the resolver."""
+        pass
+
+
+class ThreadedResolver(AbstractResolver):
+    """Resolver calling the blocking socket functions in a thread pool.
+
+    The thread pool is owned by the resolver, so slow name resolutions
+    don't delay the jobs submitted to the default executor by
+    run_in_executor().
+    """
+
+    def __init__(self, max_workers=_MAX_WORKERS, loop=None):
+        if loop is None:
+            self._loop = events.get_event_loop()
+        else:
+            self._loop = loop
+        self._max_workers = max_workers
+        self._executor = None
+
+    def __repr__(self):
+        return '<%s max_workers=%s>' % (self.__class__.__name__,
+                                         self._max_workers)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = executor.get_default_executor(self._max_workers)
+        return self._executor
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        if self._loop.get_debug():
+            func = self._loop._getaddrinfo_debug
+        else:
+            func = socket.getaddrinfo
+        return self._loop.run_in_executor(self._get_executor(), func,
+                                          host, port, family, type, proto,
+                                          flags)
+
+    def getnameinfo(self, sockaddr, flags=0):
+        return self._loop.run_in_executor(self._get_executor(),
+                                          socket.getnameinfo, sockaddr, flags)
+
+    def close(self):
+        pool = self._executor
+        if pool is not None:
+            self._executor = None
+            pool.shutdown(wait=False)
+
+
+class CachingResolver(AbstractResolver):
+    """Resolver caching the getaddrinfo() results of another resolver.
+
+    Successful results are kept ttl seconds; socket.gaierror failures are
+    kept negative_ttl seconds.  At most maxsize results are cached, the least
+    recently used results are evicted first.  Concurrent lookups of the same
+    name share a single call to the wrapped resolver.
+
+    By default, the wrapped resolver is a ThreadedResolver.
+    """
+
+    def __init__(self, resolver=None, ttl=60.0, negative_ttl=5.0,
+                 maxsize=1024, loop=None):
+        if loop is None:
+            self._loop = events.get_event_loop()
+        else:
+            self._loop = loop
+        if resolver is None:
+            resolver = ThreadedResolver(loop=self._loop)
+        self._resolver = resolver
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._maxsize = maxsize
+        # {key: (expiration time, addrinfo tuple or None, gaierror args)}
+        self._cache = OrderedDict()
+        # {key: Future} of the lookups in progress
+        self._pending = {}
+
+    def __repr__(self):
+        return ('<%s ttl=%s negative_ttl=%s cached=%s pending=%s>'
+                % (self.__class__.__name__, self._ttl, self._negative_ttl,
+                   len(self._cache), len(self._pending)))
+
+    def _get_cached(self, key):
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return None
+        if entry[0] <= self._loop.time():
+            # expired
+            return None
+        # Move the entry at the end: it is the most recently used
+        self._cache[key] = entry
+        return entry
+
+    def _lookup_done(self, key, fut):
+        del self._pending[key]
+        if fut.cancelled():
+            return
+        exc = fut.exception()
+        if exc is None:
+            if self._ttl <= 0:
+                return
+            entry = (self._loop.time() + self._ttl, tuple(fut.result()),
+                     None)
+        elif isinstance(exc, socket.gaierror):
+            if self._negative_ttl <= 0:
+                return
+            entry = (self._loop.time() + self._negative_ttl, None, exc.args)
+        else:
+            return
+        self._cache[key] = entry
+        while len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        entry = self._get_cached(key)
+        if entry is not None:
+            fut = futures.Future(loop=self._loop)
+            infos, error = entry[1:]
+            if error is not None:
+                # Raise a new exception to not chain tracebacks
+                fut.set_exception(socket.gaierror(*error))
+            else:
+                fut.set_result(list(infos))
+            return fut
+
+        lookup = self._pending.get(key)
+        if lookup is None:
+            lookup = self._resolver.getaddrinfo(host, port, family, type,
+                                                proto, flags)
+            self._pending[key] = lookup
+            lookup.add_done_callback(functools.partial(self._lookup_done,
+                                                       key))
+
+        # Give each caller its own future, so cancelling one caller doesn't
+        # cancel the lookup shared with the others.
+        fut = futures.Future(loop=self._loop)
+        lookup.add_done_callback(functools.partial(_copy_lookup, fut))
+        return fut
+
+    def getnameinfo(self, sockaddr, flags=0):
+        return self._resolver.getnameinfo(sockaddr, flags)
+
+    def clear(self):
+        """Remove all cached results."""
+        self._cache.clear()
+
+    def close(self):
+        self._cache.clear()
+        self._resolver.close()
@@ -9,6 +9,7 @@ __all__ = ['BaseSelectorEventLoop']
 import collections
 import errno
 import functools
+import select
 import socket
 import sys
 try:
@@ -35,8 +36,6 @@ from .py33_exceptions import (wrap_error,
 # _SelectorSslTransport._read_ready() hangs if the socket has no data.
 # Example: test_events.test_create_server_ssl()
 _SSL_REQUIRES_SELECT = (sys.version_info < (2, 6, 6))
-if _SSL_REQUIRES_SELECT:
-    import select
 
 
 def _get_socket_error(sock, address):
@@ -46,15 +45,40 @@ def _get_socket_error(sock, address):
         raise OSError(err, 'Connect call failed %s' % (address,))
 
 
+if hasattr(select, 'epoll'):
+    # Same mapping as EpollSelector.select()
+    _EPOLL_READ_EVENTS = ~select.EPOLLOUT
+    _EPOLL_WRITE_EVENTS = ~select.EPOLLIN
+
+
 def _test_selector_event(selector, fd, event):
-    # Test if the selector is monitoring 'event' events
-    # for the file descriptor 'fd'.
+    # Test if the event loop is monitoring 'event' events
+    # for the file descriptor 'fd'. Check the handles, key.events is only
+    # updated before the next select() call.
     try:
         key = selector.get_key(fd)
     except KeyError:
         return False
     else:
-        return bool(key.events & event)
+        handles = key.data
+        if event & selectors.EVENT_READ and handles.reader is not None:
+            return True
+        return bool(event & selectors.EVENT_WRITE
+                    and handles.writer is not None)
+
+
+class _FdHandles(object):
+    """Reader and writer handles of a file descriptor registered in the
+    selector, stored in the key data.
+
+    The handles are replaced in place: add_reader() and the other methods
+    don't allocate a new object for each change.
+    """
+    __slots__ = ('reader', 'writer')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
 
 
 class BaseSelectorEventLoop(base_events.BaseEventLoop):
@@ -63,6 +87,8 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
     See events.EventLoop for API specification.
     """
 
+    _supports_idle_timeout = True
+
     def __init__(self, selector=None):
         super(BaseSelectorEventLoop, self).__init__()
 
@@ -70,7 +96,19 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
             selector = selectors.DefaultSelector()
         logger.debug('Using selector: %s', selector.__class__.__name__)
         self._selector = selector
+        # With an edge-triggered selector, consumers which stop before
+        # getting EAGAIN must call _set_ready()
+        self._edge_triggered = getattr(selector, 'edge_triggered', False)
         self._make_self_pipe()
+        # {timeout: _IdleSweeper}
+        self._idle_sweepers = {}
+        # file descriptors of which the event mask must be updated before
+        # the next select() call
+        self._interest_changes = set()
+        # Dispatch the events of epoll.poll() without SelectorKey list,
+        # see _select()
+        self._fused_dispatch = (
+            type(selector) is getattr(selectors, 'EpollSelector', None))
 
     def _make_socket_transport(self, sock, protocol, waiter=None,
                                extra=None, server=None):
@@ -113,6 +151,10 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
         if self.is_closed():
             return
         self._close_self_pipe()
+        for sweeper in self._idle_sweepers.values():
+            sweeper.cancel()
+        self._idle_sweepers.clear()
+        self._interest_changes.clear()
         super(BaseSelectorEventLoop, self).close()
         if self._selector is not None:
             self._selector.close()
@@ -202,6 +244,14 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
             else:
                 raise  # The event loop will catch, log and ignore it.
         else:
+            # Other connections may be waiting
+            self._set_ready(sock.fileno(), selectors.EVENT_READ)
+            if server is not None and server._reject_connection():
+                if self._debug:
+                    logger.debug("%r rejects the connection from %r: "
+                                 "too many connections", server, addr)
+                conn.close()
+                return
             protocol = protocol_factory()
             if sslcontext:
                 self._make_ssl_transport(
@@ -221,11 +271,15 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
             key = self._selector.get_key(fd)
         except KeyError:
             self._selector.register(fd, selectors.EVENT_READ,
-                                    (handle, None))
+                                    _FdHandles(handle, None))
         else:
-            mask, (reader, writer) = key.events, key.data
-            self._selector.modify(fd, mask | selectors.EVENT_READ,
-                                  (handle, writer))
+            # key.data is the mutable _FdHandles of the file descriptor, the
+            # event mask is updated by _apply_interest_changes()
+            handles = key.data
+            reader = handles.reader
+            handles.reader = handle
+            if not key.events & selectors.EVENT_READ:
+                self._interest_changes.add(fd)
             if reader is not None:
                 reader.cancel()
 
@@ -238,12 +292,17 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
         except KeyError:
             return False
         else:
-            mask, (reader, writer) = key.events, key.data
-            mask &= ~selectors.EVENT_READ
-            if not mask:
+            handles = key.data
+            reader = handles.reader
+            if handles.writer is None:
+                # Unregister immediately: the caller may close the file
+                # descriptor next
                 self._selector.unregister(fd)
+                self._interest_changes.discard(fd)
             else:
-                self._selector.modify(fd, mask, (None, writer))
+                handles.reader = None
+                if key.events & selectors.EVENT_READ:
+                    self._interest_changes.add(fd)
 
             if reader is not None:
                 reader.cancel()
@@ -259,11 +318,13 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
             key = self._selector.get_key(fd)
         except KeyError:
             self._selector.register(fd, selectors.EVENT_WRITE,
-                                    (None, handle))
+                                    _FdHandles(None, handle))
         else:
-            mask, (reader, writer) = key.events, key.data
-            self._selector.modify(fd, mask | selectors.EVENT_WRITE,
-                                  (reader, handle))
+            handles = key.data
+            writer = handles.writer
+            handles.writer = handle
+            if not key.events & selectors.EVENT_WRITE:
+                self._interest_changes.add(fd)
             if writer is not None:
                 writer.cancel()
 
@@ -276,13 +337,16 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
         except KeyError:
             return False
         else:
-            mask, (reader, writer) = key.events, key.data
+            handles = key.data
+            writer = handles.writer
             # Remove both writer and connector.
-            mask &= ~selectors.EVENT_WRITE
-            if not mask:
+            if handles.reader is None:
                 self._selector.unregister(fd)
+                self._interest_changes.discard(fd)
             else:
-                self._selector.modify(fd, mask, (reader, None))
+                handles.writer = None
+                if key.events & selectors.EVENT_WRITE:
+                    self._interest_changes.add(fd)
 
             if writer is not None:
                 writer.cancel()
@@ -290,6 +354,58 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
             else:
                 return False
 
+    def _apply_interest_changes(self):
+        """Update the event masks of the selector before select().
+
+        add_reader(), add_writer(), remove_reader() and remove_writer() only
+        update the handles of a registered file descriptor and record the
+        file descriptors of which the event mask changes.  Changes
+        cancelling each other out during an iteration, like add_writer()
+        followed by remove_writer(), don't call the selector.
+
+        If the selector fails to modify a file descriptor, typically because
+        it was closed without removing its callbacks, the file descriptor is
+        unregistered and its callbacks are scheduled: the owner gets the
+        error from its next I/O operation on the file descriptor.
+        """
+        if not self._interest_changes:
+            return
+        selector = self._selector
+        for fd in self._interest_changes:
+            try:
+                key = selector.get_key(fd)
+            except KeyError:
+                continue
+            handles = key.data
+            mask = 0
+            if handles.reader is not None:
+                mask |= selectors.EVENT_READ
+            if handles.writer is not None:
+                mask |= selectors.EVENT_WRITE
+            if mask == key.events:
+                continue
+            try:
+                selector.modify(fd, mask, key.data)
+            except (OSError, ValueError) as exc:
+                if self._debug:
+                    logger.debug('%r: failed to modify the events of %r: %s',
+                                 self, fd, exc)
+                self._fail_fd(fd, key)
+        self._interest_changes.clear()
+
+    def _fail_fd(self, fd, key):
+        """Unregister a file descriptor which the selector rejects and
+        schedule its callbacks."""
+        try:
+            self._selector.unregister(fd)
+        except (KeyError, OSError, ValueError):
+            pass
+        handles = key.data
+        if handles.reader is not None:
+            self._add_callback(handles.reader)
+        if handles.writer is not None:
+            self._add_callback(handles.writer)
+
     def sock_recv(self, sock, n):
         """Receive data from the socket.
 
@@ -461,7 +577,9 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
 
     def _process_events(self, event_list):
         for key, mask in event_list:
-            fileobj, (reader, writer) = key.fileobj, key.data
+            fileobj, handles = key.fileobj, key.data
+            reader = handles.reader
+            writer = handles.writer
             if mask & selectors.EVENT_READ and reader is not None:
                 if reader._cancelled:
                     self.remove_reader(fileobj)
@@ -473,11 +591,116 @@ class BaseSelectorEventLoop(base_events.BaseEventLoop):
                 else:
                     self._add_callback(writer)
 
+    def _select(self, timeout):
+        if not self._fused_dispatch or self._debug:
+            return self._selector.select(timeout)
+
+        # Fast path for EpollSelector: append the handles of the events
+        # returned by epoll.poll() directly to _ready, without building the
+        # (key, events) list of select() nor calling _add_callback().
+        # Interest changes were applied before polling, so the handles match
+        # the events registered in epoll.
+        selector = self._selector
+        fd_to_key = selector._fd_to_key
+        ready = self._ready
+        for fd, event in selector._poll(timeout):
+            key = fd_to_key.get(fd)
+            if key is None:
+                continue
+            handles = key.data
+            reader = handles.reader
+            writer = handles.writer
+            if event & _EPOLL_READ_EVENTS and reader is not None:
+                if reader._cancelled:
+                    self.remove_reader(fd)
+                else:
+                    ready.append(reader)
+            if event & _EPOLL_WRITE_EVENTS and writer is not None:
+                if writer._cancelled:
+                    self.remove_writer(fd)
+                else:
+                    ready.append(writer)
+        return ()
+
+    def _set_ready(self, fd, events):
+        """Report fd ready again at the next iteration if the selector is
+        edge-triggered.
+
+        Called by consumers which may not have read or written everything
+        possible, since an edge-triggered selector only notifies changes.
+        """
+        if self._edge_triggered:
+            try:
+                self._selector.set_ready(fd, events)
+            except KeyError:
+                # fd was unregistered by the consumer
+                pass
+
+    def _pause_serving(self, sock):
+        self.remove_reader(sock.fileno())
+
+    def _set_idle_timeout(self, transport, timeout):
+        if isinstance(transport, sslproto._SSLProtocolTransport):
+            # Watch the socket transport below the SSL protocol
+            transport = transport._ssl_protocol._transport
+        sweeper = self._idle_sweepers.get(timeout)
+        if sweeper is None:
+            sweeper = _IdleSweeper(self, timeout)
+            self._idle_sweepers[timeout] = sweeper
+        transport._set_idle_sweeper(sweeper)
+
     def _stop_serving(self, sock):
         self.remove_reader(sock.fileno())
         sock.close()
 
 
+class _IdleSweeper(object):
+    """Close the transports which had no activity for timeout seconds.
+
+    Transports only store the time of their last read or write in
+    _last_activity. A single periodic timer checks all transports sharing
+    the same timeout, instead of rescheduling a timer on each activity.
+    """
+
+    def __init__(self, loop, timeout):
+        self._loop = loop
+        self._timeout = timeout
+        # Transports are closed at most interval seconds after their timeout
+        self._interval = timeout / 4.0
+        self._transports = set()
+        self._handle = None
+
+    def __repr__(self):
+        return ('<%s timeout=%s transports=%s>'
+                % (self.__class__.__name__, self._timeout,
+                   len(self._transports)))
+
+    def add(self, transport):
+        self._transports.add(transport)
+        if self._handle is None:
+            self._handle = self._loop.call_later(self._interval, self._sweep)
+
+    def discard(self, transport):
+        self._transports.discard(transport)
+
+    def cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._transports.clear()
+
+    def _sweep(self):
+        self._handle = None
+        deadline = self._loop.time() - self._timeout
+        expired = [transport for transport in self._transports
+                   if transport._last_activity <= deadline]
+        for transport in expired:
+            self._transports.discard(transport)
+            transport._idle_timeout_expired()
+        if self._transports:
+            self._handle = self._loop.call_later(self._interval, self._sweep)
+
+
 class _SelectorTransport(transports._FlowControlMixin,
                          transports.Transport):
 
@@ -501,8 +724,12 @@ class _SelectorTransport(transports._FlowControlMixin,
         self._buffer = self._buffer_factory()
         self._conn_lost = 0  # Set when call to connection_lost scheduled.
         self._closing = False  # Set when close() called.
+        self._idle_sweeper = None
+        self._last_activity = None
         if self._server is not None:
             self._server._attach()
+            if self._server._idle_timeout is not None:
+                self._loop._set_idle_timeout(self, self._server._idle_timeout)
 
     def __repr__(self):
         info = [self.__class__.__name__]
@@ -571,7 +798,27 @@ class _SelectorTransport(transports._FlowControlMixin,
         self._conn_lost += 1
         self._loop.call_soon(self._call_connection_lost, exc)
 
+    def _set_idle_sweeper(self, sweeper):
+        if self._idle_sweeper is not None:
+            self._idle_sweeper.discard(self)
+        self._idle_sweeper = sweeper
+        self._last_activity = self._loop.time()
+        sweeper.add(self)
+
+    def _idle_timeout_expired(self):
+        if self._loop.get_debug():
+            logger.debug("%r: idle timeout expired", self)
+        self._idle_sweeper = None
+        if self._buffer:
+            # The peer doesn't read: don't wait until the buffer is flushed
+            self.abort()
+        else:
+            self.close()
+
     def _call_connection_lost(self, exc):
+        if self._idle_sweeper is not None:
+            self._idle_sweeper.discard(self)
+            self._idle_sweeper = None
         try:
             self._protocol.connection_lost(exc)
         finally:
@@ -630,7 +877,11 @@ class _SelectorSocketTransport(_SelectorTransport):
         except Exception as exc:
             self._fatal_error(exc, 'Fatal read error on socket transport')
         else:
+            if self._idle_sweeper is not None:
+                self._last_activity = self._loop.time()
             if data:
+                # More data or the end of file may be pending
+                self._loop._set_ready(self._sock_fd, selectors.EVENT_READ)
                 self._protocol.data_received(data)
             else:
                 if self._loop.get_debug():
@@ -657,6 +908,9 @@ class _SelectorSocketTransport(_SelectorTransport):
             self._conn_lost += 1
             return
 
+        if self._idle_sweeper is not None:
+            self._last_activity = self._loop.time()
+
         if not self._buffer:
             # Optimization: try to send now.
             try:
@@ -692,7 +946,13 @@ class _SelectorSocketTransport(_SelectorTransport):
         else:
             if n:
                 del self._buffer[:n]
+                if self._idle_sweeper is not None:
+                    self._last_activity = self._loop.time()
             self._maybe_resume_protocol()  # May append to buffer.
+            if self._buffer and n == len(data):
+                # The protocol wrote more data and the socket may still be
+                # writable
+                self._loop._set_ready(self._sock_fd, selectors.EVENT_WRITE)
             if not self._buffer:
                 self._loop.remove_writer(self._sock_fd)
                 if self._closing:
@@ -871,7 +1131,12 @@ class _SelectorSslTransport(_SelectorTransport):
         except Exception as exc:
             self._fatal_error(exc, 'Fatal read error on SSL transport')
         else:
+            if self._idle_sweeper is not None:
+                self._last_activity = self._loop.time()
             if data:
+                # recv() returns at most one SSL record, more data may be
+                # pending
+                self._loop._set_ready(self._sock_fd, selectors.EVENT_READ)
                 self._protocol.data_received(data)
             else:
                 try:
@@ -892,6 +1157,7 @@ class _SelectorSslTransport(_SelectorTransport):
             if not (self._paused or self._closing):
                 self._loop.add_reader(self._sock_fd, self._read_ready)
 
+        n = 0
         if self._buffer:
             data = flatten_bytes(self._buffer)
             try:
@@ -910,9 +1176,16 @@ class _SelectorSslTransport(_SelectorTransport):
 
             if n:
                 del self._buffer[:n]
+                if self._idle_sweeper is not None:
+                    self._last_activity = self._loop.time()
 
         self._maybe_resume_protocol()  # May append to buffer.
 
+        if self._buffer and n:
+            # send() writes at most one SSL record, the socket may still be
+            # writable
+            self._loop._set_ready(self._sock_fd, selectors.EVENT_WRITE)
+
         if not self._buffer:
             self._loop.remove_writer(self._sock_fd)
             if self._closing:
@@ -929,6 +1202,9 @@ class _SelectorSslTransport(_SelectorTransport):
             self._conn_lost += 1
             return
 
+        if self._idle_sweeper is not None:
+            self._last_activity = self._loop.time()
+
         if not self._buffer:
             self._loop.add_writer(self._sock_fd, self._write_ready)
 
@@ -968,6 +1244,8 @@ class _SelectorDatagramTransport(_SelectorTransport):
         except Exception as exc:
             self._fatal_error(exc, 'Fatal read error on datagram transport')
         else:
+            # Other datagrams may be pending
+            self._loop._set_ready(self._sock_fd, selectors.EVENT_READ)
             self._protocol.datagram_received(data, addr)
 
     def sendto(self, data, addr=None):
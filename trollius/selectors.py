@@ -343,14 +343,17 @@ if hasattr(select, 'poll'):
             super(PollSelector, self).__init__()
             self._poll = select.poll()
 
-        def register(self, fileobj, events, data=None):
-            key = super(PollSelector, self).register(fileobj, events, data)
+        def _poll_events(self, events):
             poll_events = 0
             if events & EVENT_READ:
                 poll_events |= select.POLLIN
             if events & EVENT_WRITE:
                 poll_events |= select.POLLOUT
-            self._poll.register(key.fd, poll_events)
+            return poll_events
+
+        def register(self, fileobj, events, data=None):
+            key = super(PollSelector, self).register(fileobj, events, data)
+            self._poll.register(key.fd, self._poll_events(events))
             return key
 
         def unregister(self, fileobj):
@@ -358,6 +361,23 @@ if hasattr(select, 'poll'):
             self._poll.unregister(key.fd)
             return key
 
+        def modify(self, fileobj, events, data=None):
+            try:
+                key = self._fd_to_key[self._fileobj_lookup(fileobj)]
+            except KeyError:
+                raise KeyError("{0!r} is not registered".format(fileobj))
+            if events != key.events:
+                if (not events) or (events & ~(EVENT_READ | EVENT_WRITE)):
+                    raise ValueError("Invalid events: {0!r}".format(events))
+                # A single poll.modify() instead of unregister() + register()
+                self._poll.modify(key.fd, self._poll_events(events))
+                key = key._replace(events=events, data=data)
+                self._fd_to_key[key.fd] = key
+            elif data != key.data:
+                key = key._replace(data=data)
+                self._fd_to_key[key.fd] = key
+            return key
+
         def select(self, timeout=None):
             if timeout is None:
                 timeout = None
@@ -397,14 +417,17 @@ if hasattr(select, 'epoll'):
         def fileno(self):
             return self._epoll.fileno()
 
-        def register(self, fileobj, events, data=None):
-            key = super(EpollSelector, self).register(fileobj, events, data)
+        def _epoll_events(self, events):
             epoll_events = 0
             if events & EVENT_READ:
                 epoll_events |= select.EPOLLIN
             if events & EVENT_WRITE:
                 epoll_events |= select.EPOLLOUT
-            self._epoll.register(key.fd, epoll_events)
+            return epoll_events
+
+        def register(self, fileobj, events, data=None):
+            key = super(EpollSelector, self).register(fileobj, events, data)
+            self._epoll.register(key.fd, self._epoll_events(events))
             return key
 
         def unregister(self, fileobj):
@@ -417,7 +440,25 @@ if hasattr(select, 'epoll'):
                 pass
             return key
 
-        def select(self, timeout=None):
+        def modify(self, fileobj, events, data=None):
+            try:
+                key = self._fd_to_key[self._fileobj_lookup(fileobj)]
+            except KeyError:
+                raise KeyError("{0!r} is not registered".format(fileobj))
+            if events != key.events:
+                if (not events) or (events & ~(EVENT_READ | EVENT_WRITE)):
+                    raise ValueError("Invalid events: {0!r}".format(events))
+                # A single epoll_ctl() instead of unregister() + register()
+                self._epoll.modify(key.fd, self._epoll_events(events))
+                key = key._replace(events=events, data=data)
+                self._fd_to_key[key.fd] = key
+            elif data != key.data:
+                key = key._replace(data=data)
+                self._fd_to_key[key.fd] = key
+            return key
+
+        def _poll(self, timeout):
+            """Return the (fd, epoll events) list of epoll.poll()."""
             if timeout is None:
                 timeout = -1
             elif timeout <= 0:
@@ -432,12 +473,14 @@ if hasattr(select, 'epoll'):
             # FD is registered.
             max_ev = max(len(self._fd_to_key), 1)
 
-            ready = []
             try:
-                fd_event_list = wrap_error(self._epoll.poll, timeout, max_ev)
+                return wrap_error(self._epoll.poll, timeout, max_ev)
             except InterruptedError:
-                return ready
-            for fd, event in fd_event_list:
+                return ()
+
+        def select(self, timeout=None):
+            ready = []
+            for fd, event in self._poll(timeout):
                 events = 0
                 if event & ~select.EPOLLIN:
                     events |= EVENT_WRITE
@@ -454,6 +497,110 @@ if hasattr(select, 'epoll'):
             super(EpollSelector, self).close()
 
 
+    class EdgeTriggeredEpollSelector(EpollSelector):
+        """Epoll-based selector using edge-triggered notifications.
+
+        File descriptors are registered once for EPOLLIN and EPOLLOUT: a
+        modify() which only removes events or replaces the data doesn't call
+        epoll_ctl(). Events reported by the kernel are cached until select()
+        returns them for a key interested in them.
+
+        select() returns an event once per notification of the kernel: the
+        consumer must read or write until it gets EAGAIN, or call
+        set_ready() to get the event again at the next select() call.
+        """
+
+        edge_triggered = True
+
+        _EPOLL_EVENTS = select.EPOLLIN | select.EPOLLOUT | select.EPOLLET
+
+        def __init__(self):
+            super(EdgeTriggeredEpollSelector, self).__init__()
+            # {fd: events notified by the kernel, not returned by select()}
+            self._readiness = {}
+            # file descriptors which may have ready events they are
+            # interested in
+            self._pending = set()
+
+        def register(self, fileobj, events, data=None):
+            # Skip EpollSelector.register()
+            key = super(EpollSelector, self).register(fileobj, events, data)
+            self._epoll.register(key.fd, self._EPOLL_EVENTS)
+            return key
+
+        def unregister(self, fileobj):
+            key = super(EdgeTriggeredEpollSelector, self).unregister(fileobj)
+            self._readiness.pop(key.fd, None)
+            self._pending.discard(key.fd)
+            return key
+
+        def modify(self, fileobj, events, data=None):
+            if (not events) or (events & ~(EVENT_READ | EVENT_WRITE)):
+                raise ValueError("Invalid events: {0!r}".format(events))
+            try:
+                key = self._fd_to_key[self._fileobj_lookup(fileobj)]
+            except KeyError:
+                raise KeyError("{0!r} is not registered".format(fileobj))
+            added = events & ~key.events
+            if events != key.events or data != key.data:
+                key = key._replace(events=events, data=data)
+                self._fd_to_key[key.fd] = key
+            if added:
+                readiness = self._readiness.get(key.fd, 0)
+                if readiness & added:
+                    self._pending.add(key.fd)
+                if added & ~readiness:
+                    # The last notification may have been consumed without
+                    # getting EAGAIN: ask the kernel to notify the current
+                    # state again.
+                    self._epoll.modify(key.fd, self._EPOLL_EVENTS)
+            return key
+
+        def set_ready(self, fileobj, events):
+            """Return events of fileobj at the next select() call, without
+            waiting for a new notification of the kernel."""
+            fd = self._fileobj_lookup(fileobj)
+            if fd not in self._fd_to_key:
+                raise KeyError("{0!r} is not registered".format(fileobj))
+            self._readiness[fd] = self._readiness.get(fd, 0) | events
+            self._pending.add(fd)
+
+        def select(self, timeout=None):
+            if self._pending:
+                timeout = 0
+            fd_event_list = self._poll(timeout)
+            fd_to_key = self._fd_to_key
+            readiness = self._readiness
+            pending = self._pending
+            for fd, event in fd_event_list:
+                key = fd_to_key.get(fd)
+                if key is None:
+                    continue
+                events = readiness.get(fd, 0)
+                if event & ~select.EPOLLIN:
+                    events |= EVENT_WRITE
+                if event & ~select.EPOLLOUT:
+                    events |= EVENT_READ
+                readiness[fd] = events
+                if events & key.events:
+                    pending.add(fd)
+
+            ready = []
+            for fd in pending:
+                key = fd_to_key[fd]
+                events = readiness[fd] & key.events
+                if events:
+                    readiness[fd] &= ~events
+                    ready.append((key, events))
+            pending.clear()
+            return ready
+
+        def close(self):
+            self._readiness.clear()
+            self._pending.clear()
+            super(EdgeTriggeredEpollSelector, self).close()
+
+
 if hasattr(select, 'devpoll'):
 
     class DevpollSelector(_BaseSelectorImpl):
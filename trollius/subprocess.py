@@ -1,10 +1,17 @@
 from __future__ import absolute_import
 
-__all__ = ['create_subprocess_exec', 'create_subprocess_shell']
+__all__ = ['create_subprocess_exec', 'create_subprocess_shell',
+           'create_subprocess_pipeline']
 
 import collections
+import functools
+import os
+import stat
 import subprocess
+import sys
 
+from . import compat
+from . import coroutines
 from . import events
 from . import futures
 from . import protocols
@@ -20,6 +27,49 @@ PIPE = subprocess.PIPE
 STDOUT = subprocess.STDOUT
 
 
+def _write_all(fd, data):
+    offset = 0
+    while offset < len(data):
+        offset += os.write(fd, compat.buffer_tail(data, offset))
+
+
+def _is_pollable(fd):
+    # Pipes and sockets can be watched by the event loop, whereas regular
+    # files are always ready: reading or writing them blocks
+    if sys.platform == 'win32':
+        return False
+    mode = os.fstat(fd).st_mode
+    return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+
+
+def _dup_pipe(fd, mode):
+    """Duplicate the pipe or socket file descriptor fd for a pipe transport.
+
+    The transport closes its pipe, and makes it non-blocking which changes
+    the flags of fd as well: return the file object of the duplicate and a
+    function restoring the flags of fd.
+    """
+    import fcntl
+    from .unix_events import _set_inheritable
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    restore = functools.partial(fcntl.fcntl, fd, fcntl.F_SETFL, flags)
+    dup = os.dup(fd)
+    _set_inheritable(dup, False)
+    return os.fdopen(dup, mode, 0), restore
+
+
+def _make_pipe():
+    rfd, wfd = os.pipe()
+    if sys.platform != 'win32':
+        # Python 3.3 and older create inheritable pipes: a stage spawned with
+        # close_fds=False would keep the other end of the pipe open and the
+        # next stage would never get the end of file
+        from .unix_events import _set_inheritable
+        _set_inheritable(rfd, False)
+        _set_inheritable(wfd, False)
+    return rfd, wfd
+
+
 class SubprocessStreamProtocol(streams.FlowControlMixin,
                                protocols.SubprocessProtocol):
     """Like StreamReaderProtocol, but for a subprocess."""
@@ -31,6 +81,8 @@ class SubprocessStreamProtocol(streams.FlowControlMixin,
         self.waiter = futures.Future(loop=loop)
         self._waiters = collections.deque()
         self._transport = None
+        self._process_exited = False
+        self._pipe_fds = []
 
     def __repr__(self):
         info = [self.__class__.__name__]
@@ -50,12 +102,14 @@ class SubprocessStreamProtocol(streams.FlowControlMixin,
             self.stdout = streams.StreamReader(limit=self._limit,
                                                loop=self._loop)
             self.stdout.set_transport(stdout_transport)
+            self._pipe_fds.append(1)
 
         stderr_transport = transport.get_pipe_transport(2)
         if stderr_transport is not None:
             self.stderr = streams.StreamReader(limit=self._limit,
                                                loop=self._loop)
             self.stderr.set_transport(stderr_transport)
+            self._pipe_fds.append(2)
 
         stdin_transport = transport.get_pipe_transport(0)
         if stdin_transport is not None:
@@ -96,10 +150,14 @@ class SubprocessStreamProtocol(streams.FlowControlMixin,
             else:
                 reader.set_exception(exc)
 
+        if fd in self._pipe_fds:
+            self._pipe_fds.remove(fd)
+        self._maybe_close_transport()
+
     def process_exited(self):
         returncode = self._transport.get_returncode()
-        self._transport.close()
-        self._transport = None
+        self._process_exited = True
+        self._maybe_close_transport()
 
         # wake up futures waiting for wait()
         while self._waiters:
@@ -107,6 +165,39 @@ class SubprocessStreamProtocol(streams.FlowControlMixin,
             if not waiter.cancelled():
                 waiter.set_result(returncode)
 
+    def _maybe_close_transport(self):
+        # Don't close the pipes before the output has been read: the process
+        # can exit before its stdout and stderr pipes are drained
+        if (not self._pipe_fds and self._process_exited
+                and self._transport is not None):
+            self._transport.close()
+            self._transport = None
+
+
+class _FdWriterProtocol(streams.FlowControlMixin, protocols.Protocol):
+    """Write the output of Process.communicate_stream() to a pipe or a
+    socket file descriptor, with flow control."""
+
+    def __init__(self, loop, restore):
+        super(_FdWriterProtocol, self).__init__(loop=loop)
+        self._restore = restore
+        self.transport = None
+        self.closed = futures.Future(loop=loop)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        super(_FdWriterProtocol, self).connection_lost(exc)
+        self._restore()
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    @coroutine
+    def write(self, data):
+        self.transport.write(data)
+        yield From(self._drain_helper())
+
 
 class Process:
     def __init__(self, transport, protocol, loop):
@@ -214,6 +305,188 @@ class Process:
         yield From(self.wait())
         raise Return(stdout, stderr)
 
+    def _get_writer(self, name, target):
+        if isinstance(target, compat.integer_types):
+            return target
+        write = getattr(target, 'write', target)
+        if not callable(write):
+            raise TypeError('%s must be None, a file descriptor, an object '
+                            'with a write() method or a callable, not %s'
+                            % (name, type(target).__name__))
+        return write
+
+    @coroutine
+    def _open_fd_reader(self, fd, chunk_size):
+        """Return (read, close) to read the file descriptor fd in chunks.
+
+        read() returns a coroutine or a future of the next chunk, empty at
+        the end of file.  Pipes and sockets are read by a pipe transport,
+        other files by os.read() in the default executor.
+        """
+        loop = self._loop
+        if not _is_pollable(fd):
+            read = functools.partial(loop.run_in_executor,
+                                     None, os.read, fd, chunk_size)
+            raise Return(read, None)
+        reader = streams.StreamReader(limit=chunk_size, loop=loop)
+        protocol = streams.StreamReaderProtocol(reader, loop=loop)
+        pipe, restore = _dup_pipe(fd, 'rb')
+        try:
+            transport, protocol = yield From(
+                loop.connect_read_pipe(lambda: protocol, pipe))
+        except:
+            restore()
+            raise
+
+        def close():
+            # the transport is no more watched by the event loop: the flags
+            # can be restored before the duplicate is closed
+            transport.close()
+            restore()
+
+        raise Return(functools.partial(reader.read, chunk_size), close)
+
+    @coroutine
+    def _feed_stdin_chunks(self, input, chunk_size):
+        debug = self._loop.get_debug()
+        read = close = None
+        if isinstance(input, compat.BYTES_TYPES):
+            chunks = iter((input,))
+        elif isinstance(input, compat.integer_types):
+            read, close = yield From(self._open_fd_reader(input, chunk_size))
+        else:
+            chunks = iter(input)
+        try:
+            while True:
+                if read is not None:
+                    chunk = yield From(read())
+                    if not chunk:
+                        break
+                else:
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        break
+                self.stdin.write(chunk)
+                yield From(self.stdin.drain())
+        except (BrokenPipeError, ConnectionResetError) as exc:
+            # ignored, as in communicate()
+            if debug:
+                logger.debug('%r communicate: stdin got %r', self, exc)
+        finally:
+            if close is not None:
+                close()
+
+        if debug:
+            logger.debug('%r communicate: close stdin', self)
+        self.stdin.close()
+
+    @coroutine
+    def _copy_stream(self, fd, target, chunk_size):
+        transport = self._transport.get_pipe_transport(fd)
+        if fd == 2:
+            stream = self.stderr
+        else:
+            assert fd == 1
+            stream = self.stdout
+        if self._loop.get_debug():
+            name = 'stdout' if fd == 1 else 'stderr'
+            logger.debug('%r communicate: copy %s', self, name)
+        writer = None
+        if not isinstance(target, compat.integer_types):
+            write = target
+        elif _is_pollable(target):
+            pipe, restore = _dup_pipe(target, 'wb')
+            try:
+                pipe_transport, writer = yield From(
+                    self._loop.connect_write_pipe(
+                        lambda: _FdWriterProtocol(self._loop, restore), pipe))
+            except:
+                restore()
+                raise
+            write = writer.write
+        else:
+            write = functools.partial(self._loop.run_in_executor,
+                                      None, _write_all, target)
+        closing = False
+        try:
+            while True:
+                data = yield From(stream.read(chunk_size))
+                if not data:
+                    break
+                if write is None:
+                    continue
+                result = write(data)
+                if (coroutines.iscoroutine(result)
+                        or isinstance(result, futures._FUTURE_CLASSES)):
+                    yield From(result)
+            if writer is not None:
+                # wait until the buffered data is written
+                closing = True
+                pipe_transport.close()
+                yield From(writer.closed)
+        finally:
+            if writer is not None and not closing:
+                pipe_transport.abort()
+        if self._loop.get_debug():
+            name = 'stdout' if fd == 1 else 'stderr'
+            logger.debug('%r communicate: close %s', self, name)
+        transport.close()
+
+    @coroutine
+    def communicate_stream(self, input=None, stdout=None, stderr=None,
+                           chunk_size=None):
+        """Like communicate(), but stream the data instead of buffering it.
+
+        input is written to stdin: bytes, a file descriptor read until the end
+        of file, or an iterable of bytes.  stdin is closed when all data is
+        written, or immediately if input is None.
+
+        stdout and stderr pipes are read in chunks of at most chunk_size bytes
+        (the limit of the streams by default).  Each chunk is passed to the
+        target of the pipe: written to a file descriptor, passed to the
+        write() method of an object, or passed to a callable.  If write() or
+        the callable returns a coroutine or a future, the next chunk is only
+        read when it is done.  The data of a pipe without target is
+        discarded.
+
+        File descriptors of pipes and sockets are read and written by pipe
+        transports of the event loop, other files in the default executor.
+
+        Return the return code of the process.
+
+        This method is a coroutine.
+        """
+        if chunk_size is None:
+            chunk_size = self._protocol._limit
+        if chunk_size <= 0:
+            raise ValueError('chunk_size must be positive')
+        if input is not None and self.stdin is None:
+            raise ValueError('input requires stdin=PIPE')
+        # Check all targets before creating the coroutines, which would
+        # never run if a check fails
+        targets = []
+        for fd, name, stream, target in ((1, 'stdout', self.stdout, stdout),
+                                         (2, 'stderr', self.stderr, stderr)):
+            if stream is None:
+                if target is not None:
+                    raise ValueError('%s target requires %s=PIPE'
+                                     % (name, name))
+                continue
+            if target is not None:
+                target = self._get_writer(name, target)
+            targets.append((fd, target))
+        readers = [self._copy_stream(fd, target, chunk_size)
+                   for fd, target in targets]
+
+        if input is not None:
+            readers.append(self._feed_stdin_chunks(input, chunk_size))
+        elif self.stdin is not None:
+            self.stdin.close()
+        yield From(tasks.gather(*readers, loop=self._loop))
+        returncode = yield From(self.wait())
+        raise Return(returncode)
+
 
 @coroutine
 def create_subprocess_shell(cmd, **kwds):
@@ -259,3 +532,149 @@ def create_subprocess_exec(program, *args, **kwds):
         transport._kill_wait()
         raise
     raise Return(Process(transport, protocol, loop))
+
+
+class Pipeline(object):
+    """Processes created by create_subprocess_pipeline().
+
+    stdin is the stdin of the first process, stdout and stderr are the
+    stdout and stderr of the last process.
+    """
+
+    def __init__(self, processes, loop):
+        self.processes = processes
+        self._loop = loop
+        self.stdin = processes[0].stdin
+        self.stdout = processes[-1].stdout
+        self.stderr = processes[-1].stderr
+
+    def __repr__(self):
+        pids = ' '.join(str(proc.pid) for proc in self.processes)
+        return '<%s %s>' % (self.__class__.__name__, pids)
+
+    @property
+    def returncodes(self):
+        """Return codes of the processes, None for running processes."""
+        return [proc.returncode for proc in self.processes]
+
+    @property
+    def returncode(self):
+        """Return code of the last process, as in a shell."""
+        return self.processes[-1].returncode
+
+    @coroutine
+    def wait(self):
+        """Wait until all processes exit and return their return codes."""
+        returncodes = yield From(tasks.gather(
+            *[proc.wait() for proc in self.processes], loop=self._loop))
+        raise Return(returncodes)
+
+    def _signal_all(self, method):
+        for proc in self.processes:
+            try:
+                method(proc)
+            except ProcessLookupError:
+                pass
+
+    def send_signal(self, signal):
+        self._signal_all(lambda proc: proc.send_signal(signal))
+
+    def terminate(self):
+        self._signal_all(Process.terminate)
+
+    def kill(self):
+        self._signal_all(Process.kill)
+
+    @coroutine
+    def communicate(self, input=None):
+        """Feed input to the first process, read the output of the last one.
+
+        Wait until all processes exit and return (stdout, stderr).
+        """
+        first = self.processes[0]
+        last = self.processes[-1]
+        if input:
+            stdin = first._feed_stdin(input)
+        else:
+            stdin = first._noop()
+        if last.stdout is not None:
+            stdout = last._read_stream(1)
+        else:
+            stdout = last._noop()
+        if last.stderr is not None:
+            stderr = last._read_stream(2)
+        else:
+            stderr = last._noop()
+        stdin, stdout, stderr = yield From(tasks.gather(stdin, stdout, stderr,
+                                                        loop=self._loop))
+        yield From(self.wait())
+        raise Return(stdout, stderr)
+
+
+@coroutine
+def create_subprocess_pipeline(commands, **kwds):
+    """Spawn the pipeline of processes "cmd1 | cmd2 | ... | cmdN".
+
+    commands is a sequence of argument lists, as passed to
+    create_subprocess_exec().  The stdout of each process is connected to
+    the stdin of the next process by an OS pipe: the data does not go
+    through the event loop.  stdin applies to the first process, stdout and
+    stderr to the last process; the other processes inherit the stderr of
+    the parent process.  Other keyword arguments are passed to
+    create_subprocess_exec() for each process.
+
+    Return a Pipeline object.
+    """
+    commands = list(commands)
+    if not commands:
+        raise ValueError('commands must not be empty')
+    stdin = kwds.pop('stdin', None)
+    stdout = kwds.pop('stdout', None)
+    stderr = kwds.pop('stderr', None)
+    loop = kwds.pop('loop', None)
+    if loop is None:
+        loop = events.get_event_loop()
+
+    processes = []
+    # read end of the pipe connected to the stdout of the previous process
+    read_fd = None
+    try:
+        for index, args in enumerate(commands):
+            is_last = (index == len(commands) - 1)
+            if index:
+                proc_stdin = read_fd
+            else:
+                proc_stdin = stdin
+            if is_last:
+                proc_stdout = stdout
+                proc_stderr = stderr
+                next_read_fd = write_fd = None
+            else:
+                next_read_fd, write_fd = _make_pipe()
+                proc_stdout = write_fd
+                proc_stderr = None
+            try:
+                proc = yield From(create_subprocess_exec(
+                    *args, stdin=proc_stdin, stdout=proc_stdout,
+                    stderr=proc_stderr, loop=loop, **kwds))
+            except:
+                if next_read_fd is not None:
+                    os.close(next_read_fd)
+                raise
+            finally:
+                # the child processes own their copies of the pipe ends
+                if read_fd is not None:
+                    os.close(read_fd)
+                    read_fd = None
+                if write_fd is not None:
+                    os.close(write_fd)
+            processes.append(proc)
+            read_fd = next_read_fd
+    except:
+        if read_fd is not None:
+            os.close(read_fd)
+        for proc in processes:
+            # close the pipes and terminate the process if it is running
+            proc._transport.close()
+        raise
+    raise Return(Pipeline(processes, loop))
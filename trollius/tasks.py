@@ -35,6 +35,45 @@ def _lock_coroutine(lock):
     raise Return(_ContextManager(lock))
 
 
+# Kinds of objects yielded by the coroutine of a task, see Task._step()
+_YIELD_BAD = 0
+_YIELD_NONE = 1
+_YIELD_FUTURE = 2
+_YIELD_CORO = 3
+_YIELD_LOCK = 4
+_YIELD_FROM = 5
+
+# Cache of the kinds of yielded objects: {type: kind}.  It is cleared when it
+# is full, to not keep alive forever classes created on the fly.
+_YIELD_KINDS_MAX = 100
+_yield_kinds = {type(None): _YIELD_NONE}
+
+
+def _get_yield_kind(obj):
+    """Get the kind of an object yielded by the coroutine of a task.
+
+    The kind is stored in the _yield_kinds cache, except for bad yields and
+    for objects faking their type (ex: mock object with a spec).
+    """
+    if obj is None:
+        kind = _YIELD_NONE
+    elif isinstance(obj, coroutines.FromWrapper):
+        kind = _YIELD_FROM
+    elif coroutines.iscoroutine(obj):
+        kind = _YIELD_CORO
+    elif isinstance(obj, (Lock, Condition, Semaphore)):
+        kind = _YIELD_LOCK
+    elif isinstance(obj, futures._FUTURE_CLASSES):
+        kind = _YIELD_FUTURE
+    else:
+        return _YIELD_BAD
+    if obj.__class__ is type(obj):
+        if len(_yield_kinds) >= _YIELD_KINDS_MAX:
+            _yield_kinds.clear()
+        _yield_kinds[type(obj)] = kind
+    return kind
+
+
 class Task(futures.Future):
     """A coroutine wrapped in a Future."""
 
@@ -80,7 +119,7 @@ class Task(futures.Future):
             loop = events.get_event_loop()
         return set(t for t in cls._all_tasks if t._loop is loop)
 
-    def __init__(self, coro, loop=None):
+    def __init__(self, coro, loop=None, eager_start=False):
         assert coroutines.iscoroutine(coro), repr(coro)
         super(Task, self).__init__(loop=loop)
         if self._source_traceback:
@@ -88,8 +127,26 @@ class Task(futures.Future):
         self._coro = iter(coro)  # Use the iterator just in case.
         self._fut_waiter = None
         self._must_cancel = False
-        self._loop.call_soon(self._step)
+        # generators of the nested coroutines, see _step()
+        self._stack = []
         self.__class__._all_tasks.add(self)
+        if eager_start and self._loop.is_running():
+            # Run the first step now: a coroutine which does not block is
+            # done before the constructor returns
+            self._eager_step()
+        else:
+            self._loop.call_soon(self._step)
+
+    def _eager_step(self):
+        # The task is started from a callback or from the step of another
+        # task: restore the current task of the event loop
+        current_tasks = self.__class__._current_tasks
+        current = current_tasks.get(self._loop)
+        try:
+            self._step()
+        finally:
+            if current is not None:
+                current_tasks[self._loop] = current
 
     # On Python 3.3 or older, objects with a destructor that are part of a
     # reference cycle are never destroyed. That's not the case any more on
@@ -138,19 +195,21 @@ class Task(futures.Future):
         oldest frames of a traceback are returned.  (This matches the
         behavior of the traceback module.)
 
-        For reasons beyond our control, only one stack frame is
-        returned for a suspended coroutine.
+        For a suspended coroutine, one stack frame is returned for the
+        coroutine and for each nested coroutine run by the task ("yield
+        coro"), but not for coroutines called with "yield from".
         """
         frames = []
-        f = self._coro.gi_frame
-        if f is not None:
-            while f is not None:
+        if self._coro.gi_frame is not None:
+            for coro in reversed([self._coro] + self._stack):
+                f = coro.gi_frame
+                if f is None:
+                    continue
                 if limit is not None:
                     if limit <= 0:
                         break
                     limit -= 1
                 frames.append(f)
-                f = f.f_back
             frames.reverse()
         elif self._exception is not None:
             tb = self._exception.__traceback__
@@ -237,89 +296,135 @@ class Task(futures.Future):
             if not isinstance(exc, futures.CancelledError):
                 exc = futures.CancelledError()
             self._must_cancel = False
-        coro = self._coro
+        # Generators of the nested coroutines: "yield coro" runs coro in this
+        # task, the generator of the caller waits in the stack
+        stack = self._stack
+        if stack:
+            coro = stack[-1]
+        else:
+            coro = self._coro
         self._fut_waiter = None
 
         if exc_tb is not None:
             init_exc = exc
         else:
             init_exc = None
+        # traceback of an exception propagated from a nested coroutine
+        nested_tb = None
         self.__class__._current_tasks[self._loop] = self
-        # Call either coro.throw(exc) or coro.send(value).
         try:
-            if exc is not None:
-                result = coro.throw(exc)
-            elif value is not None:
-                result = coro.send(value)
-            else:
-                result = next(coro)
-        except StopIteration as exc:
-            if compat.PY33:
-                # asyncio Task object? get the result of the coroutine
-                result = exc.value
-            else:
-                if isinstance(exc, Return):
-                    exc.raised = True
-                    result = exc.value
+            while True:
+                # Call either coro.throw(exc) or coro.send(value).
+                try:
+                    if exc is not None:
+                        if nested_tb is not None:
+                            result = coro.throw(type(exc), exc, nested_tb)
+                            nested_tb = None
+                        else:
+                            result = coro.throw(exc)
+                    elif value is not None:
+                        result = coro.send(value)
+                    else:
+                        result = next(coro)
+                except StopIteration as stop:
+                    if compat.PY33:
+                        # asyncio Task object? get the result of the coroutine
+                        result = stop.value
+                    else:
+                        if isinstance(stop, Return):
+                            stop.raised = True
+                            result = stop.value
+                        else:
+                            result = None
+                    if stack:
+                        # return to the caller
+                        stack.pop()
+                        coro = stack[-1] if stack else self._coro
+                        value = result
+                        exc = None
+                        continue
+                    self.set_result(result)
+                except BaseException as error:
+                    # Python 3 deletes the variable of the except block
+                    exc = error
+                    if stack:
+                        # raise the exception in the caller, skip the frame
+                        # of _step() in the traceback
+                        nested_tb = sys.exc_info()[2].tb_next
+                        stack.pop()
+                        coro = stack[-1] if stack else self._coro
+                        value = None
+                        continue
+                    if isinstance(exc, futures.CancelledError):
+                        # I.e., Future.cancel(self).
+                        super(Task, self).cancel()
+                    else:
+                        if exc is init_exc:
+                            self._set_exception_with_tb(exc, exc_tb)
+                            exc_tb = None
+                        else:
+                            self.set_exception(exc)
+
+                        if not isinstance(exc, Exception):
+                            # reraise BaseException
+                            raise
                 else:
-                    result = None
-            self.set_result(result)
-        except futures.CancelledError as exc:
-            super(Task, self).cancel()  # I.e., Future.cancel(self).
-        except BaseException as exc:
-            if exc is init_exc:
-                self._set_exception_with_tb(exc, exc_tb)
-                exc_tb = None
-            else:
-                self.set_exception(exc)
-
-            if not isinstance(exc, Exception):
-                # reraise BaseException
-                raise
-        else:
-            if coroutines._DEBUG:
-                if not coroutines._coroutine_at_yield_from(self._coro):
-                    # trollius coroutine must "yield From(...)"
-                    if not isinstance(result, coroutines.FromWrapper):
+                    if coroutines._DEBUG:
+                        if not coroutines._coroutine_at_yield_from(coro):
+                            # trollius coroutine must "yield From(...)"
+                            if not isinstance(result, coroutines.FromWrapper):
+                                self._loop.call_soon(
+                                    self._step, None,
+                                    RuntimeError("yield used without From"))
+                                break
+                            result = result.obj
+                        else:
+                            # asyncio coroutine using "yield from ..."
+                            if isinstance(result, coroutines.FromWrapper):
+                                result = result.obj
+
+                    kind = _yield_kinds.get(type(result))
+                    if kind is None:
+                        kind = _get_yield_kind(result)
+                    if kind == _YIELD_FROM:
+                        result = result.obj
+                        kind = _yield_kinds.get(type(result))
+                        if kind is None:
+                            kind = _get_yield_kind(result)
+
+                    if kind == _YIELD_FUTURE:
+                        # Yielded Future must come from Future.__iter__().
+                        result.add_done_callback(self._wakeup)
+                        self._fut_waiter = result
+                        if self._must_cancel:
+                            if self._fut_waiter.cancel():
+                                self._must_cancel = False
+                    elif kind == _YIELD_CORO:
+                        # "yield coroutine": run the coroutine in this task,
+                        # the current coroutine gets its result
+                        stack.append(result)
+                        coro = result
+                        value = exc = None
+                        continue
+                    elif kind == _YIELD_LOCK:
+                        coro = _lock_coroutine(result)
+                        stack.append(coro)
+                        value = exc = None
+                        continue
+                    elif kind == _YIELD_NONE:
+                        # Bare yield relinquishes control for one event loop
+                        # iteration.
+                        self._loop.call_soon(self._step)
+                    else:
+                        # Yielding something else is an error.
                         self._loop.call_soon(
                             self._step, None,
-                            RuntimeError("yield used without From"))
-                        return
-                    result = result.obj
-                else:
-                    # asyncio coroutine using "yield from ..."
-                    if isinstance(result, coroutines.FromWrapper):
-                        result = result.obj
-            elif isinstance(result, coroutines.FromWrapper):
-                result = result.obj
-
-            if coroutines.iscoroutine(result):
-                # "yield coroutine" creates a task, the current task
-                # will wait until the new task is done
-                result = self._loop.create_task(result)
-            # FIXME: faster check. common base class? hasattr?
-            elif isinstance(result, (Lock, Condition, Semaphore)):
-                coro = _lock_coroutine(result)
-                result = self._loop.create_task(coro)
-
-            if isinstance(result, futures._FUTURE_CLASSES):
-                # Yielded Future must come from Future.__iter__().
-                result.add_done_callback(self._wakeup)
-                self._fut_waiter = result
-                if self._must_cancel:
-                    if self._fut_waiter.cancel():
-                        self._must_cancel = False
-            elif result is None:
-                # Bare yield relinquishes control for one event loop iteration.
-                self._loop.call_soon(self._step)
-            else:
-                # Yielding something else is an error.
-                self._loop.call_soon(
-                    self._step, None,
-                    RuntimeError(
-                        'Task got bad yield: {0!r}'.format(result)))
+                            RuntimeError(
+                                'Task got bad yield: {0!r}'.format(result)))
+                break
         finally:
             self.__class__._current_tasks.pop(self._loop)
+            nested_tb = None
             self = None  # Needed to break cycles when an exception occurs.
 
     def _wakeup(self, future):
@@ -576,11 +681,33 @@ class _GatheringFuture(futures.Future):
     This overrides cancel() to cancel all the children and act more
     like Task.cancel(), which doesn't immediately mark itself as
     cancelled.
+
+    All children share the same _child_done() callback, which counts the
+    children not completed yet.  The list of results is only built when
+    the last child completes.
     """
 
-    def __init__(self, children, loop=None):
+    def __init__(self, children, loop=None, return_exceptions=False,
+                 result_callback=None):
         super(_GatheringFuture, self).__init__(loop=loop)
-        self._children = children
+        self._return_exceptions = return_exceptions
+        self._result_callback = result_callback
+        if result_callback is None:
+            self._children = children
+            self._duplicates = None
+        else:
+            # Only keep the pending children, {child: index}, so completed
+            # children and their results can be released.
+            # {child: [index, ...]} of children passed more than once.
+            self._children = {}
+            self._duplicates = {}
+            for index, child in enumerate(children):
+                if child in self._children:
+                    self._duplicates.setdefault(child, []).append(index)
+                else:
+                    self._children[child] = index
+        # Number of distinct children not completed yet
+        self._pending = 0
 
     def cancel(self):
         if self.done():
@@ -589,6 +716,55 @@ class _GatheringFuture(futures.Future):
             child.cancel()
         return True
 
+    def _child_done(self, child):
+        if self.done():
+            if not child.cancelled():
+                # Mark exception retrieved.
+                child.exception()
+            return
+
+        if child._state == futures._CANCELLED:
+            res = futures.CancelledError()
+            if not self._return_exceptions:
+                self.set_exception(res)
+                return
+        elif child._exception is not None:
+            res = child.exception()  # Mark exception retrieved.
+            if not self._return_exceptions:
+                self.set_exception(res)
+                return
+        else:
+            res = child._result
+
+        if self._result_callback is not None:
+            indexes = [self._children.pop(child)]
+            if self._duplicates:
+                indexes.extend(self._duplicates.pop(child, ()))
+            for index in indexes:
+                try:
+                    self._result_callback(index, res)
+                except Exception as exc:
+                    self.set_exception(exc)
+                    return
+
+        self._pending -= 1
+        if self._pending:
+            return
+        if self._result_callback is not None:
+            self.set_result(None)
+            return
+
+        results = []
+        for child in self._children:
+            if child._state == futures._CANCELLED:
+                res = futures.CancelledError()
+            elif child._exception is not None:
+                res = child.exception()
+            else:
+                res = child._result
+            results.append(res)
+        self.set_result(results)
+
 
 def gather(*coros_or_futures, **kw):
     """Return a future aggregating results from the given coroutines
@@ -603,6 +779,13 @@ def gather(*coros_or_futures, **kw):
     raised exception will be immediately propagated to the returned
     future.
 
+    If *result_callback* is set, results are not gathered in a list:
+    result_callback(index, result) is called as soon as each child
+    completes, where index is the position of the child in the
+    arguments, and the result of the returned future is None.  Children
+    are released when they complete.  If result_callback raises an
+    exception, it is propagated to the returned future.
+
     Cancellation: if the outer Future is cancelled, all children (that
     have not completed yet) are also cancelled.  If any child is
     cancelled, this is treated as if it raised CancelledError --
@@ -612,63 +795,51 @@ def gather(*coros_or_futures, **kw):
     """
     loop = kw.pop('loop', None)
     return_exceptions = kw.pop('return_exceptions', False)
+    result_callback = kw.pop('result_callback', None)
     if kw:
         raise TypeError("unexpected keyword")
 
     if not coros_or_futures:
         outer = futures.Future(loop=loop)
-        outer.set_result([])
+        if result_callback is not None:
+            outer.set_result(None)
+        else:
+            outer.set_result([])
         return outer
 
     arg_to_fut = {}
-    for arg in set(coros_or_futures):
-        if not isinstance(arg, futures._FUTURE_CLASSES):
-            fut = async(arg, loop=loop)
-            if loop is None:
-                loop = fut._loop
-            # The caller cannot control this future, the "destroy pending task"
-            # warning should not be emitted.
-            fut._log_destroy_pending = False
-        else:
-            fut = arg
-            if loop is None:
-                loop = fut._loop
-            elif fut._loop is not loop:
-                raise ValueError("futures are tied to different event loops")
-        arg_to_fut[arg] = fut
-
-    children = [arg_to_fut[arg] for arg in coros_or_futures]
-    nchildren = len(children)
-    outer = _GatheringFuture(children, loop=loop)
-    non_local = {'nfinished': 0}
-    results = [None] * nchildren
-
-    def _done_callback(i, fut):
-        if outer.done():
-            if not fut.cancelled():
-                # Mark exception retrieved.
-                fut.exception()
-            return
-
-        if fut._state == futures._CANCELLED:
-            res = futures.CancelledError()
-            if not return_exceptions:
-                outer.set_exception(res)
-                return
-        elif fut._exception is not None:
-            res = fut.exception()  # Mark exception retrieved.
-            if not return_exceptions:
-                outer.set_exception(res)
-                return
-        else:
-            res = fut._result
-        results[i] = res
-        non_local['nfinished'] += 1
-        if non_local['nfinished'] == nchildren:
-            outer.set_result(results)
-
-    for i, fut in enumerate(children):
-        fut.add_done_callback(functools.partial(_done_callback, i))
+    children = []
+    # distinct children, in the order of the arguments
+    distinct = []
+    for arg in coros_or_futures:
+        fut = arg_to_fut.get(arg)
+        if fut is None:
+            if not isinstance(arg, futures._FUTURE_CLASSES):
+                fut = async(arg, loop=loop)
+                if loop is None:
+                    loop = fut._loop
+                # The caller cannot control this future, the "destroy pending
+                # task" warning should not be emitted.
+                fut._log_destroy_pending = False
+            else:
+                fut = arg
+                if loop is None:
+                    loop = fut._loop
+                elif fut._loop is not loop:
+                    raise ValueError(
+                        "futures are tied to different event loops")
+            arg_to_fut[arg] = fut
+            distinct.append(fut)
+        children.append(fut)
+
+    outer = _GatheringFuture(children, loop=loop,
+                             return_exceptions=return_exceptions,
+                             result_callback=result_callback)
+    outer._pending = len(distinct)
+    # A single callback shared by all children
+    child_done = outer._child_done
+    for fut in distinct:
+        fut.add_done_callback(child_done)
     return outer
 
 
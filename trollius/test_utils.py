@@ -457,6 +457,9 @@ class TestLoop(base_events.BaseEventLoop):
         assert handle._args == args, '{0!r} != {1!r}'.format(
             handle._args, args)
 
+    def _set_ready(self, fd, events):
+        pass
+
     def reset_counters(self):
         self.remove_reader_count = collections.defaultdict(int)
         self.remove_writer_count = collections.defaultdict(int)
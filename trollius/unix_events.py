@@ -1,14 +1,24 @@
 """Selector event loop for Unix with signal handling."""
 from __future__ import absolute_import
 
+import collections
 import errno
+import functools
+import itertools
+import mmap
 import os
+import platform
 import signal
 import socket
 import stat
+import struct
 import subprocess
 import sys
 import threading
+try:
+    import ctypes
+except ImportError:
+    ctypes = None
 
 
 from . import base_events
@@ -17,6 +27,9 @@ from . import compat
 from . import constants
 from . import coroutines
 from . import events
+from . import futures
+from . import proactor_events
+from . import protocols
 from . import selector_events
 from . import selectors
 from . import transports
@@ -24,14 +37,16 @@ from .compat import flatten_bytes
 from .coroutines import coroutine, From, Return
 from .log import logger
 from .py33_exceptions import (
-    reraise, wrap_error,
+    reraise, wrap_error, get_error_class,
     BlockingIOError, BrokenPipeError, ConnectionResetError,
     InterruptedError, ChildProcessError)
 
 
 __all__ = ['SelectorEventLoop',
+           'SelectorProactorEventLoop', 'SelectorProactor',
+           'IoUringEventLoop', 'IoUringProactor',
            'AbstractChildWatcher', 'SafeChildWatcher',
-           'FastChildWatcher', 'DefaultEventLoopPolicy',
+           'FastChildWatcher', 'PidfdChildWatcher', 'DefaultEventLoopPolicy',
            ]
 
 if sys.platform == 'win32':  # pragma: no cover
@@ -44,15 +59,393 @@ if compat.PY33:
         pass
 
 
+# os.writev() is new in Python 3.3
+_HAVE_WRITEV = hasattr(os, 'writev')
+
+# Maximum number of buffers written by os.writev()
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    # POSIX minimum
+    _IOV_MAX = 16
+
+
+# Size of the signalfd_siginfo structure read from a signalfd
+_SIGNALFD_SIGINFO_SIZE = 128
+
+# Number of signalfd_siginfo structures read at once
+_SIGNALFD_READ_COUNT = 64
+
+
+# Values of SIG_BLOCK and SIG_UNBLOCK on Linux, signal.SIG_BLOCK and
+# signal.SIG_UNBLOCK are new in Python 3.3
+_SIG_BLOCK = getattr(signal, 'SIG_BLOCK', 0)
+_SIG_UNBLOCK = getattr(signal, 'SIG_UNBLOCK', 1)
+
+
+def _find_pthread_sigmask():
+    """Return a pthread_sigmask(how, signals) function, or None.
+
+    signal.pthread_sigmask() is new in Python 3.3: on older versions, call
+    the function of the C library with ctypes.  The function returns the set
+    of the signals blocked before the call.
+    """
+    if hasattr(signal, 'pthread_sigmask'):
+        return signal.pthread_sigmask
+    if not sys.platform.startswith('linux') or ctypes is None:
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        func = libc.pthread_sigmask
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+    func.restype = ctypes.c_int
+
+    def pthread_sigmask(how, signals):
+        old = _sigset(())
+        # pthread_sigmask() returns the error number, it doesn't set errno
+        err = func(how, ctypes.byref(_sigset(signals)), ctypes.byref(old))
+        if err:
+            raise OSError(err, os.strerror(err))
+        return _sigset_signals(old)
+
+    return pthread_sigmask
+
+_pthread_sigmask = _find_pthread_sigmask()
+
+
+def _find_signalfd():
+    """Return the signalfd() function of the C library, or None."""
+    if (not sys.platform.startswith('linux')
+    or ctypes is None
+    or _pthread_sigmask is None):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        func = libc.signalfd
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_int)
+    func.restype = ctypes.c_int
+    return func
+
+_signalfd_func = _find_signalfd()
+
+
+# Number of the pidfd_open() system call in the table shared by all
+# architectures since Linux 5.1, see _syscall_number()
+_NR_PIDFD_OPEN = 434
+
+# platform.machine() prefixes of the architectures using the shared system
+# call numbers as is
+_SYSCALL_GENERIC_MACHINES = (
+    'aarch64', 'arc', 'arm', 'csky', 'hexagon', 'i386', 'i486', 'i586',
+    'i686', 'loongarch', 'm68k', 'microblaze', 'nios2', 'or1k', 'parisc',
+    'ppc', 'riscv', 's390', 'sh', 'sparc', 'x86_64', 'xtensa')
+
+
+def _syscall_number(nr):
+    """Return the number of a system call added in Linux 5.1 or newer for
+    the architecture of the process, or None if it is unknown.
+
+    nr is the number of the table shared by all architectures, alpha, ia64
+    and MIPS add an offset to it.
+    """
+    machine = platform.machine()
+    is_64bit = (ctypes.sizeof(ctypes.c_void_p) == 8)
+    if machine == 'alpha':
+        return nr + 110
+    if machine == 'ia64':
+        return nr + 1024
+    if machine.startswith('mips'):
+        if is_64bit:
+            # n64 ABI
+            return nr + 5000
+        if machine in ('mips', 'mipsel'):
+            # o32 ABI on a 32-bit kernel
+            return nr + 4000
+        # o32 (+4000) or n32 (+6000) ABI on a 64-bit kernel
+        return None
+    if machine == 'x86_64' and not is_64bit:
+        # i386 or x32 ABI (nr | 0x40000000) on a 64-bit kernel
+        return None
+    if machine.startswith(_SYSCALL_GENERIC_MACHINES):
+        return nr
+    return None
+
+
+def _find_pidfd_open():
+    """Return a pidfd_open(pid) function, or None if it is not supported."""
+    if hasattr(os, 'pidfd_open'):
+        func = os.pidfd_open
+    elif sys.platform.startswith('linux') and ctypes is not None:
+        nr = _syscall_number(_NR_PIDFD_OPEN)
+        if nr is None:
+            return None
+        try:
+            syscall = ctypes.CDLL(None, use_errno=True).syscall
+        except (OSError, AttributeError):
+            return None
+        syscall.restype = ctypes.c_long
+
+        def func(pid):
+            res = syscall(ctypes.c_long(nr), ctypes.c_int(pid),
+                          ctypes.c_uint(0))
+            if res < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            return res
+    else:
+        return None
+
+    # pidfd_open() requires Linux 5.3 and may be blocked by seccomp
+    try:
+        os.close(func(os.getpid()))
+    except OSError:
+        return None
+    return func
+
+_pidfd_open = _find_pidfd_open()
+
+
+# splice() flags of the C library
+_SPLICE_F_MOVE = 1
+_SPLICE_F_NONBLOCK = 2
+
+# Number of bytes moved by a splice() call: the default capacity of a pipe
+_SPLICE_SIZE = 64 * 1024
+
+
+def _find_splice():
+    """Return a splice(fd_in, fd_out, size) function, or None if splice() is
+    not available."""
+    if not sys.platform.startswith('linux') or ctypes is None:
+        return None
+    try:
+        func = ctypes.CDLL(None, use_errno=True).splice
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_int,
+                     ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint)
+    func.restype = ctypes.c_ssize_t
+
+    def splice(fd_in, fd_out, size):
+        res = func(fd_in, None, fd_out, None, size,
+                   _SPLICE_F_MOVE | _SPLICE_F_NONBLOCK)
+        if res < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return res
+
+    return splice
+
+_splice = _find_splice()
+
+
+# Numbers of the io_uring system calls, see _syscall_number()
+_NR_IO_URING_SETUP = 425
+_NR_IO_URING_ENTER = 426
+
+
+def _find_io_uring():
+    """Return (io_uring_setup, io_uring_enter) functions, or None if the
+    io_uring system calls are not available."""
+    if not sys.platform.startswith('linux') or ctypes is None:
+        return None
+    nr_setup = _syscall_number(_NR_IO_URING_SETUP)
+    nr_enter = _syscall_number(_NR_IO_URING_ENTER)
+    if nr_setup is None or nr_enter is None:
+        return None
+    try:
+        syscall = ctypes.CDLL(None, use_errno=True).syscall
+    except (OSError, AttributeError):
+        return None
+    syscall.restype = ctypes.c_long
+
+    def check(res):
+        if res < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return res
+
+    def setup(entries, params):
+        return check(syscall(ctypes.c_long(nr_setup), ctypes.c_uint(entries),
+                             params))
+
+    def enter(fd, to_submit, min_complete, flags, arg, arg_size):
+        return check(syscall(ctypes.c_long(nr_enter), ctypes.c_int(fd),
+                             ctypes.c_uint(to_submit),
+                             ctypes.c_uint(min_complete),
+                             ctypes.c_uint(flags), arg,
+                             ctypes.c_size_t(arg_size)))
+
+    return setup, enter
+
+_io_uring = _find_io_uring()
+
+
+def _signalfd(fd, signals):
+    """Create a non-blocking signalfd reading the signals.
+
+    If fd is not -1, replace the signals read by the existing signalfd fd.
+    """
+    sigset = _sigset(signals)
+    # SFD_NONBLOCK and SFD_CLOEXEC have the values of O_NONBLOCK and O_CLOEXEC
+    # (os.O_CLOEXEC is new in Python 3.3)
+    cloexec = getattr(os, 'O_CLOEXEC', 0)
+    res = _signalfd_func(fd, ctypes.byref(sigset), os.O_NONBLOCK | cloexec)
+    if res < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    if fd == -1 and not cloexec:
+        _set_inheritable(res, False)
+    return res
+
+
+def _sigset(signals):
+    """Create a sigset_t of the C library containing the signals."""
+    bits = 8 * ctypes.sizeof(ctypes.c_ulong)
+    # sigset_t of the C library: 1024 bits
+    sigset = (ctypes.c_ulong * (1024 // bits))()
+    for sig in signals:
+        sigset[(sig - 1) // bits] |= 1 << ((sig - 1) % bits)
+    return sigset
+
+
+def _sigset_signals(sigset):
+    """Get the set of the signals of a sigset_t created by _sigset()."""
+    bits = 8 * ctypes.sizeof(ctypes.c_ulong)
+    return set(sig for sig in range(1, signal.NSIG)
+               if sigset[(sig - 1) // bits] & (1 << ((sig - 1) % bits)))
+
+
+# posix_spawn() flags of the C library
+_POSIX_SPAWN_SETSIGDEF = 0x04
+_POSIX_SPAWN_SETSIGMASK = 0x08
+
+# Size of the buffers of the opaque posix_spawn_file_actions_t and
+# posix_spawnattr_t structures, larger than their size in the GNU C library
+# (80 and 336 bytes)
+_POSIX_SPAWN_STRUCT_SIZE = 1024
+
+
+def _find_spawn_libc():
+    """Return the C library, or None if posix_spawnp() is not available."""
+    if not sys.platform.startswith('linux') or ctypes is None:
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.posix_spawnp
+        libc.posix_spawn_file_actions_adddup2
+        libc.posix_spawnattr_setsigmask
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+_spawn_libc = _find_spawn_libc()
+
+
+def _fsencode(value):
+    if isinstance(value, bytes):
+        return value
+    if compat.PY3:
+        return os.fsencode(value)
+    return value.encode(sys.getfilesystemencoding())
+
+
+def _cstring_array(values):
+    array = (ctypes.c_char_p * (len(values) + 1))()
+    array[:-1] = [_fsencode(value) for value in values]
+    return array
+
+
+def _check_spawn_error(err, filename=None):
+    # posix_spawn functions return an error number instead of setting errno
+    if err:
+        if filename is not None:
+            raise OSError(err, os.strerror(err), filename)
+        raise OSError(err, os.strerror(err))
+
+
+def _posix_spawnp(args, env, dup2, sigmask=None):
+    """Spawn a child process with posix_spawnp() and return its pid.
+
+    dup2 is a list of (fd, child_fd) pairs.  SIGPIPE and SIGXFSZ, ignored by
+    Python, get their default action in the child process.  If sigmask is not
+    None, it is the set of signals blocked in the child process.
+    """
+    libc = _spawn_libc
+    argv = _cstring_array(args)
+    if env is None:
+        envp = ctypes.c_void_p.in_dll(libc, 'environ')
+    else:
+        envp = _cstring_array([_fsencode(key) + b'=' + _fsencode(value)
+                               for key, value in env.items()])
+
+    file_actions = ctypes.create_string_buffer(_POSIX_SPAWN_STRUCT_SIZE)
+    attr = ctypes.create_string_buffer(_POSIX_SPAWN_STRUCT_SIZE)
+    _check_spawn_error(libc.posix_spawn_file_actions_init(file_actions))
+    try:
+        _check_spawn_error(libc.posix_spawnattr_init(attr))
+        try:
+            for fd, child_fd in dup2:
+                _check_spawn_error(
+                    libc.posix_spawn_file_actions_adddup2(file_actions,
+                                                          fd, child_fd))
+            flags = _POSIX_SPAWN_SETSIGDEF
+            sigdef = _sigset((signal.SIGPIPE, signal.SIGXFSZ))
+            _check_spawn_error(
+                libc.posix_spawnattr_setsigdefault(attr,
+                                                   ctypes.byref(sigdef)))
+            if sigmask is not None:
+                flags |= _POSIX_SPAWN_SETSIGMASK
+                _check_spawn_error(
+                    libc.posix_spawnattr_setsigmask(
+                        attr, ctypes.byref(_sigset(sigmask))))
+            _check_spawn_error(
+                libc.posix_spawnattr_setflags(attr, ctypes.c_short(flags)))
+
+            pid = ctypes.c_int()
+            err = libc.posix_spawnp(ctypes.byref(pid), argv[0],
+                                    file_actions, attr, argv, envp)
+            _check_spawn_error(err, args[0])
+            return pid.value
+        finally:
+            libc.posix_spawnattr_destroy(attr)
+    finally:
+        libc.posix_spawn_file_actions_destroy(file_actions)
+
+
 class _UnixSelectorEventLoop(selector_events.BaseSelectorEventLoop):
     """Unix event loop.
 
     Adds signal handling and UNIX Domain Socket support to SelectorEventLoop.
+
+    If use_signalfd is true and signalfd() is available (Linux), signals are
+    blocked and read from a signalfd registered in the selector, instead of
+    being handled by Python signal handlers.  On Python 3.2 and older,
+    pthread_sigmask() is called with ctypes.
+    Blocking a signal only affects the main thread and the threads and child
+    processes it creates afterwards: add the signal handlers before starting
+    threads.  Child processes are spawned with the signals unblocked.
+
+    If use_posix_spawn is true and posix_spawnp() is available (Linux),
+    subprocess_exec() and subprocess_shell() spawn child processes with
+    posix_spawnp() instead of subprocess.Popen, which avoids copying the page
+    tables of the Python process with fork().  subprocess.Popen is still used
+    for options not supported by posix_spawnp(), like cwd or preexec_fn.
     """
 
-    def __init__(self, selector=None):
+    def __init__(self, selector=None, use_signalfd=False,
+                 use_posix_spawn=False):
         super(_UnixSelectorEventLoop, self).__init__(selector)
         self._signal_handlers = {}
+        self._use_signalfd = bool(use_signalfd) and _signalfd_func is not None
+        self._signalfd = None
+        self._use_posix_spawn = bool(use_posix_spawn)
 
     def _socketpair(self):
         return socket.socketpair()
@@ -85,6 +478,9 @@ class _UnixSelectorEventLoop(selector_events.BaseSelectorEventLoop):
                             "with add_signal_handler()")
         self._check_signal(sig)
         self._check_closed()
+        if self._use_signalfd:
+            self._add_signalfd_handler(sig, callback, args)
+            return
         try:
             # set_wakeup_fd() raises ValueError if this is not the
             # main thread.  By calling it early we ensure that an
@@ -134,6 +530,70 @@ class _UnixSelectorEventLoop(selector_events.BaseSelectorEventLoop):
             else:
                 reraise(exc_type, exc_value, tb)
 
+    def _add_signalfd_handler(self, sig, callback, args):
+        if not isinstance(threading.current_thread(), threading._MainThread):
+            raise RuntimeError('signal handlers can only be added '
+                               'in the main thread')
+        # SIGKILL and SIGSTOP cannot be blocked: pthread_sigmask() and
+        # signalfd() silently ignore them
+        if sig in (signal.SIGKILL, signal.SIGSTOP):
+            raise RuntimeError('sig {0} cannot be caught'.format(sig))
+
+        signals = set(self._signal_handlers)
+        signals.add(sig)
+        _pthread_sigmask(_SIG_BLOCK, (sig,))
+        try:
+            if self._signalfd is None:
+                self._signalfd = _signalfd(-1, signals)
+                self._internal_fds += 1
+                self.add_reader(self._signalfd, self._read_signalfd)
+            else:
+                _signalfd(self._signalfd, signals)
+        except OSError as exc:
+            if sig not in self._signal_handlers:
+                _pthread_sigmask(_SIG_UNBLOCK, (sig,))
+            if exc.errno == errno.EINVAL:
+                raise RuntimeError('sig {0} cannot be caught'.format(sig))
+            raise
+        self._signal_handlers[sig] = events.Handle(callback, args, self)
+
+    def _read_signalfd(self):
+        size = _SIGNALFD_SIGINFO_SIZE * _SIGNALFD_READ_COUNT
+        # A callback may remove the last signal handler, closing the signalfd
+        while self._signalfd is not None:
+            try:
+                data = wrap_error(os.read, self._signalfd, size)
+            except (BlockingIOError, InterruptedError):
+                return
+            # Each signalfd_siginfo structure is one delivered signal,
+            # starting with its signal number (ssi_signo, uint32)
+            for pos in range(0, len(data), _SIGNALFD_SIGINFO_SIZE):
+                sig = struct.unpack_from('=I', data, pos)[0]
+                handle = self._signal_handlers.get(sig)
+                if handle is None:
+                    continue
+                if handle._cancelled:
+                    self.remove_signal_handler(sig)
+                else:
+                    self._add_callback(handle)
+            if len(data) < size:
+                return
+
+    def _remove_signalfd_handler(self, sig):
+        # Consume the pending signals before unblocking the signal, otherwise
+        # they would be delivered with the default action
+        self._read_signalfd()
+        if self._signal_handlers:
+            _signalfd(self._signalfd, self._signal_handlers)
+        elif self._signalfd is not None:
+            # _read_signalfd() didn't already remove the last signal handler
+            if not self.is_closed():
+                self.remove_reader(self._signalfd)
+            os.close(self._signalfd)
+            self._signalfd = None
+            self._internal_fds -= 1
+        _pthread_sigmask(_SIG_UNBLOCK, (sig,))
+
     def _handle_signal(self, sig, frame=None):
         """Internal helper that is the actual signal handler."""
         handle = self._signal_handlers.get(sig)
@@ -155,6 +615,10 @@ class _UnixSelectorEventLoop(selector_events.BaseSelectorEventLoop):
         except KeyError:
             return False
 
+        if self._signalfd is not None:
+            self._remove_signalfd_handler(sig)
+            return True
+
         if sig == signal.SIGINT:
             handler = signal.default_int_handler
         else:
@@ -189,6 +653,36 @@ class _UnixSelectorEventLoop(selector_events.BaseSelectorEventLoop):
             raise ValueError(
                 'sig {0} out of range(1, {1})'.format(sig, signal.NSIG))
 
+    def relay(self, transport_a, transport_b):
+        """Relay data between two connected transports.
+
+        See BaseEventLoop.relay().  If splice() is available (Linux) and both
+        transports are socket transports without buffered data nor idle
+        timeout, the data is moved between the sockets by splice() through
+        pipes, without being copied to user space.
+        """
+        if (_splice is None
+        or not _can_splice(self, transport_a)
+        or not _can_splice(self, transport_b)):
+            return super(_UnixSelectorEventLoop, self).relay(transport_a,
+                                                             transport_b)
+        done = futures.Future(loop=self)
+        try:
+            relay = _SpliceRelay(self, transport_a, transport_b, done)
+        except OSError as exc:
+            # no more file descriptors for the pipes
+            logger.debug('%r: cannot relay with splice(): %s', self, exc)
+            return super(_UnixSelectorEventLoop, self).relay(transport_a,
+                                                             transport_b)
+        relay.start()
+
+        def abort_on_cancel(fut):
+            if fut.cancelled():
+                relay._close(True)
+
+        done.add_done_callback(abort_on_cancel)
+        return done
+
     def _make_read_pipe_transport(self, pipe, protocol, waiter=None,
                                   extra=None):
         return _UnixReadPipeTransport(self, pipe, protocol, waiter, extra)
@@ -207,11 +701,11 @@ class _UnixSelectorEventLoop(selector_events.BaseSelectorEventLoop):
                                               extra=extra, **kwargs)
             try:
                 yield From(transp._post_init())
+                watcher.add_child_handler(transp.get_pid(),
+                                          self._child_watcher_callback, transp)
             except:
                 transp.close()
                 raise
-            watcher.add_child_handler(transp.get_pid(),
-                                      self._child_watcher_callback, transp)
 
         raise Return(transp)
 
@@ -289,7 +783,7 @@ class _UnixSelectorEventLoop(selector_events.BaseSelectorEventLoop):
                 raise ValueError(
                     'A UNIX Domain Socket was expected, got {0!r}'.format(sock))
 
-        server = base_events.Server(self, [sock])
+        server = base_events.Server(self, [sock], protocol_factory, ssl)
         sock.listen(backlog)
         sock.setblocking(False)
         self._start_serving(protocol_factory, sock, ssl, server)
@@ -361,6 +855,8 @@ class _UnixReadPipeTransport(transports.ReadTransport):
             self._fatal_error(exc, 'Fatal read error on pipe transport')
         else:
             if data:
+                # More data or the end of file may be pending
+                self._loop._set_ready(self._fileno, selectors.EVENT_READ)
                 self._protocol.data_received(data)
             else:
                 if self._loop.get_debug():
@@ -426,7 +922,11 @@ class _UnixWritePipeTransport(transports._FlowControlMixin,
                              "pipes, sockets and character devices")
         _set_nonblocking(self._fileno)
         self._protocol = protocol
-        self._buffer = []
+        # deque of bytes objects
+        self._buffer = collections.deque()
+        # number of bytes of the first buffer already written
+        self._buffer_offset = 0
+        self._buffer_size = 0
         self._conn_lost = 0
         self._closing = False  # Set when close() or write_eof() called.
 
@@ -464,7 +964,7 @@ class _UnixWritePipeTransport(transports._FlowControlMixin,
         return '<%s>' % ' '.join(info)
 
     def get_write_buffer_size(self):
-        return sum(len(data) for data in self._buffer)
+        return self._buffer_size
 
     def _read_ready(self):
         # Pipe was closed by peer.
@@ -487,52 +987,70 @@ class _UnixWritePipeTransport(transports._FlowControlMixin,
             self._conn_lost += 1
             return
 
+        n = 0
         if not self._buffer:
             # Attempt to send it right away first.
             try:
                 n = wrap_error(os.write, self._fileno, data)
             except (BlockingIOError, InterruptedError):
-                n = 0
+                pass
             except Exception as exc:
                 self._conn_lost += 1
                 self._fatal_error(exc, 'Fatal write error on pipe transport')
                 return
             if n == len(data):
                 return
-            elif n > 0:
-                data = data[n:]
+            self._buffer_offset = n
             self._loop.add_writer(self._fileno, self._write_ready)
 
+        if not isinstance(data, bytes):
+            # Ensure that what we buffer is immutable.
+            data = bytes(data)
         self._buffer.append(data)
+        self._buffer_size += len(data) - n
         self._maybe_pause_protocol()
 
     def _write_ready(self):
-        data = b''.join(self._buffer)
-        assert data, 'Data should not be empty'
+        assert self._buffer, 'Data should not be empty'
 
-        del self._buffer[:]
+        # Write the buffers without joining them: with a slow reader, a
+        # partial write must not copy the whole buffer.
+        data = self._buffer[0]
+        if self._buffer_offset:
+            data = compat.buffer_tail(data, self._buffer_offset)
         try:
-            n = wrap_error(os.write, self._fileno, data)
+            if _HAVE_WRITEV and len(self._buffer) > 1:
+                buffers = [data]
+                buffers.extend(itertools.islice(self._buffer, 1, _IOV_MAX))
+                n = wrap_error(os.writev, self._fileno, buffers)
+            else:
+                n = wrap_error(os.write, self._fileno, data)
         except (BlockingIOError, InterruptedError):
-            self._buffer.append(data)
+            return
         except Exception as exc:
             self._conn_lost += 1
-            # Remove writer here, _fatal_error() doesn't it
-            # because _buffer is empty.
-            self._loop.remove_writer(self._fileno)
             self._fatal_error(exc, 'Fatal write error on pipe transport')
-        else:
-            if n == len(data):
-                self._loop.remove_writer(self._fileno)
-                self._maybe_resume_protocol()  # May append to buffer.
-                if not self._buffer and self._closing:
-                    self._loop.remove_reader(self._fileno)
-                    self._call_connection_lost(None)
-                return
-            elif n > 0:
-                data = data[n:]
+            return
+
+        self._consume_buffer(n)
+        if self._buffer:
+            self._maybe_resume_protocol()
+            return  # Try again later.
+
+        self._loop.remove_writer(self._fileno)
+        self._maybe_resume_protocol()  # May append to buffer.
+        if not self._buffer and self._closing:
+            self._loop.remove_reader(self._fileno)
+            self._call_connection_lost(None)
 
-            self._buffer.append(data)  # Try again later.
+    def _consume_buffer(self, n):
+        # Remove n written bytes from the buffer
+        self._buffer_size -= n
+        n += self._buffer_offset
+        buffer = self._buffer
+        while buffer and n >= len(buffer[0]):
+            n -= len(buffer.popleft())
+        self._buffer_offset = n
 
     def can_write_eof(self):
         return True
@@ -572,7 +1090,9 @@ class _UnixWritePipeTransport(transports._FlowControlMixin,
         self._closing = True
         if self._buffer:
             self._loop.remove_writer(self._fileno)
-        del self._buffer[:]
+        self._buffer.clear()
+        self._buffer_offset = 0
+        self._buffer_size = 0
         self._loop.remove_reader(self._fileno)
         self._loop.call_soon(self._call_connection_lost, exc)
 
@@ -602,6 +1122,303 @@ else:
             fcntl.fcntl(fd, fcntl.F_SETFD, old & ~cloexec_flag)
 
 
+def _can_splice(loop, transport):
+    """Return True if the relay of the transport can use splice()."""
+    # The relay reads and writes the socket directly: the transport must not
+    # have buffered data nor an idle timeout
+    return (type(transport) is selector_events._SelectorSocketTransport
+            and transport._loop is loop
+            and not transport._closing
+            and not transport._conn_lost
+            and not transport._eof
+            and not transport._buffer
+            and transport._idle_sweeper is None)
+
+
+class _SpliceDirection(object):
+    """Move the data read from a socket to another socket through a pipe
+    with splice(), without copying it to user space."""
+
+    def __init__(self, relay, src, dst):
+        self._relay = relay
+        self._loop = relay._loop
+        self._src = src._sock_fd
+        self._dst = dst._sock_fd
+        self._dst_sock = dst._sock
+        self._rfd, self._wfd = os.pipe()
+        for fd in (self._rfd, self._wfd):
+            _set_inheritable(fd, False)
+            _set_nonblocking(fd)
+        # Number of bytes in the pipe
+        self._pending = 0
+        self._writing = False
+        self._eof = False
+        self.done = False
+
+    def start(self):
+        self._loop.add_reader(self._src, self._read_ready)
+
+    def close(self):
+        if self._rfd is None:
+            return
+        if not (self._eof or self._writing):
+            self._loop.remove_reader(self._src)
+        if self._writing:
+            self._loop.remove_writer(self._dst)
+        os.close(self._rfd)
+        os.close(self._wfd)
+        self._rfd = self._wfd = None
+
+    def _read_ready(self):
+        try:
+            n = wrap_error(_splice, self._src, self._wfd, _SPLICE_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception as exc:
+            self._relay._fatal_error(exc)
+            return
+        if n:
+            self._pending += n
+            # More data or the end of file may be pending
+            self._loop._set_ready(self._src, selectors.EVENT_READ)
+        else:
+            self._eof = True
+            self._loop.remove_reader(self._src)
+        self._write_ready()
+
+    def _write_ready(self):
+        while self._pending:
+            try:
+                n = wrap_error(_splice, self._rfd, self._dst, self._pending)
+            except (BlockingIOError, InterruptedError):
+                if not self._writing:
+                    # The destination doesn't read: stop reading from the
+                    # source until the pipe is flushed
+                    self._writing = True
+                    if not self._eof:
+                        self._loop.remove_reader(self._src)
+                    self._loop.add_writer(self._dst, self._write_ready)
+                return
+            except Exception as exc:
+                self._relay._fatal_error(exc)
+                return
+            self._pending -= n
+
+        if self._writing:
+            self._writing = False
+            self._loop.remove_writer(self._dst)
+            if not self._eof:
+                self._loop.add_reader(self._src, self._read_ready)
+        if self._eof and not self.done:
+            try:
+                self._dst_sock.shutdown(socket.SHUT_WR)
+            except socket.error as exc:
+                self._relay._fatal_error(exc)
+                return
+            self.done = True
+            self._relay._direction_done()
+
+
+class _SpliceRelay(protocols.Protocol):
+    """Relay data between two socket transports with splice().
+
+    The relay is the protocol of both transports.  It reads and writes the
+    sockets itself: the transports are only used to close the connections.
+    """
+
+    def __init__(self, loop, transport_a, transport_b, done):
+        self._loop = loop
+        self._transports = (transport_a, transport_b)
+        self._done = done
+        self._exc = None
+        self._closed = False
+        self._lost = 0
+        self._directions = []
+        try:
+            self._directions.append(
+                _SpliceDirection(self, transport_a, transport_b))
+            self._directions.append(
+                _SpliceDirection(self, transport_b, transport_a))
+        except:
+            for direction in self._directions:
+                direction.close()
+            raise
+
+    def start(self):
+        for transport in self._transports:
+            self._loop.remove_reader(transport._sock_fd)
+            base_events._set_transport_protocol(transport, self)
+        for direction in self._directions:
+            direction.start()
+
+    def _direction_done(self):
+        if all(direction.done for direction in self._directions):
+            self._close(False)
+
+    def _fatal_error(self, exc):
+        if self._exc is None:
+            self._exc = exc
+        self._close(True)
+
+    def _close(self, abort):
+        if self._closed:
+            return
+        self._closed = True
+        for direction in self._directions:
+            direction.close()
+        for transport in self._transports:
+            if abort:
+                transport.abort()
+            else:
+                transport.close()
+
+    def connection_lost(self, exc):
+        if self._exc is None:
+            self._exc = exc
+        self._lost += 1
+        # Losing a connection closes the other one
+        self._close(exc is not None)
+        if self._lost < 2 or self._done.done():
+            return
+        if self._exc is not None:
+            self._done.set_exception(self._exc)
+        else:
+            self._done.set_result(None)
+
+
+class _SpawnedProcess(object):
+    """Child process spawned by posix_spawnp().
+
+    Implement the subset of the subprocess.Popen API used by
+    _UnixSubprocessTransport: the stdin, stdout and stderr pipes are
+    unbuffered.
+    """
+
+    def __init__(self, args, shell, stdin, stdout, stderr, env=None,
+                 sigmask=None):
+        if shell:
+            args = ['/bin/sh', '-c', args]
+        elif isinstance(args, compat.string_types):
+            args = [args]
+        self.args = args
+        self.returncode = None
+        self.stdin = None
+        self.stdout = None
+        self.stderr = None
+
+        # (fd, child_fd) pairs
+        dup2 = []
+        # file descriptors only used by the child process
+        child_fds = []
+        try:
+            for child_fd, spec in ((0, stdin), (1, stdout), (2, stderr)):
+                if spec is None:
+                    continue
+                if spec == subprocess.PIPE:
+                    rfd, wfd = os.pipe()
+                    _set_inheritable(rfd, False)
+                    _set_inheritable(wfd, False)
+                    if child_fd == 0:
+                        self.stdin = os.fdopen(wfd, 'wb', 0)
+                        fd = rfd
+                    else:
+                        pipe = os.fdopen(rfd, 'rb', 0)
+                        if child_fd == 1:
+                            self.stdout = pipe
+                        else:
+                            self.stderr = pipe
+                        fd = wfd
+                    child_fds.append(fd)
+                elif spec == subprocess.STDOUT:
+                    fd = 1
+                elif compat.PY33 and spec == subprocess.DEVNULL:
+                    fd = os.open(os.devnull, os.O_RDWR)
+                    _set_inheritable(fd, False)
+                    child_fds.append(fd)
+                elif isinstance(spec, int):
+                    fd = spec
+                else:
+                    fd = spec.fileno()
+                if fd == child_fd:
+                    # dup2() would be a no-op and keep the close-on-exec flag:
+                    # pass a duplicate instead of making the file descriptor
+                    # of the caller inheritable
+                    fd = os.dup(fd)
+                    _set_inheritable(fd, False)
+                    child_fds.append(fd)
+                dup2.append((fd, child_fd))
+
+            self.pid = _posix_spawnp(args, env, dup2, sigmask)
+        except:
+            for pipe in (self.stdin, self.stdout, self.stderr):
+                if pipe is not None:
+                    pipe.close()
+            raise
+        finally:
+            for fd in child_fds:
+                os.close(fd)
+
+    def __repr__(self):
+        info = [self.__class__.__name__, 'pid=%s' % self.pid]
+        if self.returncode is not None:
+            info.append('returncode=%s' % self.returncode)
+        return '<%s>' % ' '.join(info)
+
+    def _set_status(self, status):
+        if os.WIFSIGNALED(status):
+            self.returncode = -os.WTERMSIG(status)
+        elif os.WIFEXITED(status):
+            self.returncode = os.WEXITSTATUS(status)
+        else:
+            self.returncode = status
+
+    def _waitpid(self, options):
+        while True:
+            try:
+                return wrap_error(os.waitpid, self.pid, options)
+            except InterruptedError:
+                continue
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                pid, status = self._waitpid(os.WNOHANG)
+            except ChildProcessError:
+                # The child process was reaped by the child watcher
+                self.returncode = 0
+            else:
+                if pid:
+                    self._set_status(status)
+        return self.returncode
+
+    def wait(self):
+        if self.returncode is None:
+            try:
+                pid, status = self._waitpid(0)
+            except ChildProcessError:
+                # The child process was reaped by the child watcher
+                self.returncode = 0
+            else:
+                self._set_status(status)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.returncode is None:
+            os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+def _unblock_signals(signals, preexec_fn):
+    _pthread_sigmask(_SIG_UNBLOCK, signals)
+    if preexec_fn is not None:
+        preexec_fn()
+
+
 class _UnixSubprocessTransport(base_subprocess.BaseSubprocessTransport):
 
     def _start(self, args, shell, stdin, stdout, stderr, bufsize, **kwargs):
@@ -619,9 +1436,27 @@ class _UnixSubprocessTransport(base_subprocess.BaseSubprocessTransport):
             # (Python 3.4 implements the PEP 446, socketpair returns
             # non-inheritable sockets)
             _set_inheritable(stdin_w.fileno(), False)
-        self._proc = subprocess.Popen(
-            args, shell=shell, stdin=stdin, stdout=stdout, stderr=stderr,
-            universal_newlines=False, bufsize=bufsize, **kwargs)
+        signalfd_signals = None
+        if getattr(self._loop, '_signalfd', None) is not None:
+            # Child processes inherit the signals blocked for the signalfd
+            signalfd_signals = list(self._loop._signal_handlers)
+        if (getattr(self._loop, '_use_posix_spawn', False)
+        and self._can_spawn(kwargs)):
+            sigmask = None
+            if signalfd_signals is not None:
+                sigmask = (set(_pthread_sigmask(_SIG_BLOCK, ()))
+                           - set(signalfd_signals))
+            self._proc = _SpawnedProcess(args, shell, stdin, stdout, stderr,
+                                         env=kwargs.get('env'),
+                                         sigmask=sigmask)
+        else:
+            if signalfd_signals is not None:
+                kwargs['preexec_fn'] = functools.partial(
+                    _unblock_signals, signalfd_signals,
+                    kwargs.get('preexec_fn'))
+            self._proc = subprocess.Popen(
+                args, shell=shell, stdin=stdin, stdout=stdout, stderr=stderr,
+                universal_newlines=False, bufsize=bufsize, **kwargs)
         if stdin_w is not None:
             # Retrieve the file descriptor from stdin_w, stdin_w should not
             # "own" the file descriptor anymore: closing stdin_fd file
@@ -632,9 +1467,827 @@ class _UnixSubprocessTransport(base_subprocess.BaseSubprocessTransport):
                 self._proc.stdin = os.fdopen(stdin_fd, 'wb', bufsize)
             else:
                 stdin_dup = os.dup(stdin_w.fileno())
+                # os.dup() creates an inheritable file descriptor
+                _set_inheritable(stdin_dup, False)
                 stdin_w.close()
                 self._proc.stdin = os.fdopen(stdin_dup, 'wb', bufsize)
 
+    def _can_spawn(self, kwargs):
+        # posix_spawnp() cannot change the working directory, call a Python
+        # function in the child process, etc.: use subprocess.Popen for these
+        # options.  Without close_fds, only non-inheritable file descriptors
+        # are closed, which are all file descriptors created by Python 3.4 and
+        # newer (PEP 446).
+        for key, value in kwargs.items():
+            if key == 'env':
+                continue
+            if key == 'close_fds' and (not value or compat.PY34):
+                continue
+            return False
+        return _spawn_libc is not None
+
+
+class _SelectorProactorFuture(futures.Future):
+    """Future of an operation of SelectorProactor.
+
+    Cancelling the future removes the operation from the proactor
+    immediately, before the file descriptor can be closed.
+    """
+
+    def __init__(self, proactor, fd, event, loop=None):
+        super(_SelectorProactorFuture, self).__init__(loop=loop)
+        self._proactor = proactor
+        self._fd = fd
+        self._event = event
+
+    def _repr_info(self):
+        info = super(_SelectorProactorFuture, self)._repr_info()
+        info.insert(1, 'fd=%s' % self._fd)
+        return info
+
+    def cancel(self):
+        if not self.done():
+            self._proactor._remove_operation(self)
+        return super(_SelectorProactorFuture, self).cancel()
+
+
+class SelectorProactor(object):
+    """Proactor implementation using a selector.
+
+    The interface is the one of windows_events.IocpProactor.  An operation
+    is attempted on the non-blocking file descriptor when it is submitted,
+    and then each time the selector reports the file descriptor ready,
+    until it completes.  Operations on the same file descriptor and
+    direction complete in the order of submission.  Like IocpProactor, the
+    future of send() completes when all data has been sent.
+    """
+
+    def __init__(self, selector=None):
+        if selector is None:
+            selector = selectors.DefaultSelector()
+        self._loop = None
+        self._selector = selector
+
+    def __repr__(self):
+        return ('<%s selector=%s fd#=%s>'
+                % (self.__class__.__name__,
+                   self._selector.__class__.__name__,
+                   len(self._selector.get_map())))
+
+    def set_loop(self, loop):
+        self._loop = loop
+
+    def select(self, timeout=None):
+        done = []
+        for key, mask in self._selector.select(timeout):
+            reads, writes = key.data
+            if mask & selectors.EVENT_READ:
+                self._run_queue(reads, done)
+            if mask & selectors.EVENT_WRITE:
+                self._run_queue(writes, done)
+            self._update(key.fd, key)
+        return done
+
+    def _run_queue(self, queue, done):
+        while queue:
+            fut, func = queue[0]
+            if not self._complete(fut, func):
+                break
+            queue.popleft()
+            done.append(fut)
+
+    def _complete(self, fut, func):
+        # Return False if the operation must wait for the file descriptor
+        try:
+            value = func()
+        except (BlockingIOError, InterruptedError):
+            return False
+        except Exception as exc:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(value)
+        return True
+
+    def _register(self, conn, event, func, attempt=True):
+        fd = conn.fileno()
+        fut = _SelectorProactorFuture(self, fd, event, loop=self._loop)
+        try:
+            key = self._selector.get_key(fd)
+        except KeyError:
+            key = None
+            queues = (collections.deque(), collections.deque())
+        else:
+            queues = key.data
+        queue = queues[event == selectors.EVENT_WRITE]
+        if attempt and not queue and self._complete(fut, func):
+            return fut
+
+        queue.append((fut, func))
+        if key is None:
+            self._selector.register(fd, event, queues)
+        elif not key.events & event:
+            self._selector.modify(fd, key.events | event, queues)
+        return fut
+
+    def _update(self, fd, key):
+        reads, writes = key.data
+        events = 0
+        if reads:
+            events |= selectors.EVENT_READ
+        if writes:
+            events |= selectors.EVENT_WRITE
+        if not events:
+            self._selector.unregister(fd)
+        elif events != key.events:
+            self._selector.modify(fd, events, key.data)
+
+    def _remove_operation(self, fut):
+        try:
+            key = self._selector.get_key(fut._fd)
+        except KeyError:
+            return
+        queue = key.data[fut._event == selectors.EVENT_WRITE]
+        for item in queue:
+            if item[0] is fut:
+                queue.remove(item)
+                self._update(fut._fd, key)
+                break
+
+    def recv(self, conn, nbytes, flags=0):
+        if isinstance(conn, socket.socket):
+            func = functools.partial(wrap_error, conn.recv, nbytes, flags)
+        else:
+            fd = conn.fileno()
+
+            def func():
+                try:
+                    return wrap_error(os.read, fd, nbytes)
+                except OSError as exc:
+                    # read() of a PTY fails with EIO when the other end is
+                    # closed: handle it as end-of-file
+                    if exc.errno == errno.EIO:
+                        return b''
+                    raise
+        return self._register(conn, selectors.EVENT_READ, func)
+
+    def send(self, conn, buf, flags=0):
+        if isinstance(conn, socket.socket):
+            def send(data):
+                return conn.send(data, flags)
+        else:
+            send = functools.partial(os.write, conn.fileno())
+        size = len(buf)
+        # Number of bytes already sent: a partial send must not copy the
+        # remaining data
+        sent = [0]
+
+        def finish_send():
+            while sent[0] < size:
+                if sent[0]:
+                    data = compat.buffer_tail(buf, sent[0])
+                else:
+                    data = buf
+                sent[0] += wrap_error(send, data)
+            return size
+
+        return self._register(conn, selectors.EVENT_WRITE, finish_send)
+
+    def accept(self, listener):
+        def finish_accept():
+            conn, address = wrap_error(listener.accept)
+            conn.setblocking(False)
+            return conn, address
+
+        return self._register(listener, selectors.EVENT_READ, finish_accept)
+
+    def connect(self, conn, address):
+        def finish_connect():
+            wrap_error(selector_events._get_socket_error, conn, address)
+
+        try:
+            wrap_error(conn.connect, address)
+        except (BlockingIOError, InterruptedError):
+            return self._register(conn, selectors.EVENT_WRITE,
+                                  finish_connect, attempt=False)
+        except Exception as exc:
+            fut = futures.Future(loop=self._loop)
+            fut.set_exception(exc)
+            return fut
+        fut = futures.Future(loop=self._loop)
+        fut.set_result(None)
+        return fut
+
+    def wait_readable(self, conn):
+        """Return a future completed when conn becomes readable.
+
+        Unix only.  Used to detect that the read end of a pipe is closed.
+        """
+        return self._register(conn, selectors.EVENT_READ, lambda: None,
+                              attempt=False)
+
+    def _cancel_operations(self, fd):
+        try:
+            key = self._selector.get_key(fd)
+        except KeyError:
+            return
+        for queue in key.data:
+            for fut, func in list(queue):
+                fut.cancel()
+
+    def _stop_serving(self, obj):
+        # obj is a socket or a pipe.  It will be closed in
+        # BaseProactorEventLoop._stop_serving(): unregister it first.
+        self._cancel_operations(obj.fileno())
+
+    def close(self):
+        if self._selector is None:
+            return
+        # Cancel remaining operations
+        for fd in list(self._selector.get_map()):
+            self._cancel_operations(fd)
+        self._selector.close()
+        self._selector = None
+
+
+class _UnixProactorWritePipeTransport(
+        proactor_events._ProactorBaseWritePipeTransport):
+    """Write pipe transport of the Unix proactor event loop.
+
+    The write end of a pipe can't be read on Unix: wait until it becomes
+    readable instead, which happens when the read end is closed.
+    """
+
+    def __init__(self, *args, **kw):
+        super(_UnixProactorWritePipeTransport, self).__init__(*args, **kw)
+        # Same limitation than _UnixWritePipeTransport: on AIX, it only works
+        # for sockets
+        mode = os.fstat(self._sock.fileno()).st_mode
+        if stat.S_ISSOCK(mode) or not sys.platform.startswith("aix"):
+            self._read_fut = self._loop._proactor.wait_readable(self._sock)
+            self._read_fut.add_done_callback(self._pipe_closed)
+
+    def _pipe_closed(self, fut):
+        if fut.cancelled():
+            # the transport has been closed
+            return
+        assert fut is self._read_fut, (fut, self._read_fut)
+        self._read_fut = None
+        if self._write_fut is not None:
+            self._force_close(BrokenPipeError())
+        else:
+            self.close()
+
+
+class _UnixProactorEventLoop(proactor_events.BaseProactorEventLoop):
+    """Unix event loop running the proactor transports.
+
+    Uses SelectorProactor as completion engine by default.
+    """
+
+    def __init__(self, proactor=None):
+        if proactor is None:
+            proactor = SelectorProactor()
+        super(_UnixProactorEventLoop, self).__init__(proactor)
+
+    def _socketpair(self):
+        return socket.socketpair()
+
+    def _make_read_pipe_transport(self, pipe, protocol, waiter=None,
+                                  extra=None):
+        _set_nonblocking(pipe.fileno())
+        return super(_UnixProactorEventLoop, self)._make_read_pipe_transport(
+            pipe, protocol, waiter, extra)
+
+    def _make_write_pipe_transport(self, pipe, protocol, waiter=None,
+                                   extra=None):
+        _set_nonblocking(pipe.fileno())
+        return _UnixProactorWritePipeTransport(self, pipe, protocol, waiter,
+                                               extra)
+
+
+# io_uring_setup() features required by IoUringProactor: Linux 5.11
+_IORING_FEAT_SINGLE_MMAP = 1 << 0
+_IORING_FEAT_NODROP = 1 << 1
+_IORING_FEAT_FAST_POLL = 1 << 5
+_IORING_FEAT_EXT_ARG = 1 << 8
+_IORING_FEATURES = (_IORING_FEAT_SINGLE_MMAP | _IORING_FEAT_NODROP
+                    | _IORING_FEAT_FAST_POLL | _IORING_FEAT_EXT_ARG)
+
+# io_uring_enter() flags
+_IORING_ENTER_GETEVENTS = 1 << 0
+_IORING_ENTER_EXT_ARG = 1 << 3
+
+# mmap() offset of the submission queue entries
+_IORING_OFF_SQES = 0x10000000
+
+# Operation codes
+_IORING_OP_POLL_ADD = 6
+_IORING_OP_ACCEPT = 13
+_IORING_OP_ASYNC_CANCEL = 14
+_IORING_OP_READ = 22
+_IORING_OP_WRITE = 23
+_IORING_OP_SEND = 26
+_IORING_OP_RECV = 27
+
+# struct io_uring_params: 10 fields, then the offsets in the submission
+# queue ring and in the completion queue ring
+_IO_URING_PARAMS = struct.Struct('=30I')
+# struct io_uring_sqe and struct io_uring_cqe
+_SQE = struct.Struct('=BBHiQQIIQHHiQQ')
+_CQE = struct.Struct('=QiI')
+_UINT32 = struct.Struct('=I')
+# struct io_uring_getevents_arg and struct __kernel_timespec
+_GETEVENTS_ARG = struct.Struct('=QIIQ')
+_TIMESPEC = struct.Struct('=qq')
+
+# read() and write() at the current position of the file
+_IORING_CURRENT_POS = 2 ** 64 - 1
+
+_POLLIN = 0x1
+_POLLOUT = 0x4
+
+# Returned by the callback of an operation which must be submitted again
+_RESUBMIT = object()
+
+
+def _poll_events(events):
+    # The kernel swaps the 16-bit halves of poll32_events on big endian
+    if sys.byteorder == 'big':
+        events = ((events & 0xffff) << 16) | (events >> 16)
+    return events
+
+
+def _io_uring_error(res):
+    err = -res
+    error_class = get_error_class(err, OSError)
+    return error_class(err, os.strerror(err))
+
+
+class _IoUringFuture(futures.Future):
+    """Future of an IoUringProactor operation.
+
+    Cancelling the future cancels the operation.  The proactor keeps the
+    buffer of the operation until the kernel reports its completion.
+    """
+
+    def __init__(self, proactor, operation, loop=None):
+        super(_IoUringFuture, self).__init__(loop=loop)
+        self._proactor = proactor
+        self._operation = operation
+
+    def _repr_info(self):
+        info = super(_IoUringFuture, self)._repr_info()
+        info.insert(1, 'fd=%s' % self._operation.fd)
+        return info
+
+    def cancel(self):
+        if not self.done():
+            self._proactor._cancel_operation(self._operation)
+        return super(_IoUringFuture, self).cancel()
+
+
+class _IoUringOperation(object):
+    __slots__ = ('future', 'opcode', 'fd', 'offset', 'addr', 'length',
+                 'op_flags', 'buf', 'callback', 'poll', 'user_data')
+
+    def __init__(self, opcode, fd, offset, addr, length, op_flags, buf,
+                 callback):
+        self.future = None
+        self.opcode = opcode
+        self.fd = fd
+        self.offset = offset
+        self.addr = addr
+        self.length = length
+        self.op_flags = op_flags
+        # buffer read or written by the kernel: keep a reference until the
+        # operation completes
+        self.buf = buf
+        # callback(res) returns the result of the future, or _RESUBMIT
+        self.callback = callback
+        # poll events to wait for before submitting the operation again,
+        # after it failed with EAGAIN
+        self.poll = 0
+        self.user_data = None
+
+
+class IoUringProactor(object):
+    """Proactor implementation using io_uring, Linux 5.11 and newer.
+
+    The interface is the one of SelectorProactor.  Operations are queued
+    and submitted in a single io_uring_enter() call by select(), which also
+    waits for their completions.  Operations on a non-blocking pipe failing
+    with EAGAIN wait until the pipe is ready with a poll operation.  Unlike
+    SelectorProactor, operations on the same file descriptor and direction
+    are not ordered.
+
+    Raise OSError if io_uring is not available: io_uring_setup() is missing
+    or blocked, or the kernel is older than Linux 5.11.
+
+    It is not a faster replacement of the selector event loop: the proactor
+    transports create a future for each read and each write, which makes
+    IoUringEventLoop about 5x slower than SelectorEventLoop on
+    benchmarks/bench_echo.py.  It is on par with SelectorProactor.
+    """
+
+    def __init__(self, entries=256):
+        if _io_uring is None:
+            raise OSError(errno.ENOSYS, 'io_uring is not available')
+        self._setup, self._enter = _io_uring
+        self._loop = None
+        self._ring_fd = None
+        self._ring = None
+        self._sqes = None
+        self._results = []
+        # Operations submitted to the kernel: user_data => operation
+        self._cache = {}
+        # Operations to submit and user_data of operations to cancel
+        self._pending = collections.deque()
+        self._cancels = []
+        # Number of entries written into the submission queue but not
+        # submitted yet
+        self._unsubmitted = 0
+        self._user_data = itertools.count(1)
+        try:
+            self._setup_ring(entries)
+        except:
+            self._close_ring()
+            raise
+
+    def _setup_ring(self, entries):
+        params = ctypes.create_string_buffer(_IO_URING_PARAMS.size)
+        self._ring_fd = self._setup(entries, params)
+        _set_inheritable(self._ring_fd, False)
+        values = _IO_URING_PARAMS.unpack(params.raw)
+        sq_entries, cq_entries = values[0:2]
+        features = values[5]
+        if features & _IORING_FEATURES != _IORING_FEATURES:
+            raise OSError(errno.ENOSYS, 'io_uring is too old')
+        (self._sq_head_off, self._sq_tail_off, sq_mask_off, sq_entries_off,
+         sq_flags_off, sq_dropped_off, sq_array_off) = values[10:17]
+        (self._cq_head_off, self._cq_tail_off, cq_mask_off, cq_entries_off,
+         cq_overflow_off, self._cqes_off) = values[20:26]
+
+        # IORING_FEAT_SINGLE_MMAP: a single mapping for both rings
+        size = max(sq_array_off + sq_entries * 4,
+                   self._cqes_off + cq_entries * _CQE.size)
+        ring = mmap.mmap(self._ring_fd, size, flags=mmap.MAP_SHARED,
+                         prot=mmap.PROT_READ | mmap.PROT_WRITE, offset=0)
+        self._ring = ring
+        self._sqes = mmap.mmap(self._ring_fd, sq_entries * _SQE.size,
+                               flags=mmap.MAP_SHARED,
+                               prot=mmap.PROT_READ | mmap.PROT_WRITE,
+                               offset=_IORING_OFF_SQES)
+        self._sq_entries = sq_entries
+        self._sq_mask = _UINT32.unpack_from(ring, sq_mask_off)[0]
+        self._cq_mask = _UINT32.unpack_from(ring, cq_mask_off)[0]
+        self._sq_tail = _UINT32.unpack_from(ring, self._sq_tail_off)[0]
+        self._cq_head = _UINT32.unpack_from(ring, self._cq_head_off)[0]
+        # Submission queue entry i is always stored in the slot i
+        for index in range(sq_entries):
+            _UINT32.pack_into(ring, sq_array_off + index * 4, index)
+
+        # io_uring_getevents_arg of the timeout of io_uring_enter()
+        self._timespec = ctypes.create_string_buffer(_TIMESPEC.size)
+        self._getevents_arg = ctypes.create_string_buffer(_GETEVENTS_ARG.size)
+        _GETEVENTS_ARG.pack_into(self._getevents_arg, 0, 0, 0, 0,
+                                 ctypes.addressof(self._timespec))
+
+    def __repr__(self):
+        return ('<%s fd=%s operation#=%s result#=%s>'
+                % (self.__class__.__name__, self._ring_fd, len(self._cache),
+                   len(self._results)))
+
+    def set_loop(self, loop):
+        self._loop = loop
+
+    def select(self, timeout=None):
+        if self._results:
+            timeout = 0
+        self._poll(timeout)
+        tmp = self._results
+        self._results = []
+        return tmp
+
+    def _submit(self, opcode, conn, offset, addr, length, op_flags, buf,
+                callback):
+        operation = _IoUringOperation(opcode, conn.fileno(), offset, addr,
+                                      length, op_flags, buf, callback)
+        operation.future = _IoUringFuture(self, operation, loop=self._loop)
+        self._pending.append(operation)
+        return operation.future
+
+    def _write_sqes(self):
+        """Write the pending operations into the submission queue.
+
+        Return the number of entries written.
+        """
+        head = _UINT32.unpack_from(self._ring, self._sq_head_off)[0]
+        free = self._sq_entries - ((self._sq_tail - head) & 0xffffffff)
+        count = 0
+        while free > count and self._cancels:
+            self._write_sqe(_IORING_OP_ASYNC_CANCEL, -1, 0,
+                            self._cancels.pop(), 0, 0, 0)
+            count += 1
+        while free > count and self._pending:
+            operation = self._pending.popleft()
+            if operation.future.done():
+                # cancelled before being submitted
+                continue
+            if operation.user_data is None:
+                operation.user_data = next(self._user_data)
+            self._cache[operation.user_data] = operation
+            if operation.poll:
+                self._write_sqe(_IORING_OP_POLL_ADD, operation.fd, 0, 0, 0,
+                                _poll_events(operation.poll),
+                                operation.user_data)
+            else:
+                self._write_sqe(operation.opcode, operation.fd,
+                                operation.offset, operation.addr,
+                                operation.length, operation.op_flags,
+                                operation.user_data)
+            count += 1
+        if count:
+            _UINT32.pack_into(self._ring, self._sq_tail_off, self._sq_tail)
+        return count
+
+    def _write_sqe(self, opcode, fd, offset, addr, length, op_flags,
+                   user_data):
+        index = self._sq_tail & self._sq_mask
+        _SQE.pack_into(self._sqes, index * _SQE.size,
+                       opcode, 0, 0, fd, offset, addr, length, op_flags,
+                       user_data, 0, 0, 0, 0, 0)
+        self._sq_tail = (self._sq_tail + 1) & 0xffffffff
+
+    def _poll(self, timeout=None):
+        if timeout is None:
+            min_complete = 1
+            flags = _IORING_ENTER_GETEVENTS
+            arg = None
+            arg_size = 0
+        else:
+            if timeout < 0:
+                raise ValueError("negative timeout")
+            min_complete = 1 if timeout > 0 else 0
+            flags = _IORING_ENTER_GETEVENTS | _IORING_ENTER_EXT_ARG
+            arg = self._getevents_arg
+            arg_size = _GETEVENTS_ARG.size
+            seconds = int(timeout)
+            _TIMESPEC.pack_into(self._timespec, 0, seconds,
+                                int((timeout - seconds) * 1e9))
+
+        while True:
+            self._unsubmitted += self._write_sqes()
+            if self._pending or self._cancels:
+                # The submission queue is full: submit without waiting
+                wait = 0
+            else:
+                wait = min_complete
+            try:
+                submitted = wrap_error(self._enter, self._ring_fd,
+                                       self._unsubmitted, wait, flags,
+                                       arg, arg_size)
+            except OSError as exc:
+                # ETIME: timeout, EBUSY: the completion queue is full
+                if exc.errno not in (errno.EINTR, errno.ETIME, errno.EBUSY):
+                    raise
+                submitted = 0
+                if exc.errno == errno.EBUSY:
+                    self._reap()
+            self._unsubmitted -= submitted
+            if not (self._pending or self._cancels):
+                break
+        self._reap()
+
+    def _reap(self):
+        ring = self._ring
+        head = self._cq_head
+        tail = _UINT32.unpack_from(ring, self._cq_tail_off)[0]
+        while head != tail:
+            offset = self._cqes_off + (head & self._cq_mask) * _CQE.size
+            user_data, res, flags = _CQE.unpack_from(ring, offset)
+            head = (head + 1) & 0xffffffff
+            self._complete(user_data, res)
+        self._cq_head = head
+        _UINT32.pack_into(ring, self._cq_head_off, head)
+
+    def _complete(self, user_data, res):
+        operation = self._cache.pop(user_data, None)
+        if operation is None:
+            # completion of an ASYNC_CANCEL operation
+            return
+        fut = operation.future
+        if fut.done():
+            # the future has been cancelled
+            if operation.opcode == _IORING_OP_ACCEPT and res >= 0:
+                os.close(res)
+            return
+
+        if operation.poll:
+            # the file descriptor is ready or failed: submit the operation
+            # again to get its result or its error
+            operation.poll = 0
+            self._pending.append(operation)
+            return
+        if res == -errno.EAGAIN:
+            if operation.opcode in (_IORING_OP_RECV, _IORING_OP_READ,
+                                    _IORING_OP_ACCEPT):
+                operation.poll = _POLLIN
+            else:
+                operation.poll = _POLLOUT
+            self._pending.append(operation)
+            return
+        if res == -errno.EINTR:
+            self._pending.append(operation)
+            return
+
+        try:
+            value = operation.callback(res)
+        except OSError as exc:
+            fut.set_exception(exc)
+        else:
+            if value is _RESUBMIT:
+                self._pending.append(operation)
+                return
+            fut.set_result(value)
+        self._results.append(fut)
+
+    def _cancel_operation(self, operation):
+        if operation.user_data in self._cache:
+            self._cancels.append(operation.user_data)
+        # else the operation has not been submitted yet: _write_sqes()
+        # skips it
+
+    def recv(self, conn, nbytes, flags=0):
+        buf = ctypes.create_string_buffer(nbytes)
+        if isinstance(conn, socket.socket):
+            opcode = _IORING_OP_RECV
+            offset = 0
+        else:
+            opcode = _IORING_OP_READ
+            offset = _IORING_CURRENT_POS
+            flags = 0
+
+        def finish_recv(res):
+            if res < 0:
+                # read() of a PTY fails with EIO when the other end is
+                # closed: handle it as end-of-file
+                if res == -errno.EIO and opcode == _IORING_OP_READ:
+                    return b''
+                raise _io_uring_error(res)
+            return buf.raw[:res]
+
+        return self._submit(opcode, conn, offset, ctypes.addressof(buf),
+                            nbytes, flags, buf, finish_recv)
+
+    def send(self, conn, buf, flags=0):
+        data = flatten_bytes(buf)
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        if isinstance(conn, socket.socket):
+            opcode = _IORING_OP_SEND
+            offset = 0
+        else:
+            opcode = _IORING_OP_WRITE
+            offset = _IORING_CURRENT_POS
+            flags = 0
+        # pointer to the content of data, without copy
+        pointer = ctypes.c_char_p(data)
+        size = len(data)
+
+        def finish_send(res):
+            if res < 0:
+                raise _io_uring_error(res)
+            operation.addr += res
+            operation.length -= res
+            if operation.length:
+                # partial write
+                return _RESUBMIT
+            return size
+
+        fut = self._submit(opcode, conn, offset,
+                           ctypes.cast(pointer, ctypes.c_void_p).value,
+                           size, flags, pointer, finish_send)
+        operation = fut._operation
+        return fut
+
+    def accept(self, listener):
+        def finish_accept(res):
+            if res < 0:
+                raise _io_uring_error(res)
+            if compat.PY3:
+                conn = socket.socket(listener.family, socket.SOCK_STREAM,
+                                     listener.proto, fileno=res)
+            else:
+                try:
+                    conn = socket.fromfd(res, listener.family,
+                                         socket.SOCK_STREAM, listener.proto)
+                finally:
+                    os.close(res)
+            _set_inheritable(conn.fileno(), False)
+            conn.setblocking(False)
+            try:
+                address = conn.getpeername()
+            except socket.error:
+                # the peer already closed the connection
+                address = None
+            return conn, address
+
+        return self._submit(_IORING_OP_ACCEPT, listener, 0, 0, 0, 0, None,
+                            finish_accept)
+
+    def _wait_fd(self, conn, events, callback):
+        # A poll operation completing when the file descriptor is ready
+        return self._submit(_IORING_OP_POLL_ADD, conn, 0, 0, 0,
+                            _poll_events(events), None, callback)
+
+    def connect(self, conn, address):
+        def finish_connect(res):
+            if res < 0:
+                raise _io_uring_error(res)
+            wrap_error(selector_events._get_socket_error, conn, address)
+
+        try:
+            wrap_error(conn.connect, address)
+        except (BlockingIOError, InterruptedError):
+            return self._wait_fd(conn, _POLLOUT, finish_connect)
+        except Exception as exc:
+            fut = futures.Future(loop=self._loop)
+            fut.set_exception(exc)
+            return fut
+        fut = futures.Future(loop=self._loop)
+        fut.set_result(None)
+        return fut
+
+    def wait_readable(self, conn):
+        """Return a future completed when conn becomes readable.
+
+        Used to detect that the read end of a pipe is closed.
+        """
+        def finish_wait(res):
+            if res < 0:
+                raise _io_uring_error(res)
+            return None
+
+        return self._wait_fd(conn, _POLLIN, finish_wait)
+
+    def _cancel_operations(self, fd):
+        operations = list(self._cache.values())
+        operations.extend(self._pending)
+        for operation in operations:
+            if operation.fd == fd:
+                operation.future.cancel()
+
+    def _stop_serving(self, obj):
+        # obj is a socket or a pipe.  It will be closed in
+        # BaseProactorEventLoop._stop_serving(): cancel its operations first
+        self._cancel_operations(obj.fileno())
+
+    def close(self):
+        if self._ring_fd is None:
+            return
+        # Cancel remaining operations and wait until the kernel releases
+        # their buffers
+        for operation in list(self._cache.values()):
+            operation.future.cancel()
+        for operation in self._pending:
+            operation.future.cancel()
+        self._pending.clear()
+        while self._cache:
+            self._poll(1.0)
+            if self._cache:
+                logger.debug('taking long time to close proactor')
+        self._results = []
+        self._close_ring()
+
+    def _close_ring(self):
+        for name in ('_sqes', '_ring'):
+            mapping = getattr(self, name)
+            if mapping is not None:
+                mapping.close()
+                setattr(self, name, None)
+        if self._ring_fd is not None:
+            os.close(self._ring_fd)
+            self._ring_fd = None
+
+
+class _UnixIoUringEventLoop(_UnixProactorEventLoop):
+    """Unix proactor event loop using IoUringProactor.
+
+    Falls back to SelectorProactor if io_uring is not available.  Like the
+    other proactor event loops, it is slower than SelectorEventLoop: see
+    IoUringProactor.
+    """
+
+    def __init__(self, proactor=None):
+        if proactor is None:
+            try:
+                proactor = IoUringProactor()
+            except OSError as exc:
+                logger.debug('io_uring is not available, '
+                             'use SelectorProactor: %s', exc)
+                proactor = SelectorProactor()
+        super(_UnixIoUringEventLoop, self).__init__(proactor)
+
 
 class AbstractChildWatcher(object):
     """Abstract base class for monitoring child processes.
@@ -807,7 +2460,7 @@ class SafeChildWatcher(BaseChildWatcher):
         assert expected_pid > 0
 
         try:
-            pid, status = os.waitpid(expected_pid, os.WNOHANG)
+            pid, status = wrap_error(os.waitpid, expected_pid, os.WNOHANG)
         except ChildProcessError:
             # The child process is already reaped
             # (may happen if waitpid() is called elsewhere).
@@ -838,6 +2491,89 @@ class SafeChildWatcher(BaseChildWatcher):
             callback(pid, returncode, *args)
 
 
+class PidfdChildWatcher(SafeChildWatcher):
+    """Child watcher implementation using pidfd file descriptors.
+
+    A pidfd is opened for each child process and registered in the selector
+    of the event loop: only the terminated process is reaped, when its pidfd
+    becomes readable.  No SIGCHLD handler is installed and there is no
+    overhead per child process when another one terminates (O(1)).
+
+    The event loop must support add_reader().  If pidfd_open() is not
+    available (it requires Linux 5.3), the SafeChildWatcher implementation is
+    used instead.
+    """
+
+    def __init__(self):
+        super(PidfdChildWatcher, self).__init__()
+        self._use_pidfd = _pidfd_open is not None
+        # {pid: pidfd}
+        self._pidfds = {}
+
+    def close(self):
+        super(PidfdChildWatcher, self).close()
+        for pidfd in self._pidfds.values():
+            os.close(pidfd)
+        self._pidfds.clear()
+
+    def attach_loop(self, loop):
+        if not self._use_pidfd:
+            super(PidfdChildWatcher, self).attach_loop(loop)
+            return
+
+        assert loop is None or isinstance(loop, events.AbstractEventLoop)
+
+        if self._loop is not None and not self._loop.is_closed():
+            for pidfd in self._pidfds.values():
+                self._loop.remove_reader(pidfd)
+
+        self._loop = loop
+        if loop is not None:
+            for pid, pidfd in self._pidfds.items():
+                loop.add_reader(pidfd, self._do_waitpid, pid)
+
+    def add_child_handler(self, pid, callback, *args):
+        if not self._use_pidfd or pid in self._pidfds:
+            super(PidfdChildWatcher, self).add_child_handler(
+                pid, callback, *args)
+            return
+
+        self._callbacks[pid] = callback, args
+        try:
+            pidfd = _pidfd_open(pid)
+        except OSError as exc:
+            if exc.errno != errno.ESRCH:
+                # The child process is still running (EMFILE, ENOMEM, etc.)
+                # but cannot be watched
+                del self._callbacks[pid]
+                raise
+            # The child process is already reaped
+            # (may happen if waitpid() is called elsewhere).
+            self._do_waitpid(pid)
+            return
+        self._pidfds[pid] = pidfd
+        if self._loop is not None:
+            self._loop.add_reader(pidfd, self._do_waitpid, pid)
+
+    def remove_child_handler(self, pid):
+        removed = super(PidfdChildWatcher, self).remove_child_handler(pid)
+        self._close_pidfd(pid)
+        return removed
+
+    def _do_waitpid(self, expected_pid):
+        super(PidfdChildWatcher, self)._do_waitpid(expected_pid)
+        if expected_pid not in self._callbacks:
+            self._close_pidfd(expected_pid)
+
+    def _close_pidfd(self, pid):
+        pidfd = self._pidfds.pop(pid, None)
+        if pidfd is None:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(pidfd)
+        os.close(pidfd)
+
+
 class FastChildWatcher(BaseChildWatcher):
     """'Fast' child watcher implementation.
 
@@ -994,4 +2730,6 @@ class _UnixDefaultEventLoopPolicy(events.BaseDefaultEventLoopPolicy):
         self._watcher = watcher
 
 SelectorEventLoop = _UnixSelectorEventLoop
+SelectorProactorEventLoop = _UnixProactorEventLoop
+IoUringEventLoop = _UnixIoUringEventLoop
 DefaultEventLoopPolicy = _UnixDefaultEventLoopPolicy